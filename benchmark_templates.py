@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+⏱️ Microbenchmark de las plantillas de notificaciones
+Compara la construcción original con += contra las plantillas cacheadas por bucket
+y verifica que ambos generen exactamente el mismo texto
+
+Uso: python benchmark_templates.py [N]   (por defecto 100000 usuarios)
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:benchmark')
+
+from config import AI_MOTIVATIONAL_PHRASES
+from database import UserStats
+import templates
+
+def legacy_daily_reminder(stats: UserStats, current_week: int) -> str:
+    """Construcción original del recordatorio diario (referencia)"""
+    username = stats.username or 'Developer'
+    streak = stats.current_streak
+    total_hours = stats.total_hours
+
+    message = f"☀️ **¡Buenos días, {username}!**\n\n"
+    if streak >= 5:
+        message += f"🔥 **¡Increíble streak de {streak} días!** Eres imparable\n\n"
+    elif streak > 0:
+        message += f"⭐ **Streak de {streak} días** - ¡Mantén el impulso!\n\n"
+    else:
+        message += f"🌟 **¡Nuevo día, nueva oportunidad!** Empieza tu streak hoy\n\n"
+    message += f"📅 **Semana {current_week}/12** - ¡Sigues avanzando!\n"
+    message += f"⏰ **Horas acumuladas:** {total_hours:.1f}h\n\n"
+    message += f"📚 **Recordatorio de hoy:**\n"
+    message += f"• Dedica al menos 1 hora a programar\n"
+    message += f"• Regla 70/30: más código, menos videos\n"
+    message += f"• Registra tu progreso con /estudie\n\n"
+    message += f"🎯 **¡Empieza ahora!** Envía /semana para ver qué trabajar hoy\n\n"
+    message += f"💪 **¡Tu futuro developer te está esperando!**"
+    return message
+
+def legacy_motivational(stats: UserStats, daily_phrase: str) -> str:
+    """Construcción original del mensaje motivacional (referencia)"""
+    username = stats.username or 'Developer'
+
+    message = f"🌙 **¡Buenas noches, {username}!**\n\n"
+    message += f"💭 **Inspiración del día:**\n{daily_phrase}\n\n"
+    message += f"🤔 **Reflexión:**\n"
+    message += f"• ¿Qué aprendiste hoy?\n"
+    message += f"• ¿Qué reto superaste?\n"
+    message += f"• ¿Cómo te acercaste a tu objetivo?\n\n"
+    message += f"🌅 **Mañana será un gran día para:**\n"
+    message += f"• Escribir código que funcione\n"
+    message += f"• Resolver un problema complejo\n"
+    message += f"• Aprender algo nuevo\n\n"
+    message += f"✨ **¡Descansa bien, mañana seguimos construyendo tu futuro!**"
+    return message
+
+def make_users(user_count: int) -> list:
+    """Usuarios sintéticos con streaks, horas y semanas variadas: [(stats, semana)]"""
+    rng = random.Random(user_count)
+    today = date.today()
+    users = []
+    for user_id in range(1, user_count + 1):
+        stats = UserStats(
+            user_id=user_id,
+            username=rng.choice([f'user{user_id}', None, '{raro}_%s']),
+            start_date=today - timedelta(days=rng.randint(0, 120)),
+            current_week=1,
+            total_points=0.0,
+            projects_completed=0,
+            concepts_mastered=0,
+            total_hours=rng.uniform(0, 300),
+            study_days=0,
+            current_streak=rng.choice([0, 0, 1, 3, 5, 12, 40]),
+            last_study_date=None
+        )
+        users.append((stats, rng.randint(1, 12)))
+    return users
+
+def measure(label: str, build, users: list) -> list:
+    """Generar todos los mensajes midiendo el tiempo total"""
+    started = time.perf_counter()
+    messages = [build(stats, week) for stats, week in users]
+    elapsed = time.perf_counter() - started
+    print(f"   • {label:<28} {elapsed * 1000:9.1f} ms  ({len(users) / elapsed:,.0f} msg/s)")
+    return messages
+
+def main():
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    users = make_users(user_count)
+    phrase = AI_MOTIVATIONAL_PHRASES[0]
+
+    print(f"👥 {user_count:,} usuarios")
+
+    print("☀️ Recordatorio diario")
+    legacy = measure('original (+=)', legacy_daily_reminder, users)
+    templated = measure('plantilla por bucket', templates.render_daily_reminder, users)
+    assert legacy == templated, "Las plantillas del recordatorio difieren del original"
+
+    print("🌙 Mensaje motivacional")
+    legacy = measure('original (+=)', lambda stats, _: legacy_motivational(stats, phrase), users)
+    templated = measure('plantilla por frase', lambda stats, _: templates.render_motivational(stats, phrase), users)
+    assert legacy == templated, "Las plantillas motivacionales difieren del original"
+
+    print(f"✅ Textos idénticos; caché: {templates.daily_reminder_template.cache_info()}")
+
+if __name__ == '__main__':
+    main()
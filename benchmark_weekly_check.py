@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark de la verificación semanal nocturna
+Crea N usuarios sintéticos en una base temporal y mide cada etapa del pipeline
+(vencidos → estado en lote → resets → notificaciones) sin enviar mensajes reales
+
+Uso: python benchmark_weekly_check.py [N ...]   (por defecto 10000 y 100000)
+"""
+
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# La base y el token se configuran antes de importar los módulos del bot
+_tmp_dir = tempfile.mkdtemp(prefix='bench_weekly_')
+os.environ['DB_FILE'] = os.path.join(_tmp_dir, 'bench.db')
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:benchmark')
+
+from config import WEEKLY_EXAMS
+import database
+from evidence_manager import evidence_validator  # Sincroniza week_requirements
+from broadcast import BroadcastEngine
+from notification_manager import notification_manager
+from outbox import OutboxDispatcher
+from repository import repo
+
+class _FakeBot:
+    """Bot que solo cuenta envíos (simula ~5 ms de latencia de red)"""
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, **kwargs):
+        await asyncio.sleep(0.005)
+        self.sent += 1
+
+def populate(user_count: int):
+    """Crear usuarios con fechas de inicio de 0 a 120 días y ~mitad con la semana completa"""
+    rng = random.Random(user_count)
+    today = date.today()
+    conn = database.get_connection()
+
+    with conn:
+        for table in ('users', 'evidences', 'exam_results', 'notification_outbox'):
+            conn.execute(f'DELETE FROM {table}')
+
+        users, evidences, exams = [], [], []
+        for user_id in range(1, user_count + 1):
+            days = rng.randint(0, 120)
+            week = min(days // 7 + 1, 12)
+            start_date = today - timedelta(days=days)
+            next_deadline = start_date + timedelta(days=database.DEADLINE_OFFSET_DAYS)
+            users.append((user_id, f'user{user_id}', start_date, next_deadline, rng.uniform(1, 50)))
+
+            if rng.random() < 0.5:
+                for question in WEEKLY_EXAMS.get(week, {}).get('questions', []):
+                    for evidence_type in question.get('required_evidence', []):
+                        evidences.append((user_id, week, evidence_type))
+                exams.append((user_id, week))
+
+        conn.executemany('''
+        INSERT INTO users (user_id, username, start_date, next_deadline, total_hours)
+        VALUES (?, ?, ?, ?, ?)
+        ''', users)
+        conn.executemany('''
+        INSERT OR IGNORE INTO evidences (user_id, week, evidence_type, content, status)
+        VALUES (?, ?, ?, 'bench', 'approved')
+        ''', evidences)
+        conn.executemany('''
+        INSERT INTO exam_results (user_id, week, score, passed) VALUES (?, ?, 100, 1)
+        ''', exams)
+
+    database.user_stats_cache.clear()
+    database.week_status_cache.clear()
+
+async def run_pipeline() -> dict:
+    """Ejecutar las etapas del chequeo semanal midiendo cada una"""
+    timings = {}
+
+    started = time.perf_counter()
+    overdue = await repo.get_overdue_week_users()
+    timings['vencidos (SQL)'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    resets, deadlines = await notification_manager._find_incomplete_weeks()
+    timings['estado en lote'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await repo.reset_weeks([(user_id, max(1, week - 1)) for user_id, week in resets], deadlines)
+    timings['resets (1 transacción)'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await notification_manager._notify_week_resets(resets)
+    timings['outbox (planificar)'] = time.perf_counter() - started
+
+    # Sin el límite de 30 msg/s de Telegram: se mide el costo propio del envío concurrente
+    outbox = OutboxDispatcher(BroadcastEngine(rate=1_000_000, per_chat_interval=0))
+    outbox.bot = notification_manager.bot
+    started = time.perf_counter()
+    while await outbox.dispatch_batch():
+        pass
+    timings['outbox (enviar)'] = time.perf_counter() - started
+
+    timings['overdue'] = len(overdue)
+    timings['resets'] = len(resets)
+    # Los plazos avanzaron: la noche siguiente no hay nadie que revisar
+    timings['overdue_next_night'] = len(await repo.get_overdue_week_users())
+    return timings
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+
+    database.init_db()
+    notification_manager.bot = _FakeBot()
+    # Sin ventana de despacho: todo vence de inmediato y se mide el envío completo
+    notification_manager.dispatch_window = 0
+
+    print(f"📁 Base temporal: {os.environ['DB_FILE']}")
+    for user_count in sizes:
+        populate(user_count)
+        notification_manager.bot.sent = 0
+
+        started = time.perf_counter()
+        timings = asyncio.run(run_pipeline())
+        total = time.perf_counter() - started
+
+        print(f"\n👥 {user_count:,} usuarios → {timings.pop('overdue'):,} vencidos, "
+              f"{timings.pop('resets'):,} reseteados, {notification_manager.bot.sent:,} avisos; "
+              f"{timings.pop('overdue_next_night'):,} vencidos al repetir el chequeo")
+        for stage, seconds in timings.items():
+            print(f"   • {stage:<24} {seconds * 1000:9.1f} ms")
+        print(f"   ⏱️ total {total:.2f}s")
+
+    repo.close()
+    database.close_connections()
+    shutil.rmtree(_tmp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -10,11 +10,14 @@ from datetime import datetime, timedelta, date
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
 import random
-import sqlite3
-from config import BOT_TOKEN, MOTIVATIONAL_PHRASES, AI_MOTIVATIONAL_PHRASES, STUDY_GUIDE, TOTAL_WEEKS, POINTS_TARGET, EVIDENCE_REQUIRED, STRICT_VALIDATION, WEEK_COMPLETION_REQUIRED, AUTO_RESET_INCOMPLETE_WEEKS
-from database import init_db, update_progress, get_user_stats
-from evidence_manager import evidence_validator, exam_manager
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from config import BOT_TOKEN, DEFAULT_TIMEZONE, DAILY_STUDY_REMINDER, MOTIVATIONAL_REMINDER, MOTIVATIONAL_PHRASES, AI_MOTIVATIONAL_PHRASES, TOTAL_WEEKS, POINTS_TARGET, EVIDENCE_REQUIRED, STRICT_VALIDATION, WEEK_COMPLETION_REQUIRED, AUTO_RESET_INCOMPLETE_WEEKS
+from database import init_db, close_connections, UserStats
+from repository import repo
 from notification_manager import notification_manager
+import templates
+from http_client import http_pool
+from validation_queue import validation_queue
 
 # Configurar logging
 logging.basicConfig(
@@ -29,11 +32,27 @@ logger = logging.getLogger(__name__)
 
 class StudyMentorBot:
     def __init__(self):
-        self.app = Application.builder().token(BOT_TOKEN).build()
+        # Las notificaciones corren en el event loop de la aplicación y se
+        # inician/detienen con ella
+        self.app = (
+            Application.builder()
+            .token(BOT_TOKEN)
+            .post_init(self.startup)
+            .post_shutdown(self.shutdown)
+            .build()
+        )
         self.setup_handlers()
         
-        # Inicializar sistema de notificaciones
-        notification_manager.start_scheduler()
+    async def startup(self, application: Application):
+        """Iniciar notificaciones y workers de validación (hook post_init)"""
+        await notification_manager.start(application)
+        await validation_queue.start(application.bot)
+        
+    async def shutdown(self, application: Application):
+        """Detener notificaciones, workers y cerrar el pool HTTP (hook post_shutdown)"""
+        await notification_manager.stop(application)
+        await validation_queue.stop()
+        await http_pool.aclose()
         
     def setup_handlers(self):
         """Configurar todos los handlers del bot"""
@@ -62,6 +81,11 @@ class StudyMentorBot:
         self.app.add_handler(CommandHandler("validacion", self.check_validation))
         self.app.add_handler(CommandHandler("estado", self.week_status))
         
+        # Preferencias de notificaciones
+        self.app.add_handler(CommandHandler("zona", self.timezone_command))
+        self.app.add_handler(CommandHandler("horario", self.schedule_command))
+        self.app.add_handler(CommandHandler("resumen", self.digest_command))
+        
         # Manejo de fotos para evidencias
         self.app.add_handler(MessageHandler(filters.PHOTO, self.handle_photo_evidence))
         
@@ -82,7 +106,11 @@ class StudyMentorBot:
         username = update.effective_user.first_name
         
         # Inicializar usuario en la base de datos
-        init_db(user_id, username)
+        await repo.init_user(user_id, username)
+        
+        # Si había bloqueado el bot, vuelve a recibir notificaciones
+        if await repo.reactivate_user(user_id):
+            logger.info(f"Usuario {user_id} reactivado para notificaciones")
         
         welcome_message = f"""
 🎯 **¡Hola {username}! Soy tu Mentor de Desarrollo Web** 🚀
@@ -159,6 +187,9 @@ Estoy aquí para guiarte en tu journey de **12 semanas** hacia convertirte en un
 • 9:00 AM - Recordatorio de estudio
 • 8:00 PM - Mensaje motivacional
 • Validación automática semanal
+• `/zona [zona]` - Tu zona horaria (ej: `/zona America/Mexico_City`)
+• `/horario [HH:MM] [HH:MM]` - Hora del recordatorio y de la motivación
+• `/resumen [HH:MM|off]` - Recibir todo en un solo mensaje diario
 
 **🎯 Tu Objetivo:** 15 puntos en 12 semanas
 • 1 punto = Proyecto semanal completado
@@ -171,13 +202,132 @@ Estoy aquí para guiarte en tu journey de **12 semanas** hacia convertirte en un
         
         await update.message.reply_text(message, parse_mode='Markdown')
         
-    def calculate_current_week(self, user_id: int) -> int:
+    async def timezone_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Comando /zona - Configurar zona horaria de las notificaciones"""
+        user_id = update.effective_user.id
+        
+        if not context.args:
+            preferences = await repo.get_notification_preferences(user_id)
+            current = (preferences and preferences[0]) or DEFAULT_TIMEZONE
+            await update.message.reply_text(
+                f"🌍 **Tu zona horaria:** `{current}`\n\n"
+                "Para cambiarla usa `/zona [zona]`\n"
+                "Ejemplos: `/zona America/Mexico_City`, `/zona Europe/Madrid`",
+                parse_mode='Markdown'
+            )
+            return
+            
+        timezone_name = context.args[0]
+        try:
+            ZoneInfo(timezone_name)
+        except (ZoneInfoNotFoundError, ValueError):
+            await update.message.reply_text(
+                f"❌ Zona horaria desconocida: `{timezone_name}`\n\n"
+                "Usa el formato `Continente/Ciudad`, ej: `/zona America/Lima`",
+                parse_mode='Markdown'
+            )
+            return
+            
+        if not await repo.set_notification_preferences(user_id, timezone=timezone_name):
+            await update.message.reply_text("❌ Error: Usuario no inicializado. Envía /start primero.")
+            return
+            
+        await notification_manager.preferences_changed(user_id)
+        await update.message.reply_text(
+            f"✅ Zona horaria actualizada a `{timezone_name}`\n"
+            "Tus recordatorios llegarán a tu hora local 🔔",
+            parse_mode='Markdown'
+        )
+        
+    async def schedule_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Comando /horario - Configurar hora del recordatorio y de la motivación"""
+        user_id = update.effective_user.id
+        
+        if not context.args:
+            preferences = await repo.get_notification_preferences(user_id) or (None, None, None, None)
+            await update.message.reply_text(
+                "⏰ **Tus horarios de notificación:**\n\n"
+                f"• Recordatorio de estudio: `{preferences[1] or DAILY_STUDY_REMINDER}`\n"
+                f"• Mensaje motivacional: `{preferences[2] or MOTIVATIONAL_REMINDER}`\n\n"
+                "Para cambiarlos usa `/horario [HH:MM] [HH:MM]`\n"
+                "Ejemplo: `/horario 07:30 21:00`",
+                parse_mode='Markdown'
+            )
+            return
+            
+        try:
+            times = [f"{datetime.strptime(arg, '%H:%M'):%H:%M}" for arg in context.args[:2]]
+        except ValueError:
+            await update.message.reply_text(
+                "❌ **Formato incorrecto**\n\n"
+                "Uso: `/horario [HH:MM] [HH:MM]` (24 horas)\n"
+                "Ejemplo: `/horario 07:30 21:00`",
+                parse_mode='Markdown'
+            )
+            return
+            
+        preferences = {'reminder_time': times[0]}
+        if len(times) > 1:
+            preferences['motivational_time'] = times[1]
+            
+        if not await repo.set_notification_preferences(user_id, **preferences):
+            await update.message.reply_text("❌ Error: Usuario no inicializado. Envía /start primero.")
+            return
+            
+        await notification_manager.preferences_changed(user_id)
+        message = f"✅ Recordatorio de estudio a las `{times[0]}`"
+        if len(times) > 1:
+            message += f"\n✅ Mensaje motivacional a las `{times[1]}`"
+        await update.message.reply_text(message, parse_mode='Markdown')
+        
+    async def digest_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Comando /resumen - Agrupar las notificaciones del día en un solo mensaje"""
+        user_id = update.effective_user.id
+        
+        if not context.args:
+            preferences = await repo.get_notification_preferences(user_id) or (None, None, None, None)
+            status = f"activado a las `{preferences[3]}`" if preferences[3] else "desactivado"
+            await update.message.reply_text(
+                f"📬 **Modo resumen:** {status}\n\n"
+                "Recibe el recordatorio, la motivación y los avisos del día en un solo mensaje.\n"
+                "Actívalo con `/resumen [HH:MM]` o desactívalo con `/resumen off`\n"
+                "Ejemplo: `/resumen 08:00`",
+                parse_mode='Markdown'
+            )
+            return
+            
+        if context.args[0].lower() == 'off':
+            digest_time = None
+        else:
+            try:
+                digest_time = f"{datetime.strptime(context.args[0], '%H:%M'):%H:%M}"
+            except ValueError:
+                await update.message.reply_text(
+                    "❌ **Formato incorrecto**\n\n"
+                    "Uso: `/resumen [HH:MM]` (24 horas) o `/resumen off`\n"
+                    "Ejemplo: `/resumen 08:00`",
+                    parse_mode='Markdown'
+                )
+                return
+                
+        if not await repo.set_notification_preferences(user_id, digest_time=digest_time):
+            await update.message.reply_text("❌ Error: Usuario no inicializado. Envía /start primero.")
+            return
+            
+        await notification_manager.preferences_changed(user_id)
+        if digest_time:
+            message = f"✅ Recibirás un solo resumen diario a las `{digest_time}` 📬"
+        else:
+            message = "✅ Modo resumen desactivado: vuelves a recibir cada notificación a su hora"
+        await update.message.reply_text(message, parse_mode='Markdown')
+        
+    async def calculate_current_week(self, user_id: int) -> int:
         """Calcular semana actual basada en fecha de inicio"""
-        stats = get_user_stats(user_id)
+        stats = await repo.get_user_stats(user_id)
         if not stats:
             return 1
             
-        start_date = datetime.strptime(str(stats['start_date']), "%Y-%m-%d").date()
+        start_date = stats.start_date
         days_passed = (date.today() - start_date).days
         current_week = min((days_passed // 7) + 1, TOTAL_WEEKS)
         
@@ -194,45 +344,25 @@ Estoy aquí para guiarte en tu journey de **12 semanas** hacia convertirte en un
         # Verificar semana anterior
         previous_week = target_week - 1
         
-        # Verificar evidencias de la semana anterior
-        evidence_status = evidence_validator.get_week_evidence_status(user_id, previous_week)
-        missing_evidences = []
+        # Evidencias y examen de la semana anterior en una sola consulta
+        status = await repo.get_week_status(user_id, previous_week)
         
-        for evidence_type, status in evidence_status.items():
-            if status['status'] != 'approved':
-                missing_evidences.append(evidence_type)
-        
-        if missing_evidences:
-            return False, f"Debes completar evidencias de semana {previous_week}: {', '.join(missing_evidences)}"
+        if status.unapproved:
+            return False, f"Debes completar evidencias de semana {previous_week}: {', '.join(status.unapproved)}"
         
-        # Verificar examen de la semana anterior
-        exam_result = exam_manager.get_latest_exam_result(user_id, previous_week)
-        if not exam_result or not exam_result['passed']:
+        if not status.exam_passed:
             return False, f"Debes aprobar el examen de la semana {previous_week}"
         
         return True, "Puede estar en la semana actual"
         
     def get_week_content(self, week: int) -> dict:
         """Obtener contenido de la semana específica"""
-        return STUDY_GUIDE.get(week, {
-            "title": "Programa Completado",
-            "phase": "Job Search",
-            "goal": "¡Felicidades! Has terminado el programa",
-            "videos": "Repaso y mejoras de portfolio",
-            "tools": "LinkedIn, AngelList, Indeed",
-            "project": {
-                "name": "Búsqueda activa de empleo", 
-                "requirements": "• Aplicar a 5 posiciones diarias\n• Networking en LinkedIn\n• Mejorar portfolio"
-            },
-            "estimated_time": "Full time job hunting",
-            "tip": "¡Es hora de conseguir ese trabajo!",
-            "daily_goal": "Aplica a 5 posiciones por día"
-        })
+        return templates.week_content(week)
         
     async def current_week(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Mostrar contenido de la semana actual"""
         user_id = update.effective_user.id
-        current_week = self.calculate_current_week(user_id)
+        current_week = await self.calculate_current_week(user_id)
         
         # Verificar si puede estar en la semana actual
         can_advance, reason = await self.can_advance_to_current_week(user_id, current_week)
@@ -240,7 +370,7 @@ Estoy aquí para guiarte en tu journey de **12 semanas** hacia convertirte en un
         if not can_advance and WEEK_COMPLETION_REQUIRED:
             # Resetear a semana anterior
             previous_week = max(1, current_week - 1)
-            update_progress(user_id, 'reset_week', previous_week)
+            await repo.update_progress(user_id, 'reset_week', previous_week)
             
             message = f"""
 ⚠️ **SEMANA RESTABLECIDA**
@@ -326,16 +456,16 @@ Has completado las 12 semanas del programa.
     async def show_progress(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Mostrar progreso detallado del usuario"""
         user_id = update.effective_user.id
-        stats = get_user_stats(user_id)
+        stats = await repo.get_user_stats(user_id)
         
         if not stats:
             await update.message.reply_text("❌ No se encontraron datos. Usa /start para inicializar.")
             return
             
-        current_week = self.calculate_current_week(user_id)
+        current_week = await self.calculate_current_week(user_id)
         progress_percentage = min((current_week / TOTAL_WEEKS) * 100, 100)
         
-        points_earned = stats['projects_completed'] + (stats['concepts_mastered'] * 0.5)
+        points_earned = stats.projects_completed + (stats.concepts_mastered * 0.5)
         points_percentage = min((points_earned / POINTS_TARGET) * 100, 100)
         
         # Calcular nivel y siguiente hito
@@ -354,13 +484,13 @@ Has completado las 12 semanas del programa.
 📅 **Programa:** Semana {current_week}/{TOTAL_WEEKS} ({progress_percentage:.1f}%)
 
 🎯 **Puntos:** {points_earned:.1f}/{POINTS_TARGET} 
-• 🏆 Proyectos completados: {stats['projects_completed']} 
-• 🧠 Conceptos dominados: {stats['concepts_mastered']}
+• 🏆 Proyectos completados: {stats.projects_completed} 
+• 🧠 Conceptos dominados: {stats.concepts_mastered}
 
 📚 **Estadísticas de Estudio:**
-• ⏰ Horas totales: {stats['total_hours']:.1f}h
-• 📅 Días estudiando: {stats['study_days']}
-• 🔥 Streak actual: {stats['current_streak']} días
+• ⏰ Horas totales: {stats.total_hours:.1f}h
+• 📅 Días estudiando: {stats.study_days}
+• 🔥 Streak actual: {stats.current_streak} días
 
 📈 **Análisis de Ritmo:**
 {self.calculate_pace_feedback(current_week, points_earned)}
@@ -430,8 +560,8 @@ Has completado las 12 semanas del programa.
         user_id = update.effective_user.id
         
         # Registrar tiempo en la base de datos
-        update_progress(user_id, 'study_hours', hours)
-        stats = get_user_stats(user_id)
+        await repo.update_progress(user_id, 'study_hours', hours)
+        stats = await repo.get_user_stats(user_id)
         
         # Mensaje personalizado según las horas
         if hours >= 4:
@@ -457,9 +587,9 @@ Has completado las 12 semanas del programa.
 {reaction}
 
 ⏰ **Tiempo registrado:** {hours}h {emoji}
-📚 **Total acumulado:** {stats['total_hours']:.1f}h
-🔥 **Streak actual:** {stats['current_streak']} días
-📅 **Días estudiando:** {stats['study_days']}
+📚 **Total acumulado:** {stats.total_hours:.1f}h
+🔥 **Streak actual:** {stats.current_streak} días
+📅 **Días estudiando:** {stats.study_days}
 
 💡 **Recuerda la regla 70/30:**
 • 70% programando proyectos
@@ -475,7 +605,7 @@ Has completado las 12 semanas del programa.
     async def complete_task(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Marcar tarea como completada"""
         user_id = update.effective_user.id
-        current_week = self.calculate_current_week(user_id)
+        current_week = await self.calculate_current_week(user_id)
         week_content = self.get_week_content(current_week)
         
         # Opciones de que puede completar
@@ -505,8 +635,8 @@ Selecciona lo que lograste:
     async def motivation(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Enviar mensaje motivacional personalizado"""
         user_id = update.effective_user.id
-        stats = get_user_stats(user_id)
-        current_week = self.calculate_current_week(user_id)
+        stats = await repo.get_user_stats(user_id)
+        current_week = await self.calculate_current_week(user_id)
         
         if not stats:
             await update.message.reply_text("❌ Error: Usuario no inicializado. Envía /start primero.")
@@ -523,9 +653,9 @@ Selecciona lo que lograste:
         # Contexto personal
         personal_touches = []
         
-        current_streak = stats.get('current_streak', 0)
-        projects_completed = stats.get('projects_completed', 0)
-        total_hours = stats.get('total_hours', 0)
+        current_streak = stats.current_streak
+        projects_completed = stats.projects_completed
+        total_hours = stats.total_hours
         
         if current_streak >= 7:
             personal_touches.append(f"🔥 ¡INCREÍBLE! Llevas {current_streak} días seguidos!")
@@ -538,7 +668,7 @@ Selecciona lo que lograste:
             personal_touches.append(f"📝 {projects_completed} proyecto(s) completado(s)!")
             
         if total_hours >= 50:
-            personal_touches.append(f"⏰ ¡{stats['total_hours']:.0f} horas de dedicación!")
+            personal_touches.append(f"⏰ ¡{stats.total_hours:.0f} horas de dedicación!")
             
         if not personal_touches:
             personal_touches.append("🚀 ¡Tu journey apenas comienza!")
@@ -579,15 +709,15 @@ Selecciona lo que lograste:
     async def show_objectives(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Mostrar objetivos actuales"""
         user_id = update.effective_user.id
-        current_week = self.calculate_current_week(user_id)
+        current_week = await self.calculate_current_week(user_id)
         week_content = self.get_week_content(current_week)
-        stats = get_user_stats(user_id)
+        stats = await repo.get_user_stats(user_id)
         
         if not stats:
             await update.message.reply_text("❌ Error: Usuario no inicializado. Envía /start primero.")
             return
         
-        points_earned = stats.get('projects_completed', 0) + (stats.get('concepts_mastered', 0) * 0.5)
+        points_earned = stats.projects_completed + (stats.concepts_mastered * 0.5)
         target_this_week = current_week * 1.25
         
         message = f"""
@@ -623,7 +753,7 @@ Selecciona lo que lograste:
     async def show_resources(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Mostrar recursos de la semana actual"""
         user_id = update.effective_user.id
-        current_week = self.calculate_current_week(user_id)
+        current_week = await self.calculate_current_week(user_id)
         week_content = self.get_week_content(current_week)
         
         keyboard = [
@@ -649,8 +779,8 @@ Selecciona el tipo de recurso que necesitas:
     async def next_step(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Mostrar próximos pasos"""
         user_id = update.effective_user.id
-        current_week = self.calculate_current_week(user_id)
-        stats = get_user_stats(user_id)
+        current_week = await self.calculate_current_week(user_id)
+        stats = await repo.get_user_stats(user_id)
         
         if current_week >= TOTAL_WEEKS:
             next_steps = """
@@ -667,7 +797,7 @@ Selecciona el tipo de recurso que necesitas:
 """
         else:
             next_week_content = self.get_week_content(current_week + 1)
-            points_earned = stats['projects_completed'] + (stats['concepts_mastered'] * 0.5)
+            points_earned = stats.projects_completed + (stats.concepts_mastered * 0.5)
             
             next_steps = f"""
 🔮 **¿QUÉ SIGUE DESPUÉS?**
@@ -759,121 +889,27 @@ Selecciona el tipo de recurso que necesitas:
     
     async def show_week_videos(self, query, week: int):
         """Mostrar videos de la semana"""
-        week_content = self.get_week_content(week)
-        
-        message = f"""
-📺 **VIDEOS RECOMENDADOS - SEMANA {week}**
-
-**{week_content['title']}**
-
-{week_content['videos']}
-
-💡 **Regla de oro:**
-Pausa cada 5 minutos e intenta replicar el código sin mirar!
-
-🎯 **Regla 70/30:**
-• 70% programando proyectos
-• 30% viendo tutoriales
-
-⚡ **No copies código directamente. Entiende primero.**
-"""
-        
-        await query.edit_message_text(message, parse_mode='Markdown')
+        await query.edit_message_text(templates.week_videos_message(week), parse_mode='Markdown')
         
     async def show_week_tools(self, query, week: int):
         """Mostrar herramientas de la semana"""
-        week_content = self.get_week_content(week)
-        
-        message = f"""
-🛠️ **HERRAMIENTAS PARA PRACTICAR - SEMANA {week}**
-
-**{week_content['title']}**
-
-{week_content['tools']}
-
-🎮 **¡Importante!**
-Estas herramientas son para PRACTICAR, no solo leer.
-
-🎯 **Sugerencia:**
-Dedica mínimo 1 hora diaria a estas plataformas.
-
-💪 **¡La programación se aprende programando!**
-"""
-        
-        await query.edit_message_text(message, parse_mode='Markdown')
+        await query.edit_message_text(templates.week_tools_message(week), parse_mode='Markdown')
         
     async def show_project_details(self, query, week: int):
         """Mostrar detalles del proyecto semanal"""
-        week_content = self.get_week_content(week)
-        
-        message = f"""
-📝 **PROYECTO SEMANA {week} - DETALLES**
-
-**"{week_content['project']['name']}"**
-
-📋 **Requisitos específicos:**
-{week_content['project']['requirements']}
-
-⏰ **Tiempo estimado:** {week_content['estimated_time']}
-
-🎯 **Objetivo principal:**
-{week_content['goal']}
-
-💡 **Tip clave:**
-{week_content['tip']}
-
-🚀 **Recordatorio importante:**
-¡Haz deploy cuando termines! (Netlify, Vercel, GitHub Pages)
-
-📸 **No olvides tomar screenshots para tu portfolio**
-"""
-        
-        await query.edit_message_text(message, parse_mode='Markdown')
+        await query.edit_message_text(templates.week_project_message(week), parse_mode='Markdown')
         
     async def show_week_tip(self, query, week: int):
         """Mostrar tip de la semana"""
-        week_content = self.get_week_content(week)
-        
-        # Tips adicionales específicos por semana
-        extra_tips = {
-            1: "• Flexbox = 1 dimensión (fila O columna)\n• Grid = 2 dimensiones (filas Y columnas)\n• Practica 30 min diarios mínimo",
-            2: "• Mobile-first = diseña para 320px primero\n• Después agrega breakpoints\n• Usa rem/em en lugar de px",
-            3: "• Variables CSS van en :root\n• Úsalas para colores y espaciado\n• Mantiene consistencia",
-            4: "• Grid para layout principal\n• Flexbox para alineación interna\n• Combina ambas técnicas",
-            5: "• const para valores fijos\n• let para variables\n• Evita var por completo",
-            6: "• querySelector > getElementById\n• addEventListener > onclick\n• Valida que elementos existan",
-            7: "• fetch() devuelve promesas\n• Siempre maneja errores\n• async/await > .then()",
-            8: "• Planifica antes de codear\n• Divide en tareas pequeñas\n• Un feature a la vez"
-        }
-        
-        extra_tip = extra_tips.get(week, "• Constancia diaria\n• Más código, menos videos\n• Cada línea cuenta")
-        
-        message = f"""
-💡 **TIP DE LA SEMANA {week}**
-
-**{week_content['title']}**
-
-🎯 **Tip principal:**
-{week_content['tip']}
-
-🔥 **Tips adicionales:**
-{extra_tip}
-
-⭐ **Recuerda siempre:**
-La programación se aprende PROGRAMANDO, no viendo videos!
-
-💪 **¡Pon en práctica cada concepto inmediatamente!**
-"""
-        
-        await query.edit_message_text(message, parse_mode='Markdown')
+        await query.edit_message_text(templates.week_tip_message(week), parse_mode='Markdown')
         
     async def process_study_log_callback(self, query, hours: float):
         """Procesar registro de tiempo desde callback"""
         user_id = query.from_user.id
         
         # Registrar tiempo
-        update_progress(user_id, 'study_hours', hours)
-        stats = get_user_stats(user_id)
+        await repo.update_progress(user_id, 'study_hours', hours)
+        stats = await repo.get_user_stats(user_id)
         
         # Mensaje de confirmación
         if hours >= 3:
@@ -889,8 +925,8 @@ La programación se aprende PROGRAMANDO, no viendo videos!
 {reaction}
 
 ⏰ **Tiempo registrado:** {hours}h
-📚 **Total acumulado:** {stats['total_hours']:.1f}h
-🔥 **Streak:** {stats['current_streak']} días
+📚 **Total acumulado:** {stats.total_hours:.1f}h
+🔥 **Streak:** {stats.current_streak} días
 
 {self.check_study_milestones(stats)}
 
@@ -904,8 +940,8 @@ La programación se aprende PROGRAMANDO, no viendo videos!
         user_id = query.from_user.id
         
         # Registrar proyecto completado
-        update_progress(user_id, 'project_completed', week)
-        stats = get_user_stats(user_id)
+        await repo.update_progress(user_id, 'project_completed', week)
+        stats = await repo.get_user_stats(user_id)
         
         congratulations = [
             "🎉 ¡EXCELENTE! ¡Proyecto completado!",
@@ -915,7 +951,7 @@ La programación se aprende PROGRAMANDO, no viendo videos!
             "💪 ¡FANTÁSTICO! Buen trabajo!"
         ]
         
-        points_earned = stats['projects_completed'] + (stats['concepts_mastered'] * 0.5)
+        points_earned = stats.projects_completed + (stats.concepts_mastered * 0.5)
         
         message = f"""
 {random.choice(congratulations)}
@@ -924,7 +960,7 @@ La programación se aprende PROGRAMANDO, no viendo videos!
 
 📊 **Progreso actualizado:**
 • Puntos totales: {points_earned:.1f}/{POINTS_TARGET}
-• Proyectos: {stats['projects_completed']}
+• Proyectos: {stats.projects_completed}
 • Progreso: {(points_earned/POINTS_TARGET)*100:.1f}%
 
 🎯 **¿Qué sigue?**
@@ -942,10 +978,10 @@ La programación se aprende PROGRAMANDO, no viendo videos!
         user_id = query.from_user.id
         
         # Registrar concepto dominado
-        update_progress(user_id, 'concept_mastered', 1)
-        stats = get_user_stats(user_id)
+        await repo.update_progress(user_id, 'concept_mastered', 1)
+        stats = await repo.get_user_stats(user_id)
         
-        points_earned = stats['projects_completed'] + (stats['concepts_mastered'] * 0.5)
+        points_earned = stats.projects_completed + (stats.concepts_mastered * 0.5)
         
         message = f"""
 🧠 **¡Concepto Dominado!** +0.5 puntos
@@ -954,7 +990,7 @@ La programación se aprende PROGRAMANDO, no viendo videos!
 
 📊 **Progreso actualizado:**
 • Puntos: {points_earned:.1f}/{POINTS_TARGET}
-• Conceptos: {stats['concepts_mastered']}
+• Conceptos: {stats.concepts_mastered}
 
 💡 **Recuerda:** 
 ¡Los pequeños logros suman para el gran objetivo!
@@ -967,7 +1003,7 @@ La programación se aprende PROGRAMANDO, no viendo videos!
     async def complete_daily_callback(self, query):
         """Manejar completar objetivo diario"""
         user_id = query.from_user.id
-        current_week = self.calculate_current_week(user_id)
+        current_week = await self.calculate_current_week(user_id)
         week_content = self.get_week_content(current_week)
         
         message = f"""
@@ -1098,21 +1134,21 @@ La programación se aprende PROGRAMANDO, no viendo videos!
         
         return "🎉 ¡Todos los hitos completados!"
         
-    def get_motivational_badges(self, stats: dict) -> str:
+    def get_motivational_badges(self, stats: UserStats) -> str:
         """Obtener badges motivacionales"""
         badges = []
         
-        if stats['current_streak'] >= 10:
+        if stats.current_streak >= 10:
             badges.append("🔥 STREAK MASTER")
-        elif stats['current_streak'] >= 5:
+        elif stats.current_streak >= 5:
             badges.append("⭐ CONSISTENT")
             
-        if stats['total_hours'] >= 100:
+        if stats.total_hours >= 100:
             badges.append("⏰ CENTURY")
-        elif stats['total_hours'] >= 50:
+        elif stats.total_hours >= 50:
             badges.append("💪 DEDICATED")
             
-        if stats['projects_completed'] >= 5:
+        if stats.projects_completed >= 5:
             badges.append("🏆 BUILDER")
             
         if badges:
@@ -1120,15 +1156,15 @@ La programación se aprende PROGRAMANDO, no viendo videos!
         else:
             return "\n🌟 ¡Sigue así para desbloquear badges!"
             
-    def check_study_milestones(self, stats: dict) -> str:
+    def check_study_milestones(self, stats: UserStats) -> str:
         """Verificar hitos de estudio"""
         milestones = []
         
-        total_hours = int(stats['total_hours'])
+        total_hours = int(stats.total_hours)
         if total_hours in [10, 25, 50, 100]:
             milestones.append(f"🏆 ¡{total_hours}h milestone!")
             
-        streak = stats['current_streak']
+        streak = stats.current_streak
         if streak in [5, 10, 15, 21, 30]:
             milestones.append(f"🔥 ¡{streak} días streak!")
             
@@ -1152,26 +1188,26 @@ La programación se aprende PROGRAMANDO, no viendo videos!
         }
         return motivations.get(week, "¡Cada día te acerca más a tu objetivo!")
         
-    def get_progress_specific_advice(self, stats: dict, week: int) -> str:
+    def get_progress_specific_advice(self, stats: UserStats, week: int) -> str:
         """Consejo específico según progreso"""
-        points = stats['projects_completed'] + (stats['concepts_mastered'] * 0.5)
+        points = stats.projects_completed + (stats.concepts_mastered * 0.5)
         expected = week * 1.25
         
-        if stats['current_streak'] == 0:
+        if stats.current_streak == 0:
             return "Empieza un nuevo streak hoy. ¡30 minutos cuentan!"
         elif points < expected - 2:
             return "Enfócate en completar el proyecto semanal. ¡Prioridad!"
-        elif stats['total_hours'] < week * 10:
+        elif stats.total_hours < week * 10:
             return "Aumenta tu tiempo diario. Calidad + cantidad = éxito"
         else:
             return "¡Vas por buen camino! Mantén constancia y disciplina"
             
-    def get_week_completion_advice(self, current_week: int, stats: dict) -> str:
+    def get_week_completion_advice(self, current_week: int, stats: UserStats) -> str:
         """Consejo para completar la semana"""
         week_content = self.get_week_content(current_week)
         project_name = week_content['project']['name']
         
-        if stats['projects_completed'] < current_week:
+        if stats.projects_completed < current_week:
             return f"Termina el proyecto: {project_name}"
         else:
             return "¡Proyecto completado! Refina detalles o avanza"
@@ -1208,7 +1244,7 @@ La programación se aprende PROGRAMANDO, no viendo videos!
     async def submit_evidence(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /evidencia - Enviar evidencia de proyecto"""
         user_id = update.effective_user.id
-        current_week = self.calculate_current_week(user_id)
+        current_week = await self.calculate_current_week(user_id)
         
         # Mostrar opciones de evidencia
         keyboard = [
@@ -1242,14 +1278,14 @@ Selecciona el tipo de evidencia a enviar:
     async def handle_photo_evidence(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Manejar capturas enviadas como evidencia"""
         user_id = update.effective_user.id
-        current_week = self.calculate_current_week(user_id)
+        current_week = await self.calculate_current_week(user_id)
         
         # Obtener información de la foto
         photo = update.message.photo[-1]  # La más grande
         file = await context.bot.get_file(photo.file_id)
         
         # Validar evidencia
-        validation_result = evidence_validator.submit_evidence(
+        validation_result = await validation_queue.submit(
             user_id, current_week, "screenshot_project", f"photo_id:{photo.file_id}"
         )
         
@@ -1263,10 +1299,10 @@ Selecciona el tipo de evidencia a enviar:
     async def start_exam(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /examen - Iniciar examen semanal"""
         user_id = update.effective_user.id
-        current_week = self.calculate_current_week(user_id)
+        current_week = await self.calculate_current_week(user_id)
         
         # Verificar si puede tomar el examen
-        can_advance, reason = evidence_validator.can_advance_to_week(user_id, current_week + 1)
+        can_advance, reason = await repo.can_advance_to_week(user_id, current_week + 1)
         
         if not can_advance and STRICT_VALIDATION:
             await update.message.reply_text(
@@ -1276,7 +1312,7 @@ Selecciona el tipo de evidencia a enviar:
             return
         
         # Iniciar examen
-        exam_config, message = exam_manager.start_exam(user_id, current_week)
+        exam_config, message = await repo.start_exam(user_id, current_week)
         
         if not exam_config:
             await update.message.reply_text(f"❌ {message}", parse_mode='Markdown')
@@ -1323,13 +1359,13 @@ Selecciona tu respuesta:
     async def check_validation(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /validacion - Verificar estado de validación"""
         user_id = update.effective_user.id
-        current_week = self.calculate_current_week(user_id)
+        current_week = await self.calculate_current_week(user_id)
         
         # Verificar estado de evidencias
-        evidence_status = evidence_validator.get_week_evidence_status(user_id, current_week)
+        evidence_status = await repo.get_week_evidence_status(user_id, current_week)
         
         # Verificar último examen
-        exam_result = exam_manager.get_latest_exam_result(user_id, current_week)
+        exam_result = await repo.get_latest_exam_result(user_id, current_week)
         
         message = f"""
 🔍 **ESTADO DE VALIDACIÓN - SEMANA {current_week}**
@@ -1342,6 +1378,8 @@ Selecciona tu respuesta:
                 message += f"✅ {evidence_type}: Aprobada\n"
             elif status['status'] == 'pending_review':
                 message += f"⏳ {evidence_type}: Pendiente revisión\n"
+            elif status['status'] == 'pending':
+                message += f"⏳ {evidence_type}: Validando\n"
             elif status['status'] == 'invalid':
                 message += f"❌ {evidence_type}: Rechazada\n"
             else:
@@ -1358,7 +1396,7 @@ Selecciona tu respuesta:
             message += "⚠️ No tomado\n"
         
         # Verificar si puede avanzar
-        can_advance, reason = evidence_validator.can_advance_to_week(user_id, current_week + 1)
+        can_advance, reason = await repo.can_advance_to_week(user_id, current_week + 1)
         
         message += f"\n🚀 **ESTADO GENERAL:**\n"
         if can_advance:
@@ -1371,11 +1409,11 @@ Selecciona tu respuesta:
     async def week_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /estado - Estado completo de la semana"""
         user_id = update.effective_user.id
-        current_week = self.calculate_current_week(user_id)
+        current_week = await self.calculate_current_week(user_id)
         
         week_content = self.get_week_content(current_week)
-        evidence_status = evidence_validator.get_week_evidence_status(user_id, current_week)
-        exam_result = exam_manager.get_latest_exam_result(user_id, current_week)
+        evidence_status = await repo.get_week_evidence_status(user_id, current_week)
+        exam_result = await repo.get_latest_exam_result(user_id, current_week)
         
         # Calcular progreso
         total_requirements = len(evidence_status) + 1  # evidencias + examen
@@ -1390,6 +1428,10 @@ Selecciona tu respuesta:
         
         progress_percentage = (completed_requirements / total_requirements) * 100
         
+        # Evidencias en la cola de validación: aún sin veredicto
+        validating = len([s for s in evidence_status.values() if s['status'] == 'pending'])
+        validating_note = f" ({validating} validándose)" if validating else ""
+        
         message = f"""
 📊 **ESTADO COMPLETO - SEMANA {current_week}/12**
 
@@ -1400,7 +1442,7 @@ Selecciona tu respuesta:
 
 🎯 **PROYECTO:** {week_content['project']['name']}
 
-📸 **EVIDENCIAS:** {len([s for s in evidence_status.values() if s['status'] == 'approved'])}/{len(evidence_status)} aprobadas
+📸 **EVIDENCIAS:** {len([s for s in evidence_status.values() if s['status'] == 'approved'])}/{len(evidence_status)} aprobadas{validating_note}
 
 📝 **EXAMEN:** {"✅ Aprobado" if exam_result and exam_result['passed'] else "❌ Pendiente"}
 
@@ -1474,7 +1516,7 @@ Selecciona tu respuesta:
         
         try:
             # Reinicializar usuario completamente
-            self.reset_user_completely(user_id, username)
+            await self.reset_user_completely(user_id, username)
             
             message = f"""
 ✅ **¡REINICIO COMPLETADO!**
@@ -1510,38 +1552,15 @@ Ve a flexboxfroggy.com y completa los niveles 1-12
                 parse_mode='Markdown'
             )
             
-    def reset_user_completely(self, user_id: int, username: str):
+    async def reset_user_completely(self, user_id: int, username: str):
         """Reiniciar completamente un usuario"""
-        import sqlite3
-        
-        conn = sqlite3.connect('study_mentor.db')
-        cursor = conn.cursor()
-        
         try:
-            # Eliminar todos los registros del usuario
-            cursor.execute('DELETE FROM users WHERE user_id = ?', (user_id,))
-            cursor.execute('DELETE FROM daily_progress WHERE user_id = ?', (user_id,))
-            cursor.execute('DELETE FROM weekly_evaluations WHERE user_id = ?', (user_id,))
-            cursor.execute('DELETE FROM evidences WHERE user_id = ?', (user_id,))
-            cursor.execute('DELETE FROM exam_results WHERE user_id = ?', (user_id,))
-            
-            # Recrear usuario desde cero
-            cursor.execute('''
-                INSERT INTO users (user_id, username, start_date, current_week, total_points, 
-                                 projects_completed, concepts_mastered, total_hours, study_days, 
-                                 current_streak, last_study_date)
-                VALUES (?, ?, ?, 1, 0, 0, 0, 0, 0, 0, NULL)
-            ''', (user_id, username, date.today()))
-            
-            conn.commit()
+            await repo.reset_user(user_id, username)
             logger.info(f"Usuario {username} ({user_id}) reiniciado completamente")
             
         except Exception as e:
             logger.error(f"Error reiniciando usuario {user_id}: {e}")
-            conn.rollback()
             raise
-        finally:
-            conn.close()
             
     async def cancel_reset(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Cancelar reinicio"""
@@ -1572,7 +1591,11 @@ def main():
     logger.info("Presiona Ctrl+C para detener")
     
     # Iniciar bot
-    bot.app.run_polling()
+    try:
+        bot.app.run_polling()
+    finally:
+        repo.close()
+        close_connections()
 
 if __name__ == '__main__':
     main()
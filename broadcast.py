@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Motor de envíos masivos del Bot Mentor
+Concurrencia acotada + token bucket global (~30 msg/s de Telegram) + límite por chat + RetryAfter
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable, Optional, Tuple, Union
+
+from telegram.error import RetryAfter, TelegramError
+
+from config import (
+    NOTIFY_CONCURRENCY, BROADCAST_RATE_PER_SEC, BROADCAST_PER_CHAT_INTERVAL, BROADCAST_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        """Inicializar bucket: `rate` tokens por segundo, ráfaga máxima `capacity`"""
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Detener todos los envíos (flood wait de Telegram afecta a todo el bot)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+    async def acquire(self):
+        """Esperar hasta disponer de un token"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    self._updated = time.monotonic()
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+@dataclass(slots=True)
+class BroadcastReport:
+    """Resultado de un envío masivo"""
+    name: str
+    sent: int = 0
+    skipped: int = 0
+    failed: int = 0
+    retries: int = 0
+    duration: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Mensajes enviados por segundo"""
+        return self.sent / self.duration if self.duration else 0.0
+
+    def summary(self) -> str:
+        """Resumen de una línea para el log"""
+        return (f"Broadcast '{self.name}': {self.sent} enviados, {self.failed} fallidos, "
+                f"{self.skipped} omitidos, {self.retries} reintentos en {self.duration:.1f}s "
+                f"({self.throughput:.1f} msg/s)")
+
+class BroadcastEngine:
+    def __init__(self, rate: float = BROADCAST_RATE_PER_SEC, per_chat_interval: float = BROADCAST_PER_CHAT_INTERVAL,
+                 concurrency: int = NOTIFY_CONCURRENCY, max_retries: int = BROADCAST_MAX_RETRIES):
+        """Inicializar motor de envíos con límites globales y por chat"""
+        self.bucket = TokenBucket(rate)
+        self.per_chat_interval = per_chat_interval
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._chat_next_send = {}  # chat_id -> instante mínimo del siguiente envío
+
+    async def _wait_for_chat(self, chat_id: int):
+        """Respetar el intervalo mínimo entre mensajes al mismo chat"""
+        now = time.monotonic()
+        next_send = self._chat_next_send.get(chat_id, 0.0)
+        self._chat_next_send[chat_id] = max(now, next_send) + self.per_chat_interval
+        if next_send > now:
+            await asyncio.sleep(next_send - now)
+
+        # Evitar que el diccionario crezca sin límite con chats ya liberados
+        if len(self._chat_next_send) > 10000:
+            self._chat_next_send = {c: t for c, t in self._chat_next_send.items() if t > now}
+
+    async def deliver(self, bot, chat_id: int, text: str, report: BroadcastReport = None, **kwargs):
+        """Enviar un mensaje respetando los límites; reintenta ante RetryAfter y propaga otros errores"""
+        await self._wait_for_chat(chat_id)
+
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                return
+            except RetryAfter as e:
+                logger.warning(f"Flood wait de Telegram: pausa de {e.retry_after}s (chat {chat_id})")
+                self.bucket.pause(e.retry_after)
+                if report:
+                    report.retries += 1
+                if attempt == self.max_retries:
+                    raise
+
+    async def broadcast(self, bot, name: str, recipients: Iterable[Tuple[int, object]],
+                        build_message: Callable[[int, object], Awaitable[Union[str, dict, None]]],
+                        on_result: Callable[[int, object, Optional[TelegramError]], None] = None,
+                        **kwargs) -> BroadcastReport:
+        """Enviar a todos los destinatarios (chat_id, contexto) con `concurrency` workers
+
+        build_message devuelve el texto, un dict de argumentos de send_message o None (omitir);
+        on_result(chat_id, contexto, error) recibe el resultado de cada envío (error None si salió)
+        """
+        report = BroadcastReport(name)
+        started = time.monotonic()
+        pending = iter(recipients)
+
+        async def worker():
+            # Los workers comparten el iterador: sin crear una tarea por destinatario
+            for chat_id, context in pending:
+                try:
+                    message = await build_message(chat_id, context)
+                except Exception as e:
+                    logger.error(f"Error generando mensaje '{name}' para {chat_id}: {e}")
+                    report.failed += 1
+                    continue
+                if message is None:
+                    report.skipped += 1
+                    continue
+                if isinstance(message, str):
+                    message = {'text': message}
+
+                error = None
+                try:
+                    await self.deliver(bot, chat_id, report=report, **{**kwargs, **message})
+                    report.sent += 1
+                except TelegramError as e:
+                    logger.error(f"Error enviando mensaje '{name}' a {chat_id}: {e}")
+                    report.failed += 1
+                    error = e
+                if on_result:
+                    on_result(chat_id, context, error)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+        report.duration = time.monotonic() - started
+        logger.info(report.summary())
+        return report
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Caché en memoria LRU + TTL para lecturas frecuentes de la base de datos
+Las escrituras invalidan por usuario; los contadores de aciertos ayudan a dimensionarla
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Centinela para distinguir "no está en caché" de un valor None guardado
+MISSING = object()
+
+class LRUTTLCache:
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        """Inicializar caché acotada por tamaño (LRU) y antigüedad (TTL en segundos)"""
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expira_en, valor)
+        self._lock = threading.Lock()
+        # Cada invalidación sube la versión: un llenado que empezó antes se descarta
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Obtener valor vigente o default"""
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is not MISSING and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def version(self) -> int:
+        """Versión actual; pasarla a set() al terminar de leer la BD"""
+        return self._version
+
+    def set(self, key, value, version: int = None):
+        """Guardar valor; si hubo una invalidación desde `version`, se ignora"""
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        """Eliminar todas las entradas de un usuario (claves que empiezan por user_id)"""
+        with self._lock:
+            self._version += 1
+            for key in [k for k in self._data if k[0] == user_id]:
+                del self._data[key]
+
+    def invalidate_users(self, user_ids):
+        """Invalidar muchos usuarios en una sola pasada (escrituras por lote)"""
+        user_ids = set(user_ids)
+        with self._lock:
+            self._version += 1
+            for key in [k for k in self._data if k[0] in user_ids]:
+                del self._data[key]
+
+    def clear(self):
+        """Vaciar la caché"""
+        with self._lock:
+            self._version += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Contadores para dimensionar la caché"""
+        total = self.hits + self.misses
+        return {
+            'name': self.name,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+def cache_report(*caches: LRUTTLCache) -> str:
+    """Resumen de una línea por caché para el log"""
+    return " | ".join(
+        f"{s['name']}: {s['size']}/{s['maxsize']} entradas, "
+        f"{s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.0%}), {s['evictions']} expulsiones"
+        for s in (c.stats() for c in caches)
+    )
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+🧪 Verificación del cliente de GitHub contra un servidor local que imita la API
+Cubre la reserva de cuota (X-RateLimit-*), el límite secundario (Retry-After), las
+consultas GraphQL por lote, la validación REST sin token y que la cola difiera los trabajos
+sin cuota en vez de darles un veredicto, sin tocar api.github.com
+
+Uso: python check_github_client.py
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+# La base y el token se configuran antes de importar los módulos del bot
+_tmp_dir = tempfile.mkdtemp(prefix='check_github_')
+os.environ['DB_FILE'] = os.path.join(_tmp_dir, 'check.db')
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:check')
+
+import database
+import evidence_manager
+from evidence_manager import evidence_validator, validation_cache
+from github_client import GitHubClient, GitHubRateLimitError
+from http_client import http_pool
+from validation_queue import validation_queue
+
+# Repositorios del stub: 'usuario/repo' -> tamaño en KB
+REPOSITORIES = {'ana/portfolio': 120, 'ana/vacio': 0}
+# Reserva y espera máxima de las verificaciones (segundos cortos para que corra rápido)
+RESERVE = 2
+MAX_WAIT = 3
+
+class StubState:
+    """Respuestas programadas y registro de lo que recibió el stub"""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.requests = []  # (método, ruta, Authorization, instante)
+        self.remaining = 100
+        self.reset_in = 60  # Segundos hasta el reinicio de cuota que anuncia el stub
+        self.retry_after = None  # Próxima respuesta REST: 403 con Retry-After
+        self.exhausted = False  # Próxima respuesta REST: 403 con X-RateLimit-Remaining: 0
+        self.graphql_error = None  # Error que no es NOT_FOUND en la próxima consulta GraphQL
+
+stub = StubState()
+
+class StubHandler(BaseHTTPRequestHandler):
+    def _send(self, status: int, body: dict, resource: str = 'core', headers: dict = None):
+        """Responder JSON con las cabeceras de cuota de GitHub"""
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('X-RateLimit-Remaining', str(stub.remaining))
+        self.send_header('X-RateLimit-Reset', str(int(time.time() + stub.reset_in)))
+        self.send_header('X-RateLimit-Resource', resource)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _log(self):
+        stub.requests.append((self.command, self.path, self.headers.get('Authorization'), time.time()))
+
+    def do_GET(self):
+        """REST: /repos/usuario/repo"""
+        self._log()
+        if stub.retry_after is not None:
+            retry_after, stub.retry_after = stub.retry_after, None
+            self._send(403, {'message': 'secondary rate limit'}, headers={'Retry-After': str(retry_after)})
+            return
+        if stub.exhausted:
+            stub.exhausted, stub.remaining = False, 0
+            self._send(403, {'message': 'API rate limit exceeded'})
+            return
+        stub.remaining -= 1
+        path = self.path.removeprefix('/repos/')
+        if path in REPOSITORIES:
+            self._send(200, {'full_name': path, 'size': REPOSITORIES[path]})
+        else:
+            self._send(404, {'message': 'Not Found'})
+
+    def do_POST(self):
+        """GraphQL: un alias rN por repositorio con variables oN/nN"""
+        self._log()
+        stub.remaining -= 1
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        variables = body['variables']
+        data, errors = {}, []
+        for i in range(len(variables) // 2):
+            path = f"{variables[f'o{i}']}/{variables[f'n{i}']}"
+            if path in REPOSITORIES:
+                data[f'r{i}'] = {'diskUsage': REPOSITORIES[path]}
+            else:
+                data[f'r{i}'] = None
+                errors.append({'type': 'NOT_FOUND', 'path': [f'r{i}'], 'message': f'Could not resolve {path}'})
+        if stub.graphql_error:
+            errors.append({'type': stub.graphql_error, 'message': 'stub error'})
+            stub.graphql_error = None
+        self._send(200, {'data': data, 'errors': errors}, resource='graphql')
+
+    def log_message(self, *args):
+        pass
+
+def start_stub() -> str:
+    """Levantar el stub en un puerto libre y devolver su URL base"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+def make_client(base_url: str, token: str = None) -> GitHubClient:
+    """Cliente apuntando al stub (la URL base configurable es la de GitHub Enterprise)"""
+    return GitHubClient(token=token, api_url=base_url, graphql_url=f"{base_url}/graphql",
+                        reserve=RESERVE, max_wait=MAX_WAIT, batch_size=2)
+
+def check(label: str, condition: bool):
+    """Mostrar y exigir una verificación"""
+    print(f"   {'✅' if condition else '❌'} {label}")
+    assert condition, label
+
+async def check_quota_reserve(base_url: str):
+    """X-RateLimit-Remaining en la reserva: espera al reinicio; si tarda más que MAX_WAIT, falla"""
+    print("📉 Reserva de cuota (X-RateLimit-Remaining / Reset)")
+    stub.reset()
+    client = make_client(base_url, token='secreto')
+
+    stub.remaining, stub.reset_in = RESERVE + 1, 1.5
+    async with client.stream('/repos/ana/portfolio') as response:
+        await response.aread()
+    check("la cuota de la respuesta queda registrada", client._limits['core'][0] == RESERVE)
+    check("el token viaja como Bearer", stub.requests[-1][2] == 'Bearer secreto')
+
+    started = time.monotonic()
+    async with client.stream('/repos/ana/portfolio'):
+        pass
+    waited = time.monotonic() - started
+    check(f"en la reserva espera al reinicio ({waited:.1f}s)", waited >= 0.5)
+
+    stub.remaining, stub.reset_in = RESERVE, 3600
+    async with client.stream('/repos/ana/portfolio'):
+        pass
+    sent = len(stub.requests)
+    try:
+        async with client.stream('/repos/ana/portfolio'):
+            pass
+        raised = False
+    except GitHubRateLimitError:
+        raised = True
+    check("reinicio más lejano que la espera máxima: GitHubRateLimitError", raised)
+    check("y la petición no llega a salir", len(stub.requests) == sent)
+
+async def check_secondary_limit(base_url: str):
+    """403 con Retry-After: GitHubRateLimitError con el instante de reintento y la siguiente
+    petición espera lo indicado; 403 con la cuota en 0: reintento en el reinicio"""
+    print("🚦 Límite secundario (Retry-After) y cuota agotada (403)")
+    stub.reset()
+    client = make_client(base_url, token='secreto')
+
+    stub.retry_after = 1
+    try:
+        async with client.stream('/repos/ana/portfolio'):
+            pass
+        retry_at = None
+    except GitHubRateLimitError as e:
+        retry_at = e.retry_at
+    check("403 con Retry-After: GitHubRateLimitError", retry_at is not None and 0 < retry_at - time.time() <= 1)
+    started = time.monotonic()
+    async with client.stream('/repos/ana/portfolio') as response:
+        status = response.status_code
+    waited = time.monotonic() - started
+    check(f"la siguiente petición espera el Retry-After ({waited:.1f}s)", waited >= 0.9 and status == 200)
+
+    stub.exhausted, stub.reset_in = True, 3600
+    try:
+        async with client.stream('/repos/ana/portfolio'):
+            pass
+        retry_at = None
+    except GitHubRateLimitError as e:
+        retry_at = e.retry_at
+    check("403 con la cuota en 0: reintento en X-RateLimit-Reset",
+          retry_at is not None and abs(retry_at - (time.time() + 3600)) < 5)
+
+async def check_graphql_batch(base_url: str):
+    """Lote GraphQL con repos existentes y NOT_FOUND; otro tipo de error invalida el lote"""
+    print("📦 Consulta GraphQL por lote")
+    stub.reset()
+    client = make_client(base_url, token='secreto')
+
+    paths = ['ana/portfolio', 'ana/vacio', 'ana/privado']
+    repositories = await client.get_repositories(paths)
+    check("existentes con su tamaño", repositories['ana/portfolio'] == {'size': 120}
+          and repositories['ana/vacio'] == {'size': 0})
+    check("NOT_FOUND como no existe o privado", repositories['ana/privado'] is None)
+    posts = [request for request in stub.requests if request[0] == 'POST']
+    check(f"3 repositorios en lotes de 2: {len(posts)} consultas", len(posts) == 2)
+    check("la cuota GraphQL se registra aparte", 'graphql' in client._limits and 'core' not in client._limits)
+
+    stub.graphql_error = 'FORBIDDEN'
+    try:
+        await client.get_repositories(paths[:2])
+        raised = False
+    except httpx.HTTPError as e:
+        raised = 'stub error' in str(e)
+    check("un error distinto de NOT_FOUND invalida el lote", raised)
+
+    stub.graphql_error = 'RATE_LIMITED'
+    try:
+        await client.get_repositories(paths[:2])
+        raised = False
+    except GitHubRateLimitError:
+        raised = True
+    check("RATE_LIMITED en GraphQL: GitHubRateLimitError", raised)
+
+    # Integración con el validador: veredictos en el mismo orden y caché de los resultados
+    stub.reset()
+    evidence_manager.github_client = client
+    validation_cache.clear()
+    urls = [f"https://github.com/{path}" for path in paths] + ['https://gitlab.com/ana/x']
+    results = await evidence_validator.validate_github_repos(urls)
+    check("veredictos: aprobado, vacío, no encontrado, URL inválida",
+          [result['status'] for result in results] == ['approved', 'invalid', 'invalid', 'invalid'])
+    await evidence_validator.validate_github_repos(urls)
+    check("repetir el lote sale de la caché (sin consultas nuevas)",
+          len([request for request in stub.requests if request[0] == 'POST']) == 2)
+
+async def check_rest_fallback(base_url: str):
+    """Sin token no hay GraphQL: una petición REST por repositorio"""
+    print("🔓 Sin token: REST por repositorio")
+    stub.reset()
+    client = make_client(base_url)
+    evidence_manager.github_client = client
+    validation_cache.clear()
+
+    check("sin token no se agrupa", not client.can_batch)
+    results = await evidence_validator.validate_github_repos(
+        ['https://github.com/ana/portfolio', 'https://github.com/Ana/Privado.git']
+    )
+    check("veredictos: aprobado y no encontrado",
+          [result['status'] for result in results] == ['approved', 'invalid'])
+    check("dos GET a /repos sin Authorization",
+          sorted((method, path, auth) for method, path, auth, _ in stub.requests) ==
+          [('GET', '/repos/ana/portfolio', None), ('GET', '/repos/ana/privado', None)])
+
+async def check_queue_deferral(base_url: str):
+    """Sin cuota, el trabajo vuelve a la cola hasta el reinicio: sin veredicto ni intento gastado"""
+    print("⏸️ Cola: trabajo diferido por cuota agotada")
+    stub.reset()
+    client = make_client(base_url, token='secreto')
+    evidence_manager.github_client = client
+    validation_cache.clear()
+
+    stub.remaining, stub.reset_in = RESERVE, 3600
+    async with client.stream('/repos/ana/portfolio'):
+        pass
+    url = 'https://github.com/ana/portfolio'
+    job_id = evidence_validator.record_evidence(7, 1, 'github_repository', url, True)
+    job = evidence_validator.claim_validation_job()
+    await validation_queue._process(job)
+
+    conn = database.get_connection()
+    state, attempts, not_before = conn.execute(
+        'SELECT state, attempts, not_before FROM validation_jobs WHERE id = ?', (job_id,)
+    ).fetchone()
+    status, = conn.execute(
+        "SELECT status FROM evidences WHERE user_id = 7 AND week = 1 AND evidence_type = 'github_repository'"
+    ).fetchone()
+    check("el trabajo vuelve a 'pending' sin gastar el intento", state == 'pending' and attempts == 0)
+    check("no se toma antes del reinicio", abs(not_before - (time.time() + 3600)) < 5
+          and evidence_validator.claim_validation_job() is None)
+    check("la evidencia sigue validándose (sin revisión manual)", status == 'pending')
+    check("métricas: 1 diferido", validation_queue.metrics.deferred == 1)
+
+async def run_checks(base_url: str):
+    try:
+        await check_quota_reserve(base_url)
+        await check_secondary_limit(base_url)
+        await check_graphql_batch(base_url)
+        await check_rest_fallback(base_url)
+        await check_queue_deferral(base_url)
+    finally:
+        await http_pool.aclose()
+
+def main():
+    base_url = start_stub()
+    print(f"🛰️ Stub de la API de GitHub en {base_url}")
+    try:
+        asyncio.run(run_checks(base_url))
+        print("✅ Cliente de GitHub verificado")
+    finally:
+        database.close_connections()
+        shutil.rmtree(_tmp_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,25 @@ load_dotenv()
 BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN') or os.getenv('BOT_TOKEN')
 CHAT_ID = os.getenv('CHAT_ID')  # Tu chat ID específico
 
+# Base de datos SQLite (una conexión persistente por hilo, modo WAL)
+DB_FILE = os.getenv('DB_FILE', 'study_mentor.db')
+DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', '8192'))  # Caché de páginas por conexión
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(64 * 1024 * 1024)))  # Bytes mapeados en memoria
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))  # Espera máxima por bloqueos
+DB_READ_THREADS = int(os.getenv('DB_READ_THREADS', '2'))  # Hilos lectores del repositorio asíncrono
+
+# Write-behind: agrupar actualizaciones de progreso en transacciones por lotes
+WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+WRITE_BEHIND_FLUSH_MS = int(os.getenv('WRITE_BEHIND_FLUSH_MS', '500'))  # Ventana de durabilidad
+WRITE_BEHIND_MAX_BATCH = int(os.getenv('WRITE_BEHIND_MAX_BATCH', '200'))  # Flush anticipado al llegar a N
+
+# Caché en memoria de estadísticas y estado semanal por usuario
+STATS_CACHE_SIZE = int(os.getenv('STATS_CACHE_SIZE', '4096'))  # Entradas máximas (LRU)
+STATS_CACHE_TTL = int(os.getenv('STATS_CACHE_TTL', '300'))  # Segundos
+WEEK_STATUS_CACHE_SIZE = int(os.getenv('WEEK_STATUS_CACHE_SIZE', '4096'))
+WEEK_STATUS_CACHE_TTL = int(os.getenv('WEEK_STATUS_CACHE_TTL', '300'))
+STATS_PAGE_SIZE = int(os.getenv('STATS_PAGE_SIZE', '500'))  # Usuarios por página en recorridos masivos
+
 # Sistema de Validación y Evidencias
 EVIDENCE_REQUIRED = True  # Exigir evidencias para completar tareas
 STRICT_VALIDATION = True  # No avanzar sin completar semana actual
@@ -14,6 +33,33 @@ EXAM_THRESHOLD = 0.7  # 70% mínimo para aprobar exámenes
 WEEK_COMPLETION_REQUIRED = True  # Debe completar TODO para avanzar
 AUTO_RESET_INCOMPLETE_WEEKS = True  # Restablecer si no completa semana
 
+# Cliente HTTP de validación de evidencias (pool compartido con keep-alive)
+EVIDENCE_HTTP_MAX_CONNECTIONS = int(os.getenv('EVIDENCE_HTTP_MAX_CONNECTIONS', '20'))  # Conexiones abiertas en total
+EVIDENCE_HTTP_MAX_PER_HOST = int(os.getenv('EVIDENCE_HTTP_MAX_PER_HOST', '4'))  # Peticiones simultáneas a un mismo host
+EVIDENCE_HTTP_CONNECT_TIMEOUT = float(os.getenv('EVIDENCE_HTTP_CONNECT_TIMEOUT', '5'))  # Segundos para conectar (TCP/TLS)
+EVIDENCE_HTTP_READ_TIMEOUT = float(os.getenv('EVIDENCE_HTTP_READ_TIMEOUT', '10'))  # Segundos esperando datos
+EVIDENCE_HTTP_KEEPALIVE = float(os.getenv('EVIDENCE_HTTP_KEEPALIVE', '30'))  # Segundos que vive una conexión ociosa
+EVIDENCE_BODY_MAX_BYTES = int(os.getenv('EVIDENCE_BODY_MAX_BYTES', '262144'))  # Bytes del cuerpo inspeccionados por URL (256 KiB)
+
+# Cola de validación de evidencias: la respuesta al usuario es inmediata y el veredicto llega después
+EVIDENCE_WORKERS = int(os.getenv('EVIDENCE_WORKERS', '4'))  # Validaciones simultáneas por instancia
+EVIDENCE_JOB_MAX_ATTEMPTS = int(os.getenv('EVIDENCE_JOB_MAX_ATTEMPTS', '3'))  # Intentos ante errores inesperados
+EVIDENCE_JOB_RETENTION_DAYS = int(os.getenv('EVIDENCE_JOB_RETENTION_DAYS', '7'))  # Días que se guardan los ya resueltos
+
+# Caché de resultados de validación por URL normalizada (reenvíos de la misma URL/repo)
+EVIDENCE_CACHE_SIZE = int(os.getenv('EVIDENCE_CACHE_SIZE', '2048'))  # Entradas máximas (LRU)
+EVIDENCE_CACHE_TTL = int(os.getenv('EVIDENCE_CACHE_TTL', '600'))  # Segundos que un resultado aprobado se reutiliza sin consultar
+EVIDENCE_CACHE_NEGATIVE_TTL = int(os.getenv('EVIDENCE_CACHE_NEGATIVE_TTL', '60'))  # Ídem para rechazos (el usuario suele estar corrigiendo)
+EVIDENCE_CACHE_RETENTION = int(os.getenv('EVIDENCE_CACHE_RETENTION', '86400'))  # Segundos que se guarda ETag/Last-Modified para revalidar
+
+# API de GitHub (validación de repositorios)
+GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')  # Opcional: 5000 peticiones/h en vez de 60 y consultas GraphQL por lote
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')  # GitHub Enterprise: https://host/api/v3
+GITHUB_GRAPHQL_URL = os.getenv('GITHUB_GRAPHQL_URL', f'{GITHUB_API_URL}/graphql')  # GitHub Enterprise: https://host/api/graphql
+GITHUB_RATE_LIMIT_RESERVE = int(os.getenv('GITHUB_RATE_LIMIT_RESERVE', '5'))  # Peticiones que se dejan sin usar antes del reinicio de cuota
+GITHUB_RATE_LIMIT_MAX_WAIT = int(os.getenv('GITHUB_RATE_LIMIT_MAX_WAIT', '30'))  # Segundos máximos esperando cuota en el worker; más, el trabajo vuelve a la cola hasta el reinicio
+GITHUB_GRAPHQL_BATCH = int(os.getenv('GITHUB_GRAPHQL_BATCH', '50'))  # Repositorios por consulta GraphQL
+
 EVIDENCE_TYPES = [
     "screenshot_project",  # Captura del proyecto funcionando
     "deployed_url",        # URL del proyecto desplegado
@@ -24,11 +70,30 @@ EVIDENCE_TYPES = [
 # Configuración de la guía de estudio
 TOTAL_WEEKS = 12
 POINTS_TARGET = 15
+DEFAULT_TIMEZONE = os.getenv('TIMEZONE', 'America/Bogota')  # Zona de usuarios sin preferencia
 DAILY_STUDY_REMINDER = "09:00"  # 9 AM
 WEEKLY_CHECK_REMINDER = "18:00"  # 6 PM viernes
 MOTIVATIONAL_REMINDER = "20:00"  # 8 PM
+STREAK_DECAY_TIME = "00:05"  # Reinicio diario de streaks vencidos
 DAILY_NOTIFICATIONS = True  # Activar notificaciones diarias
 WEEK_DEADLINE_DAYS = 7  # Días para completar una semana
+NOTIFY_CONCURRENCY = int(os.getenv('NOTIFY_CONCURRENCY', '20'))  # Envíos simultáneos en tareas masivas
+BROADCAST_RATE_PER_SEC = float(os.getenv('BROADCAST_RATE_PER_SEC', '30'))  # Límite global de Telegram
+BROADCAST_PER_CHAT_INTERVAL = float(os.getenv('BROADCAST_PER_CHAT_INTERVAL', '1.0'))  # Segundos entre mensajes a un chat
+BROADCAST_MAX_RETRIES = int(os.getenv('BROADCAST_MAX_RETRIES', '3'))  # Reintentos ante RetryAfter
+NOTIFY_DISPATCH_WINDOW = float(os.getenv('NOTIFY_DISPATCH_WINDOW', '30'))  # Minutos en que se reparten los envíos programados (0 = todos a la vez)
+
+# Outbox persistente de notificaciones (sobrevive reinicios a mitad de envío)
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '500'))  # Mensajes por lote del despachador
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5'))  # Intentos antes de marcar 'failed'
+OUTBOX_BACKOFF_BASE = float(os.getenv('OUTBOX_BACKOFF_BASE', '30'))  # Segundos; se duplica por intento
+OUTBOX_BACKOFF_MAX = float(os.getenv('OUTBOX_BACKOFF_MAX', '3600'))
+OUTBOX_RETENTION_DAYS = int(os.getenv('OUTBOX_RETENTION_DAYS', '7'))  # Días que se guardan los ya resueltos
+
+# Elección de líder: con varias instancias solo una ejecuta el scheduler y el outbox
+LEADER_LEASE_TTL = float(os.getenv('LEADER_LEASE_TTL', '30'))  # Segundos sin heartbeat antes de que otra tome el control
+LEADER_HEARTBEAT_INTERVAL = float(os.getenv('LEADER_HEARTBEAT_INTERVAL', '10'))  # Debe ser bastante menor que el TTL
+SLOT_REFRESH_INTERVAL = float(os.getenv('SLOT_REFRESH_INTERVAL', '900'))  # Respaldo: el líder recarga horarios creados en otras instancias
 
 # Frases motivacionales
 MOTIVATIONAL_PHRASES = [
@@ -1,105 +1,212 @@
+import logging
 import sqlite3
-from datetime import datetime, date
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, date, timedelta
+from typing import Optional
 import json
+from config import (
+    DB_FILE, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_BUSY_TIMEOUT_MS,
+    WRITE_BEHIND_ENABLED, WRITE_BEHIND_FLUSH_MS, WRITE_BEHIND_MAX_BATCH,
+    STATS_CACHE_SIZE, STATS_CACHE_TTL, WEEK_STATUS_CACHE_SIZE, WEEK_STATUS_CACHE_TTL,
+    TOTAL_WEEKS, WEEK_DEADLINE_DAYS
+)
+from cache import LRUTTLCache
+from migrations import run_migrations
+from write_behind import ProgressWriteQueue
 
-DB_FILE = 'study_mentor.db'
+logger = logging.getLogger(__name__)
 
-def init_db(user_id=None, username=None):
-    """Inicializar base de datos y usuario"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # Crear tabla de usuarios
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        user_id INTEGER PRIMARY KEY,
-        username TEXT,
-        start_date DATE,
-        current_week INTEGER DEFAULT 1,
-        total_points REAL DEFAULT 0,
-        projects_completed INTEGER DEFAULT 0,
-        concepts_mastered INTEGER DEFAULT 0,
-        total_hours REAL DEFAULT 0,
-        study_days INTEGER DEFAULT 0,
-        current_streak INTEGER DEFAULT 0,
-        last_study_date DATE,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+# Pool de conexiones: una conexión persistente por hilo
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+_schema_ready = False
+
+# Cachés por usuario: claves (user_id, ...) para poder invalidar por usuario
+user_stats_cache = LRUTTLCache('user_stats', STATS_CACHE_SIZE, STATS_CACHE_TTL)
+week_status_cache = LRUTTLCache('week_status', WEEK_STATUS_CACHE_SIZE, WEEK_STATUS_CACHE_TTL)
+
+@dataclass(slots=True)
+class UserStats:
+    """Estadísticas de un usuario (una fila de users con columnas explícitas)"""
+    user_id: int
+    username: Optional[str]
+    start_date: Optional[date]
+    current_week: int
+    total_points: float
+    projects_completed: int
+    concepts_mastered: int
+    total_hours: float
+    study_days: int
+    current_streak: int
+    last_study_date: Optional[date]
+
+# Orden de columnas que espera UserStats; agregar columnas a users no rompe las consultas
+USER_STATS_COLUMNS = ', '.join(UserStats.__dataclass_fields__)
+
+# Usuarios que reciben notificaciones
+ACTIVE_USERS_FILTER = '(total_hours > 0 OR projects_completed > 0)'
+
+# Usuarios a los que se les puede escribir (no bloquearon el bot ni borraron el chat)
+REACHABLE_FILTER = 'active = 1'
+
+# Columna de horario preferido de cada tipo de notificación programada
+NOTIFICATION_TIME_COLUMNS = {
+    'daily_reminder': 'reminder_time',
+    'motivational': 'motivational_time',
+    'digest': 'digest_time'
+}
+
+# Con digest_time definido, las notificaciones del usuario se agrupan en un solo mensaje
+DIGEST_KIND = 'digest'
+
+def _next_due_day(after_day: int) -> int:
+    """Primer día (desde start_date) posterior a `after_day` en que el chequeo semanal puede resetear la semana"""
+    # Semana w = min(días // 7 + 1, TOTAL_WEEKS); vence cuando días > (w - 1) * 7 + WEEK_DEADLINE_DAYS
+    for week in range(1, TOTAL_WEEKS + 1):
+        first_day = max((week - 1) * 7 + WEEK_DEADLINE_DAYS + 1, after_day + 1)
+        if week == TOTAL_WEEKS or first_day <= week * 7 - 1:
+            return first_day
+
+# Plazo inicial: next_deadline = start_date + DEADLINE_OFFSET_DAYS
+DEADLINE_OFFSET_DAYS = _next_due_day(-1)
+_DEADLINE_MODIFIER = f'+{DEADLINE_OFFSET_DAYS} days'
+
+def next_week_deadline(today: date, days: int, reset: bool = False) -> date:
+    """Próximo chequeo tras revisar la semana en `today` (día `days` desde start_date);
+    tras un reset hay WEEK_DEADLINE_DAYS de margen para completarla"""
+    after_day = days + WEEK_DEADLINE_DAYS - 1 if reset else days
+    return today + timedelta(days=_next_due_day(after_day) - days)
+
+def _parse_date(value) -> Optional[date]:
+    """Convertir una fecha guardada como texto ISO"""
+    return datetime.strptime(str(value), "%Y-%m-%d").date() if value else None
+
+def _user_stats_row(cursor: sqlite3.Cursor, row: tuple) -> UserStats:
+    """Row factory: construir UserStats desde una fila de USER_STATS_COLUMNS"""
+    (user_id, username, start_date, current_week, total_points, projects_completed,
+     concepts_mastered, total_hours, study_days, current_streak, last_study_date) = row
+    return UserStats(
+        user_id, username, _parse_date(start_date), current_week, total_points,
+        projects_completed, concepts_mastered, total_hours, study_days,
+        current_streak, _parse_date(last_study_date)
     )
-    ''')
+
+def _open_connection() -> sqlite3.Connection:
+    """Abrir conexión con WAL y pragmas ajustados"""
+    # check_same_thread=False solo para poder cerrarla al apagar; cada hilo usa la suya
+    conn = sqlite3.connect(DB_FILE, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA cache_size=-{DB_CACHE_SIZE_KB}')
+    conn.execute(f'PRAGMA mmap_size={DB_MMAP_SIZE}')
+    conn.execute(f'PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}')
+    return conn
+
+def get_connection() -> sqlite3.Connection:
+    """Obtener la conexión compartida del hilo actual (se abre una sola vez)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _open_connection()
+        _local.conn = conn
+        with _connections_lock:
+            _connections.append(conn)
+    return conn
+
+def close_connections():
+    """Cerrar todas las conexiones del pool (al apagar el bot)"""
+    # Confirmar primero las escrituras write-behind pendientes
+    progress_queue.stop()
     
-    # Crear tabla de progreso diario
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS daily_progress (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        date DATE,
-        hours_studied REAL DEFAULT 0,
-        tasks_completed TEXT,
-        notes TEXT,
-        FOREIGN KEY (user_id) REFERENCES users (user_id)
-    )
-    ''')
+    with _connections_lock:
+        for conn in _connections:
+            conn.close()
+        _connections.clear()
+    _local.__dict__.pop('conn', None)
+
+def init_db(user_id=None, username=None):
+    """Inicializar base de datos y usuario"""
+    global _schema_ready
+    conn = get_connection()
     
-    # Crear tabla de evaluaciones semanales
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS weekly_evaluations (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        week_number INTEGER,
-        project_completed BOOLEAN DEFAULT 0,
-        difficulty_level INTEGER,
-        concepts_learned TEXT,
-        next_week_focus TEXT,
-        evaluation_date DATE,
-        FOREIGN KEY (user_id) REFERENCES users (user_id)
-    )
-    ''')
+    # Aplicar migraciones pendientes una sola vez por proceso
+    if not _schema_ready:
+        run_migrations(conn)
+        _sync_deadlines(conn)
+        progress_queue.start()
+        _schema_ready = True
     
     # Si se proporciona user_id, crear/actualizar usuario
     if user_id:
-        cursor.execute('''
-        INSERT OR IGNORE INTO users (user_id, username, start_date) 
-        VALUES (?, ?, ?)
-        ''', (user_id, username, date.today()))
-    
-    conn.commit()
-    conn.close()
+        today = date.today()
+        with conn:
+            conn.execute('''
+            INSERT OR IGNORE INTO users (user_id, username, start_date, next_deadline) 
+            VALUES (?, ?, ?, ?)
+            ''', (user_id, username, today, today + timedelta(days=DEADLINE_OFFSET_DAYS)))
+
+def _sync_deadlines(conn: sqlite3.Connection):
+    """Adelantar al primer plazo posible los next_deadline anteriores a él (configuración nueva);
+    los plazos ya avanzados por el chequeo semanal y los NULL (programa terminado) no se tocan"""
+    with conn:
+        cursor = conn.execute('''
+        UPDATE users SET next_deadline = date(start_date, ?)
+        WHERE next_deadline < date(start_date, ?)
+        ''', (_DEADLINE_MODIFIER, _DEADLINE_MODIFIER))
+    if cursor.rowcount:
+        logger.info(f"next_deadline recalculado para {cursor.rowcount} usuarios")
 
 def update_progress(user_id: int, progress_type: str, value):
     """Actualizar progreso del usuario"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+    if progress_queue.enabled:
+        # Modo write-behind: se confirma en el siguiente lote
+        progress_queue.enqueue(user_id, progress_type, value)
+        return
     
-    today = date.today()
+    conn = get_connection()
+    
+    with conn:
+        _apply_progress(conn.cursor(), user_id, progress_type, value, date.today())
+    user_stats_cache.invalidate_user(user_id)
+
+def _flush_progress_batch(batch: list):
+    """Aplicar un lote de mutaciones pendientes en una sola transacción"""
+    conn = get_connection()
     
+    with conn:
+        cursor = conn.cursor()
+        for op in batch:
+            _apply_progress(cursor, op.user_id, op.progress_type, op.value, op.day)
+    
+    user_stats_cache.invalidate_users(op.user_id for op in batch)
+
+def _apply_progress(cursor: sqlite3.Cursor, user_id: int, progress_type: str, value, today: date):
+    """Escribir una mutación de progreso usando el cursor de la transacción actual"""
     if progress_type == 'study_hours':
-        # Verificar si ya estudió hoy
-        cursor.execute('''
-        SELECT last_study_date FROM users WHERE user_id = ?
-        ''', (user_id,))
-        
-        result = cursor.fetchone()
-        last_date = result[0] if result else None
-        is_new_day = str(last_date) != str(today)
-        
-        # Actualizar horas de estudio
+        # Actualizar horas de estudio; el streak sigue si estudió ayer y se reinicia
+        # si hubo un hueco (el valor guardado puede estar vencido, ver decay_streaks)
         cursor.execute('''
         UPDATE users 
         SET total_hours = total_hours + ?, 
-            last_study_date = ?,
-            study_days = study_days + ?,
+            study_days = study_days + CASE WHEN last_study_date = ? THEN 0 ELSE 1 END,
             current_streak = CASE 
-                WHEN ? THEN current_streak + 1 
-                ELSE current_streak 
-            END
+                WHEN last_study_date = ? THEN current_streak
+                WHEN last_study_date = ? THEN current_streak + 1 
+                ELSE 1 
+            END,
+            last_study_date = ?
         WHERE user_id = ?
-        ''', (value, today, 1 if is_new_day else 0, is_new_day, user_id))
+        ''', (value, today, today, today - timedelta(days=1), today, user_id))
         
-        # Registrar en progreso diario
+        # Registrar en progreso diario (una fila por usuario y día)
         cursor.execute('''
-        INSERT OR REPLACE INTO daily_progress (user_id, date, hours_studied)
-        VALUES (?, ?, COALESCE((SELECT hours_studied FROM daily_progress WHERE user_id = ? AND date = ?), 0) + ?)
-        ''', (user_id, today, user_id, today, value))
+        INSERT INTO daily_progress (user_id, date, hours_studied)
+        VALUES (?, ?, ?)
+        ON CONFLICT (user_id, date) DO UPDATE
+        SET hours_studied = hours_studied + excluded.hours_studied
+        ''', (user_id, today, value))
         
     elif progress_type == 'project_completed':
         cursor.execute('''
@@ -119,83 +226,433 @@ def update_progress(user_id: int, progress_type: str, value):
         ''', (user_id,))
         
     elif progress_type == 'reset_week':
+        # Tras el reset hay WEEK_DEADLINE_DAYS de margen antes del próximo chequeo
         cursor.execute('''
         UPDATE users 
-        SET current_week = ?
+        SET current_week = ?, next_deadline = MAX(date(start_date, ?), ?)
         WHERE user_id = ?
-        ''', (value, user_id))
-    
-    conn.commit()
-    conn.close()
+        ''', (value, _DEADLINE_MODIFIER, today + timedelta(days=WEEK_DEADLINE_DAYS), user_id))
+
+progress_queue = ProgressWriteQueue(
+    _flush_progress_batch,
+    enabled=WRITE_BEHIND_ENABLED,
+    flush_interval_ms=WRITE_BEHIND_FLUSH_MS,
+    max_batch=WRITE_BEHIND_MAX_BATCH
+)
+
+def _overlay_progress(stats: UserStats, op) -> None:
+    """Aplicar en memoria una mutación pendiente (mismo efecto que _apply_progress)"""
+    if op.progress_type == 'study_hours':
+        if stats.last_study_date != op.day:
+            stats.study_days += 1
+            continues = stats.last_study_date == op.day - timedelta(days=1)
+            stats.current_streak = stats.current_streak + 1 if continues else 1
+        stats.total_hours += op.value
+        stats.last_study_date = op.day
+    elif op.progress_type == 'project_completed':
+        stats.projects_completed += 1
+        stats.total_points += 1
+        stats.current_week = op.value
+    elif op.progress_type == 'concept_mastered':
+        stats.concepts_mastered += 1
+        stats.total_points += 0.5
+    elif op.progress_type == 'reset_week':
+        stats.current_week = op.value
+
+def _expire_streak(stats: UserStats, today: date):
+    """Streak vencido si no estudió ayer; se calcula al leer, sin escribir"""
+    if stats.last_study_date and (today - stats.last_study_date).days > 1:
+        stats.current_streak = 0
 
-def get_user_stats(user_id: int) -> dict:
+def get_user_stats(user_id: int) -> Optional[UserStats]:
     """Obtener estadísticas del usuario"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+    today = date.today()
+    cache_key = (user_id, today)
     
-    cursor.execute('''
-    SELECT * FROM users WHERE user_id = ?
-    ''', (user_id,))
+    # Lectura consistente: BD/caché + mutaciones write-behind aún no confirmadas
+    with progress_queue.read_view(user_id) as pending:
+        stats = user_stats_cache.get(cache_key)
+        
+        if stats is None:
+            version = user_stats_cache.version()
+            cursor = get_connection().cursor()
+            cursor.row_factory = _user_stats_row
+            cursor.execute(f'''
+            SELECT {USER_STATS_COLUMNS} FROM users WHERE user_id = ?
+            ''', (user_id,))
+            
+            stats = cursor.fetchone()
+            
+            if stats:
+                _expire_streak(stats, today)
+                user_stats_cache.set(cache_key, stats, version)
+    
+    if stats and pending:
+        # La entrada de caché es compartida: el overlay se aplica sobre una copia
+        stats = replace(stats)
+        for op in pending:
+            _overlay_progress(stats, op)
+    
+    return stats
+
+def get_user_stats_page(after_user_id: int, limit: int, slot: tuple = None, shard: tuple = None) -> list:
+    """Página de UserStats de usuarios activos y alcanzables con user_id > after_user_id (paginación por clave)
     
-    user_data = cursor.fetchone()
+    slot = (tipo, timezone, hora) limita la página a los usuarios de un horario de notificación
+    shard = (partes, parte) limita la página a los usuarios con user_id % partes == parte
+    """
+    today = date.today()
+    conditions, params = [ACTIVE_USERS_FILTER, REACHABLE_FILTER, 'user_id > ?'], [after_user_id]
+    if slot:
+        kind, timezone, at = slot
+        conditions += ['timezone IS ?', f'{NOTIFICATION_TIME_COLUMNS[kind]} IS ?']
+        params += [timezone, at]
+        if kind != DIGEST_KIND:
+            # Quien usa el resumen recibe estos mensajes dentro de él
+            conditions.append('digest_time IS NULL')
+    if shard:
+        conditions.append('user_id % ? = ?')
+        params += list(shard)
+    
+    cursor = get_connection().cursor()
+    cursor.row_factory = _user_stats_row
+    cursor.execute(f'''
+    SELECT {USER_STATS_COLUMNS} FROM users
+    WHERE {' AND '.join(conditions)}
+    ORDER BY user_id
+    LIMIT ?
+    ''', params + [limit])
+    
+    page = cursor.fetchall()
+    for stats in page:
+        _expire_streak(stats, today)
     
-    if user_data:
-        # Verificar streak actual
-        last_date = datetime.strptime(str(user_data[10]), "%Y-%m-%d").date() if user_data[10] else None
-        current_streak = user_data[9]
+    return page
+
+def decay_streaks(today: date = None) -> int:
+    """Poner en 0 los streaks vencidos de todos los usuarios en una sola sentencia"""
+    today = today or date.today()
+    conn = get_connection()
+    
+    with conn:
+        cursor = conn.execute('''
+        UPDATE users SET current_streak = 0
+        WHERE current_streak > 0 AND last_study_date < ?
+        ''', (today - timedelta(days=1),))
+    
+    return cursor.rowcount
+
+def get_overdue_week_users(today: date = None) -> list:
+    """Usuarios activos con el plazo vencido: (user_id, username, semana, días desde el inicio, vencida)"""
+    today = today or date.today()
+    conn = get_connection()
+    
+    # El índice parcial de next_deadline limita el recorrido a los usuarios con plazo vencido;
+    # luego se aplica la regla exacta: semana = min(días // 7 + 1, TOTAL_WEEKS) y
+    # el plazo vence cuando días > (semana - 1) * 7 + WEEK_DEADLINE_DAYS. Los que no la
+    # cumplen (reset manual, cambio de configuración) solo necesitan un plazo nuevo
+    cursor = conn.execute(f'''
+    SELECT user_id, username, week, days, days > (week - 1) * 7 + ? FROM (
+        SELECT user_id, username, days, MIN(days / 7 + 1, ?) AS week
+        FROM (
+            SELECT user_id, username,
+                   CAST(julianday(?) - julianday(start_date) AS INTEGER) AS days
+            FROM users
+            WHERE next_deadline <= ? AND {ACTIVE_USERS_FILTER}
+        )
+    )
+    ''', (WEEK_DEADLINE_DAYS, TOTAL_WEEKS, today, today))
+    
+    return cursor.fetchall()
+
+def reset_weeks(resets: list, deadlines: list = ()) -> int:
+    """Aplicar muchos reset_week [(user_id, semana)] y los próximos plazos [(user_id, next_deadline)]
+    del chequeo semanal en una sola transacción"""
+    if not resets and not deadlines:
+        return 0
+    # Un reset_week pendiente en write-behind no debe pisar este
+    progress_queue.flush()
+    conn = get_connection()
+    
+    with conn:
+        conn.executemany('''
+        UPDATE users SET current_week = ? WHERE user_id = ?
+        ''', [(week, user_id) for user_id, week in resets])
+        conn.executemany('''
+        UPDATE users SET next_deadline = ? WHERE user_id = ?
+        ''', [(deadline, user_id) for user_id, deadline in deadlines])
+    
+    user_stats_cache.invalidate_users(user_id for user_id, _ in resets)
+    
+    return len(resets)
+
+def set_notification_preferences(user_id: int, **preferences) -> bool:
+    """Guardar zona horaria, horarios y/o resumen (timezone, reminder_time, motivational_time, digest_time);
+    False si no existe el usuario"""
+    allowed = {'timezone', *NOTIFICATION_TIME_COLUMNS.values()}
+    columns = [column for column in preferences if column in allowed]
+    if not columns:
+        return False
+    conn = get_connection()
+    
+    with conn:
+        cursor = conn.execute(f'''
+        UPDATE users SET {', '.join(f'{column} = ?' for column in columns)} WHERE user_id = ?
+        ''', [preferences[column] for column in columns] + [user_id])
         
-        # Si no estudió ayer, resetear streak
-        if last_date and (date.today() - last_date).days > 1:
-            current_streak = 0
-            cursor.execute('''
-            UPDATE users SET current_streak = 0 WHERE user_id = ?
-            ''', (user_id,))
-            conn.commit()
+        # Al desactivar el resumen, lo que estaba retenido se envía de inmediato
+        if 'digest_time' in columns and preferences['digest_time'] is None:
+            conn.execute('''
+            UPDATE notification_outbox SET state = 'pending', next_attempt_at = ?
+            WHERE user_id = ? AND state = 'held'
+            ''', (time.time(), user_id))
         
-        conn.close()
+    return cursor.rowcount > 0
+
+def get_notification_preferences(user_id: int) -> Optional[tuple]:
+    """(timezone, reminder_time, motivational_time, digest_time) del usuario; NULL = valor por defecto"""
+    return get_connection().execute('''
+    SELECT timezone, reminder_time, motivational_time, digest_time FROM users WHERE user_id = ?
+    ''', (user_id,)).fetchone()
+
+def get_notification_slots(kind: str) -> list:
+    """Combinaciones distintas (timezone, hora) de los usuarios activos para un tipo de notificación"""
+    column = NOTIFICATION_TIME_COLUMNS[kind]
+    # El resumen solo existe para quien lo eligió; el resto de tipos, para quien no lo usa
+    digest_filter = 'digest_time IS NOT NULL' if kind == DIGEST_KIND else 'digest_time IS NULL'
+    return get_connection().execute(f'''
+    SELECT DISTINCT timezone, {column} FROM users
+    WHERE {ACTIVE_USERS_FILTER} AND {REACHABLE_FILTER} AND {digest_filter}
+    ''').fetchall()
+
+def enqueue_notifications(kind: str, day: date, messages: list) -> int:
+    """Agregar mensajes [(user_id, payload, next_attempt_at)] al outbox; se ignoran los repetidos (usuario, tipo, día)
+    y los de usuarios inaccesibles. Para usuarios con resumen quedan retenidos ('held') hasta su hora"""
+    conn = get_connection()
+    
+    with conn:
+        before = conn.total_changes
+        conn.executemany(f'''
+        INSERT OR IGNORE INTO notification_outbox (user_id, kind, day, payload, next_attempt_at, state)
+        SELECT user_id, ?, ?, ?, ?, CASE WHEN digest_time IS NULL THEN 'pending' ELSE 'held' END
+        FROM users WHERE user_id = ? AND {REACHABLE_FILTER}
+        ''', [(kind, day, payload, due, user_id) for user_id, payload, due in messages])
         
-        return {
-            'user_id': user_data[0],
-            'username': user_data[1],
-            'start_date': user_data[2],
-            'current_week': user_data[3],
-            'total_points': user_data[4],
-            'projects_completed': user_data[5],
-            'concepts_mastered': user_data[6],
-            'total_hours': user_data[7],
-            'study_days': user_data[8],
-            'current_streak': current_streak,
-            'last_study_date': last_date
-        }
+    return conn.total_changes - before
+
+def get_held_notifications(user_ids: list) -> dict:
+    """Mensajes retenidos para el resumen: {user_id: [(id, payload)]} en orden de llegada"""
+    held = {}
+    if not user_ids:
+        return held
     
-    conn.close()
-    return {}
+    rows = get_connection().execute(f'''
+    SELECT user_id, id, payload FROM notification_outbox
+    WHERE state = 'held' AND user_id IN ({', '.join('?' * len(user_ids))})
+    ORDER BY id
+    ''', list(user_ids)).fetchall()
+    for user_id, notification_id, payload in rows:
+        held.setdefault(user_id, []).append((notification_id, payload))
+        
+    return held
+
+def enqueue_digests(day: date, digests: list) -> int:
+    """Agregar resúmenes [(user_id, payload, next_attempt_at, ids_retenidos)] y marcar como agrupados los mensajes incluidos"""
+    conn = get_connection()
+    added = 0
+    
+    with conn:
+        for user_id, payload, due, merged_ids in digests:
+            cursor = conn.execute('''
+            INSERT OR IGNORE INTO notification_outbox (user_id, kind, day, payload, next_attempt_at)
+            VALUES (?, ?, ?, ?, ?)
+            ''', (user_id, DIGEST_KIND, day, payload, due))
+            # Si el resumen del día ya existía, lo retenido espera al siguiente
+            if not cursor.rowcount:
+                continue
+            added += 1
+            conn.executemany('''
+            UPDATE notification_outbox SET state = 'merged', sent_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND state = 'held'
+            ''', [(notification_id,) for notification_id in merged_ids])
+            
+    return added
+
+def claim_notifications(limit: int) -> list:
+    """Tomar hasta `limit` mensajes vencidos y marcarlos en envío: [(id, user_id, kind, payload, attempts)]"""
+    conn = get_connection()
+    
+    now = time.time()
+    
+    with conn:
+        rows = conn.execute('''
+        SELECT id, user_id, kind, payload, attempts FROM notification_outbox
+        WHERE state = 'pending' AND next_attempt_at <= ?
+        ORDER BY next_attempt_at
+        LIMIT ?
+        ''', (now, limit)).fetchall()
+        
+        conn.executemany('''
+        UPDATE notification_outbox SET state = 'sending', claimed_at = ? WHERE id = ?
+        ''', [(now, row[0]) for row in rows])
+        
+    return rows
+
+def complete_notifications(sent_ids: list, retries: list, failures: list):
+    """Registrar el resultado de un lote: enviados, reintentos [(id, next_attempt_at, error)] y fallidos [(id, error)]"""
+    conn = get_connection()
+    
+    with conn:
+        conn.executemany('''
+        UPDATE notification_outbox
+        SET state = 'sent', attempts = attempts + 1, sent_at = CURRENT_TIMESTAMP, last_error = NULL
+        WHERE id = ?
+        ''', [(notification_id,) for notification_id in sent_ids])
+        conn.executemany('''
+        UPDATE notification_outbox
+        SET state = 'pending', attempts = attempts + 1, next_attempt_at = ?, last_error = ?
+        WHERE id = ?
+        ''', [(next_attempt_at, error, notification_id) for notification_id, next_attempt_at, error in retries])
+        conn.executemany('''
+        UPDATE notification_outbox
+        SET state = 'failed', attempts = attempts + 1, last_error = ?
+        WHERE id = ?
+        ''', [(error, notification_id) for notification_id, error in failures])
+
+def requeue_inflight_notifications(claimed_before: float) -> int:
+    """Devolver a pendientes los mensajes en envío tomados antes de `claimed_before` (epoch): su
+    proceso murió a mitad de lote. Los más recientes pueden seguir enviándose en otra instancia"""
+    conn = get_connection()
+    
+    with conn:
+        cursor = conn.execute('''
+        UPDATE notification_outbox SET state = 'pending'
+        WHERE state = 'sending' AND (claimed_at IS NULL OR claimed_at < ?)
+        ''', (claimed_before,))
+        
+    return cursor.rowcount
+
+def next_notification_due(inflight_timeout: float) -> Optional[float]:
+    """Instante (epoch) del próximo mensaje pendiente o de cuando un mensaje en envío se
+    considerará abandonado (`inflight_timeout` segundos tras tomarlo); None si no hay ninguno"""
+    row = get_connection().execute('''
+    SELECT MIN(due) FROM (
+        SELECT MIN(next_attempt_at) AS due FROM notification_outbox WHERE state = 'pending'
+        UNION ALL
+        SELECT MIN(COALESCE(claimed_at, 0)) + ? FROM notification_outbox WHERE state = 'sending'
+    )
+    ''', (inflight_timeout,)).fetchone()
+    
+    return row[0]
+
+def purge_notifications(before: date) -> int:
+    """Eliminar mensajes enviados, agrupados en un resumen, fallidos o retenidos sin resumen
+    (el usuario dejó el modo resumen o quedó fuera de los envíos) de días anteriores a `before`"""
+    conn = get_connection()
+    
+    with conn:
+        cursor = conn.execute('''
+        DELETE FROM notification_outbox WHERE state IN ('sent', 'merged', 'failed', 'held') AND day < ?
+        ''', (before,))
+        
+    return cursor.rowcount
+
+def deactivate_users(user_ids: list, reason: str) -> int:
+    """Marcar chats inaccesibles y descartar sus mensajes pendientes; devuelve cuántos se desactivaron"""
+    if not user_ids:
+        return 0
+    conn = get_connection()
+    params = [(user_id,) for user_id in user_ids]
+    
+    with conn:
+        before = conn.total_changes
+        conn.executemany('''
+        UPDATE users SET active = 0, blocked_at = CURRENT_TIMESTAMP WHERE user_id = ? AND active = 1
+        ''', params)
+        deactivated = conn.total_changes - before
+        
+        # Lo que quedaba en cola para ellos fallaría igual
+        conn.executemany('''
+        UPDATE notification_outbox SET state = 'failed', last_error = ?
+        WHERE user_id = ? AND state IN ('pending', 'held')
+        ''', [(reason, user_id) for user_id in user_ids])
+        
+    return deactivated
+
+def reactivate_user(user_id: int) -> bool:
+    """Volver a incluir en los envíos a un usuario que nos escribió de nuevo; True si estaba inactivo"""
+    conn = get_connection()
+    
+    with conn:
+        cursor = conn.execute('''
+        UPDATE users SET active = 1, blocked_at = NULL WHERE user_id = ? AND active = 0
+        ''', (user_id,))
+        
+    return cursor.rowcount > 0
+
+def get_delivery_counts() -> dict:
+    """Usuarios alcanzables vs. inaccesibles (cada inaccesible es un envío ahorrado por broadcast)"""
+    row = get_connection().execute(f'''
+    SELECT COALESCE(SUM(active = 1), 0), COALESCE(SUM(active = 0), 0),
+           COALESCE(SUM(active = 0 AND blocked_at >= datetime('now', '-1 day')), 0)
+    FROM users WHERE {ACTIVE_USERS_FILTER}
+    ''').fetchone()
+    
+    return {'reachable': row[0], 'blocked': row[1], 'blocked_last_day': row[2]}
+
+def acquire_lease(name: str, holder: str, ttl: float) -> bool:
+    """Tomar o renovar el lease `name` por `ttl` segundos; False si otra instancia lo tiene vigente"""
+    now = time.time()
+    conn = get_connection()
+    
+    # Una sola sentencia: el upsert solo pisa el lease si es propio o ya venció
+    with conn:
+        cursor = conn.execute('''
+        INSERT INTO scheduler_lease (name, holder, expires_at, acquired_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (name) DO UPDATE SET
+            acquired_at = CASE WHEN holder = excluded.holder THEN acquired_at ELSE excluded.acquired_at END,
+            holder = excluded.holder,
+            expires_at = excluded.expires_at
+        WHERE holder = excluded.holder OR expires_at < ?
+        ''', (name, holder, now + ttl, now, now))
+        
+    return cursor.rowcount > 0
+
+def release_lease(name: str, holder: str) -> bool:
+    """Liberar el lease si es propio (la siguiente instancia lo toma sin esperar el TTL)"""
+    conn = get_connection()
+    
+    with conn:
+        cursor = conn.execute('''
+        DELETE FROM scheduler_lease WHERE name = ? AND holder = ?
+        ''', (name, holder))
+        
+    return cursor.rowcount > 0
 
 def save_weekly_evaluation(user_id: int, week: int, evaluation_data: dict):
     """Guardar evaluación semanal"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+    conn = get_connection()
     
-    cursor.execute('''
-    INSERT OR REPLACE INTO weekly_evaluations 
-    (user_id, week_number, project_completed, difficulty_level, concepts_learned, next_week_focus, evaluation_date)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        user_id, 
-        week, 
-        evaluation_data.get('project_completed', False),
-        evaluation_data.get('difficulty_level', 3),
-        evaluation_data.get('concepts_learned', ''),
-        evaluation_data.get('next_week_focus', ''),
-        date.today()
-    ))
-    
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        INSERT OR REPLACE INTO weekly_evaluations 
+        (user_id, week_number, project_completed, difficulty_level, concepts_learned, next_week_focus, evaluation_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            user_id, 
+            week, 
+            evaluation_data.get('project_completed', False),
+            evaluation_data.get('difficulty_level', 3),
+            evaluation_data.get('concepts_learned', ''),
+            evaluation_data.get('next_week_focus', ''),
+            date.today()
+        ))
 
 def get_weekly_evaluation(user_id: int, week: int) -> dict:
     """Obtener evaluación de una semana específica"""
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -203,7 +660,6 @@ def get_weekly_evaluation(user_id: int, week: int) -> dict:
     ''', (user_id, week))
     
     evaluation = cursor.fetchone()
-    conn.close()
     
     if evaluation:
         return {
@@ -219,7 +675,7 @@ def get_weekly_evaluation(user_id: int, week: int) -> dict:
 
 def get_study_history(user_id: int, days: int = 7) -> list:
     """Obtener historial de estudio de los últimos N días"""
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -230,22 +686,54 @@ def get_study_history(user_id: int, days: int = 7) -> list:
     ''', (user_id, days))
     
     history = cursor.fetchall()
-    conn.close()
     
     return history
 
 def get_all_users() -> list:
     """Obtener todos los usuarios activos para recordatorios"""
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection()
     cursor = conn.cursor()
     
-    cursor.execute('''
+    cursor.execute(f'''
     SELECT user_id, username FROM users 
-    WHERE total_hours > 0 OR projects_completed > 0
+    WHERE {ACTIVE_USERS_FILTER} AND {REACHABLE_FILTER}
     ORDER BY last_study_date DESC
     ''')
     
     users = cursor.fetchall()
-    conn.close()
     
     return users
+
+def reset_user(user_id: int, username: str):
+    """Eliminar todo el progreso de un usuario y empezar desde cero (conserva sus preferencias)"""
+    # Lo pendiente en write-behind no debe reaparecer después del reinicio
+    progress_queue.flush()
+    conn = get_connection()
+    today = date.today()
+    
+    with conn:
+        cursor = conn.cursor()
+        
+        # Eliminar todos los registros del usuario
+        cursor.execute('DELETE FROM daily_progress WHERE user_id = ?', (user_id,))
+        cursor.execute('DELETE FROM weekly_evaluations WHERE user_id = ?', (user_id,))
+        cursor.execute('DELETE FROM evidences WHERE user_id = ?', (user_id,))
+        cursor.execute('DELETE FROM exam_results WHERE user_id = ?', (user_id,))
+        # Validaciones y avisos en cola hablan del progreso anterior; los enviados se
+        # conservan para no repetir las notificaciones de hoy
+        cursor.execute('DELETE FROM validation_jobs WHERE user_id = ?', (user_id,))
+        cursor.execute("DELETE FROM notification_outbox WHERE user_id = ? AND state != 'sent'", (user_id,))
+        
+        # Progreso desde cero; zona horaria, horarios, resumen y estado de entrega se mantienen
+        cursor.execute('''
+            INSERT INTO users (user_id, username, start_date, next_deadline)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE
+            SET username = excluded.username, start_date = excluded.start_date, current_week = 1,
+                total_points = 0, projects_completed = 0, concepts_mastered = 0, total_hours = 0,
+                study_days = 0, current_streak = 0, last_study_date = NULL,
+                next_deadline = excluded.next_deadline
+        ''', (user_id, username, today, today + timedelta(days=DEADLINE_OFFSET_DAYS)))
+    
+    user_stats_cache.invalidate_user(user_id)
+    week_status_cache.invalidate_user(user_id)
@@ -1,98 +1,254 @@
-import sqlite3
+import asyncio
 import json
-import requests
+import httpx
 import re
+import time
+from dataclasses import dataclass
 from datetime import datetime, date
-from config import WEEKLY_EXAMS, EVIDENCE_VALIDATION, EXAM_THRESHOLD, EVIDENCE_REQUIRED
-from database import get_user_stats, update_progress
+from typing import AsyncContextManager, Awaitable, Callable, Optional
+from config import (
+    WEEKLY_EXAMS, EVIDENCE_VALIDATION, EXAM_THRESHOLD, EVIDENCE_REQUIRED, EVIDENCE_CACHE_SIZE,
+    EVIDENCE_CACHE_TTL, EVIDENCE_CACHE_NEGATIVE_TTL, EVIDENCE_CACHE_RETENTION, EVIDENCE_BODY_MAX_BYTES
+)
+from database import get_user_stats, update_progress, get_connection, init_db, week_status_cache
+from cache import LRUTTLCache, MISSING
+from week_status import get_week_status, sync_week_requirements
+from http_client import http_pool
+from github_client import github_client, GitHubRateLimitError
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Tipos que requieren peticiones HTTP: se validan en la cola de segundo plano
+QUEUED_EVIDENCE_TYPES = {"deployed_url", "github_repository"}
+
+MANUAL_REVIEW_MESSAGE = "No se pudo validar automáticamente. Requiere revisión manual."
+
+GITHUB_URL_PATTERN = re.compile(r'https://github\.com/[^/]+/[^/]+')
+
+DEFAULT_PAGE_INDICATORS = [
+    "welcome to nginx",
+    "default web page",
+    "it works!",
+    "apache default page"
+]
+# Todos los indicadores en una sola pasada sobre los bytes (son ASCII: IGNORECASE basta)
+DEFAULT_PAGE_PATTERN = re.compile(
+    b"|".join(re.escape(indicator.encode()) for indicator in DEFAULT_PAGE_INDICATORS), re.IGNORECASE
+)
+# Bytes que se arrastran entre trozos para no perder un indicador partido en dos
+DEFAULT_PAGE_OVERLAP = max(len(indicator) for indicator in DEFAULT_PAGE_INDICATORS) - 1
+
+@dataclass(slots=True)
+class CachedValidation:
+    """Resultado de validar una URL y los validadores HTTP para revalidarlo con una petición condicional"""
+    result: dict
+    fresh_until: float  # time.monotonic(); hasta entonces se reutiliza sin consultar
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def conditional_headers(self) -> dict:
+        """Cabeceras If-None-Match / If-Modified-Since (vacías si el servidor no dio validadores)"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+# Se conserva más allá de la vigencia del resultado: vencido, aún sirve para revalidar con 304
+validation_cache = LRUTTLCache('validation', EVIDENCE_CACHE_SIZE, EVIDENCE_CACHE_RETENTION)
+
+def normalize_url(url: str) -> str:
+    """Clave de caché: esquema y host en minúsculas, sin puerto por defecto, fragmento ni '/' final"""
+    parsed = httpx.URL(url.strip())
+    port = f":{parsed.port}" if parsed.port else ""
+    query = f"?{parsed.query.decode('ascii')}" if parsed.query else ""
+    return f"{parsed.scheme}://{parsed.host}{port}{parsed.path.rstrip('/')}{query}"
+
+def github_repo_path(url: str) -> str:
+    """'usuario/repo' de una URL de GitHub (GitHub no distingue mayúsculas; sin '.git' ni subrutas)"""
+    owner, name = httpx.URL(url.strip()).path.strip('/').split('/')[:2]
+    return f"{owner}/{name.removesuffix('.git')}".lower()
+
 class EvidenceValidator:
     def __init__(self):
         """Inicializar validador de evidencias"""
         self.setup_evidence_db()
+        # Cómo se resolvió cada validación HTTP: caché vigente, 304 o descarga completa
+        self.cache_counts = {'fresh': 0, 'revalidated': 0, 'fetched': 0}
     
     def setup_evidence_db(self):
-        """Crear tabla para evidencias"""
-        conn = sqlite3.connect('study_mentor.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS evidences (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                week INTEGER,
-                evidence_type TEXT,
-                content TEXT,
-                status TEXT DEFAULT 'pending',
-                submitted_date DATE DEFAULT CURRENT_DATE,
-                reviewed_date DATE,
-                score REAL,
-                feedback TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS exam_results (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                week INTEGER,
-                exam_type TEXT DEFAULT 'weekly',
-                score REAL,
-                passed BOOLEAN,
-                attempt_number INTEGER DEFAULT 1,
-                exam_date DATE DEFAULT CURRENT_DATE,
-                answers TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Crear tablas de evidencias y exámenes (vía migraciones del esquema)"""
+        init_db()
+        sync_week_requirements()
     
-    def submit_evidence(self, user_id: int, week: int, evidence_type: str, content: str):
-        """Enviar evidencia para validación"""
-        conn = sqlite3.connect('study_mentor.db')
-        cursor = conn.cursor()
-        
-        # Verificar si ya existe evidencia para esta semana/tipo
-        cursor.execute('''
-            SELECT id FROM evidences 
-            WHERE user_id = ? AND week = ? AND evidence_type = ?
-        ''', (user_id, week, evidence_type))
+    async def submit_evidence(self, user_id: int, week: int, evidence_type: str, content: str):
+        """Enviar evidencia para validación (la validación HTTP no bloquea el event loop)"""
+        self.record_evidence(user_id, week, evidence_type, content)
         
-        existing = cursor.fetchone()
+        return await self.validate_evidence(user_id, week, evidence_type, content)
+    
+    def record_evidence(self, user_id: int, week: int, evidence_type: str, content: str, enqueue: bool = False):
+        """Guardar evidencia como pendiente (solo base de datos); con `enqueue` también su trabajo de validación"""
+        conn = get_connection()
+        job_id = None
         
-        if existing:
-            # Actualizar evidencia existente
-            cursor.execute('''
-                UPDATE evidences 
-                SET content = ?, status = 'pending', submitted_date = CURRENT_DATE
-                WHERE id = ?
-            ''', (content, existing[0]))
-        else:
-            # Crear nueva evidencia
+        with conn:
+            cursor = conn.cursor()
+            
+            # Una evidencia por usuario/semana/tipo: reenviar reemplaza la anterior
             cursor.execute('''
                 INSERT INTO evidences (user_id, week, evidence_type, content, status)
                 VALUES (?, ?, ?, ?, 'pending')
+                ON CONFLICT (user_id, week, evidence_type) DO UPDATE
+                SET content = excluded.content, status = 'pending', submitted_date = CURRENT_DATE
             ''', (user_id, week, evidence_type, content))
+            
+            # En la misma transacción: no queda evidencia pendiente sin su trabajo
+            if enqueue:
+                cursor.execute('''
+                    INSERT INTO validation_jobs (user_id, week, evidence_type, content, enqueued_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (user_id, week, evidence_type, content, time.time()))
+                job_id = cursor.lastrowid
+        
+        week_status_cache.invalidate_user(user_id)
+        return job_id
+    
+    def claim_validation_job(self):
+        """Tomar el trabajo pendiente más antiguo: (id, user_id, week, evidence_type, content, attempts, enqueued_at)"""
+        conn = get_connection()
+        now = time.time()
+        
+        # Una sola sentencia: dos workers (o instancias) nunca toman el mismo trabajo
+        with conn:
+            return conn.execute('''
+                UPDATE validation_jobs SET state = 'running', started_at = ?, attempts = attempts + 1
+                WHERE id = (
+                    SELECT id FROM validation_jobs
+                    WHERE state = 'pending' AND (not_before IS NULL OR not_before <= ?)
+                    ORDER BY id LIMIT 1
+                )
+                RETURNING id, user_id, week, evidence_type, content, attempts, enqueued_at
+            ''', (now, now)).fetchone()
+    
+    def claim_validation_jobs(self, evidence_type: str, limit: int) -> list:
+        """Tomar hasta `limit` trabajos pendientes de un tipo (para validarlos en lote)"""
+        conn = get_connection()
+        now = time.time()
+        
+        with conn:
+            return conn.execute('''
+                UPDATE validation_jobs SET state = 'running', started_at = ?, attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM validation_jobs
+                    WHERE state = 'pending' AND evidence_type = ? AND (not_before IS NULL OR not_before <= ?)
+                    ORDER BY id LIMIT ?
+                )
+                RETURNING id, user_id, week, evidence_type, content, attempts, enqueued_at
+            ''', (now, evidence_type, now, limit)).fetchall()
+    
+    def complete_validation_job(self, job_id: int, user_id: int, week: int, evidence_type: str,
+                                content: str, result: dict):
+        """Guardar el veredicto en la evidencia (si no fue reemplazada) y cerrar el trabajo"""
+        conn = get_connection()
+        
+        with conn:
+            cursor = conn.execute('''
+                UPDATE evidences SET status = ?, feedback = ?, reviewed_date = CURRENT_DATE
+                WHERE user_id = ? AND week = ? AND evidence_type = ? AND content = ?
+            ''', (result['status'], result['message'], user_id, week, evidence_type, content))
+            conn.execute('''
+                UPDATE validation_jobs SET state = 'done', finished_at = ?, last_error = NULL WHERE id = ?
+            ''', (time.time(), job_id))
+        
+        week_status_cache.invalidate_user(user_id)
+        return cursor.rowcount > 0
+    
+    def fail_validation_job(self, job_id: int, error: str, retry: bool) -> bool:
+        """Devolver el trabajo a la cola o, agotados los intentos, dejar la evidencia para revisión manual;
+        True si la evidencia pasó a revisión (no fue reemplazada por otra)"""
+        conn = get_connection()
+        
+        with conn:
+            if retry:
+                conn.execute('''
+                    UPDATE validation_jobs SET state = 'pending', last_error = ? WHERE id = ?
+                ''', (error, job_id))
+                return False
+            
+            user_id, = conn.execute('''
+                UPDATE validation_jobs SET state = 'failed', finished_at = ?, last_error = ? WHERE id = ?
+                RETURNING user_id
+            ''', (time.time(), error, job_id)).fetchone()
+            cursor = conn.execute('''
+                UPDATE evidences SET status = 'pending_review', feedback = ?
+                WHERE (user_id, week, evidence_type, content) =
+                      (SELECT user_id, week, evidence_type, content FROM validation_jobs WHERE id = ?)
+            ''', (MANUAL_REVIEW_MESSAGE, job_id))
+
+        # Después del commit: invalidar antes dejaría que otro hilo cachee el estado sin confirmar
+        week_status_cache.invalidate_user(user_id)
+        return cursor.rowcount > 0
+    
+    def defer_validation_jobs(self, job_ids: list, not_before: float, error: str) -> int:
+        """Devolver trabajos a la cola sin tomarlos antes de `not_before` (epoch); el intento no cuenta"""
+        conn = get_connection()
+        
+        with conn:
+            cursor = conn.executemany('''
+                UPDATE validation_jobs
+                SET state = 'pending', not_before = ?, attempts = attempts - 1, last_error = ?
+                WHERE id = ? AND state = 'running'
+            ''', [(not_before, error, job_id) for job_id in job_ids])
+        
+        return cursor.rowcount
+    
+    def requeue_running_validation_jobs(self, older_than: float) -> int:
+        """Devolver a la cola los trabajos que quedaron en curso (el proceso murió a mitad)"""
+        conn = get_connection()
         
-        conn.commit()
-        conn.close()
+        with conn:
+            cursor = conn.execute('''
+                UPDATE validation_jobs SET state = 'pending' WHERE state = 'running' AND started_at < ?
+            ''', (older_than,))
         
-        return self.validate_evidence(user_id, week, evidence_type, content)
+        return cursor.rowcount
     
-    def validate_evidence(self, user_id: int, week: int, evidence_type: str, content: str):
+    def purge_validation_jobs(self, before: float) -> int:
+        """Eliminar trabajos resueltos antes de `before` (epoch)"""
+        conn = get_connection()
+        
+        with conn:
+            cursor = conn.execute('''
+                DELETE FROM validation_jobs WHERE state IN ('done', 'failed') AND finished_at < ?
+            ''', (before,))
+        
+        return cursor.rowcount
+    
+    def get_validation_queue_stats(self) -> dict:
+        """Profundidad de la cola y antigüedad (s) del trabajo pendiente más viejo"""
+        pending, running, oldest = get_connection().execute('''
+            SELECT COALESCE(SUM(state = 'pending'), 0), COALESCE(SUM(state = 'running'), 0),
+                   MIN(CASE WHEN state = 'pending' THEN enqueued_at END)
+            FROM validation_jobs WHERE state IN ('pending', 'running')
+        ''').fetchone()
+        
+        return {
+            'pending': pending,
+            'running': running,
+            'oldest_wait': time.time() - oldest if oldest else 0.0
+        }
+    
+    async def validate_evidence(self, user_id: int, week: int, evidence_type: str, content: str):
         """Validar evidencia automáticamente"""
         validation_config = EVIDENCE_VALIDATION.get(evidence_type, {})
         
         if evidence_type == "deployed_url":
-            return self.validate_deployed_url(content)
+            return await self.validate_deployed_url(content)
         elif evidence_type == "github_repository":
-            return self.validate_github_repo(content)
+            return await self.validate_github_repo(content)
         elif evidence_type == "screenshot_project":
             return self.validate_screenshot(content)
         else:
@@ -103,101 +259,222 @@ class EvidenceValidator:
                 "auto_validated": False
             }
     
-    def validate_deployed_url(self, url: str):
+    async def _fetch_cached(self, key: tuple, open_response: Callable[[dict], AsyncContextManager[httpx.Response]],
+                            evaluate: Callable[[httpx.Response], Awaitable[dict]], headers: dict = None) -> dict:
+        """Validar con `evaluate` reutilizando la caché: vigente sin red, vencida con GET condicional.
+        `open_response(headers)` abre la petición y `evaluate` consume solo el cuerpo que necesita"""
+        entry = validation_cache.get(key)
+        if entry is not None and entry.fresh_until > time.monotonic():
+            self.cache_counts['fresh'] += 1
+            return entry.result
+        
+        headers = dict(headers or {})
+        if entry is not None:
+            headers.update(entry.conditional_headers())
+        
+        async with open_response(headers) as response:
+            # 304: el recurso no cambió desde la última validación, el veredicto tampoco
+            if response.status_code == 304 and entry is not None:
+                self.cache_counts['revalidated'] += 1
+                self._remember(key, entry.result, entry.etag, entry.last_modified)
+                return entry.result
+            
+            self.cache_counts['fetched'] += 1
+            result = await evaluate(response)
+        
+        self._remember(key, result, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return result
+    
+    def _remember(self, key: tuple, result: dict, etag: str = None, last_modified: str = None):
+        """Guardar resultado; los rechazos vencen antes (el usuario suele estar corrigiéndolos)"""
+        ttl = EVIDENCE_CACHE_TTL if result['status'] == 'approved' else EVIDENCE_CACHE_NEGATIVE_TTL
+        validation_cache.set(key, CachedValidation(result, time.monotonic() + ttl, etag, last_modified))
+    
+    async def validate_deployed_url(self, url: str):
         """Validar que la URL esté desplegada y funcionando"""
+        # Verificar formato de URL
+        if not re.match(r'https?://', url):
+            return {
+                "status": "invalid",
+                "message": "URL debe comenzar con http:// o https://",
+                "auto_validated": True
+            }
+        
         try:
-            # Verificar formato de URL
-            if not re.match(r'https?://', url):
+            key = ('deployed_url', normalize_url(url))
+        except httpx.InvalidURL as e:
+            return {
+                "status": "invalid",
+                "message": f"Error al acceder a la URL: {str(e)}",
+                "auto_validated": True
+            }
+        
+        # Range: los servidores que lo soportan envían solo el presupuesto de bytes (206)
+        range_header = {'Range': f'bytes=0-{EVIDENCE_BODY_MAX_BYTES - 1}'}
+        try:
+            return await self._fetch_cached(key, lambda headers: http_pool.stream('GET', url, headers=headers),
+                                            self._evaluate_deployed_page, range_header)
+        except httpx.HTTPError as e:
+            result = {
+                "status": "invalid",
+                "message": f"Error al acceder a la URL: {str(e)}",
+                "auto_validated": True
+            }
+            # Caché negativa: reenviar una URL caída no vuelve a esperar el timeout enseguida
+            self._remember(key, result)
+            return result
+    
+    async def _evaluate_deployed_page(self, response: httpx.Response) -> dict:
+        """Veredicto sobre la respuesta de la URL desplegada"""
+        # 206: respuesta al Range; 416 a 'bytes=0-' solo ocurre si la página está vacía
+        if response.status_code in (200, 206, 416):
+            # Verificar que no sea página por defecto
+            if response.status_code != 416 and await self._is_default_page(response):
                 return {
                     "status": "invalid",
-                    "message": "URL debe comenzar con http:// o https://",
+                    "message": "La URL muestra una página por defecto, no tu proyecto",
                     "auto_validated": True
                 }
             
-            # Hacer request para verificar que funciona
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                # Verificar que no sea página por defecto
-                content = response.text.lower()
-                default_indicators = [
-                    "welcome to nginx",
-                    "default web page",
-                    "it works!",
-                    "apache default page"
-                ]
-                
-                if any(indicator in content for indicator in default_indicators):
-                    return {
-                        "status": "invalid",
-                        "message": "La URL muestra una página por defecto, no tu proyecto",
-                        "auto_validated": True
-                    }
-                
-                return {
-                    "status": "approved",
-                    "message": "✅ URL validada correctamente",
-                    "auto_validated": True
-                }
-            else:
-                return {
-                    "status": "invalid",
-                    "message": f"URL no accesible (Error {response.status_code})",
-                    "auto_validated": True
-                }
-                
-        except requests.RequestException as e:
+            return {
+                "status": "approved",
+                "message": "✅ URL validada correctamente",
+                "auto_validated": True
+            }
+        else:
             return {
                 "status": "invalid",
-                "message": f"Error al acceder a la URL: {str(e)}",
+                "message": f"URL no accesible (Error {response.status_code})",
                 "auto_validated": True
             }
     
-    def validate_github_repo(self, url: str):
+    async def _is_default_page(self, response: httpx.Response) -> bool:
+        """Buscar indicadores de página por defecto leyendo el cuerpo por trozos, como máximo
+        EVIDENCE_BODY_MAX_BYTES y parando en la primera coincidencia"""
+        remaining = EVIDENCE_BODY_MAX_BYTES
+        tail = b""
+        async for chunk in response.aiter_bytes():
+            chunk = chunk[:remaining]
+            remaining -= len(chunk)
+            window = tail + chunk
+            if DEFAULT_PAGE_PATTERN.search(window):
+                return True
+            if remaining <= 0:
+                break
+            tail = window[-DEFAULT_PAGE_OVERLAP:]
+        return False
+    
+    async def validate_github_repo(self, url: str):
         """Validar repositorio de GitHub"""
         try:
             # Verificar formato de GitHub
-            github_pattern = r'https://github\.com/[^/]+/[^/]+'
-            if not re.match(github_pattern, url):
-                return {
-                    "status": "invalid", 
-                    "message": "Debe ser una URL válida de GitHub (https://github.com/usuario/repo)",
-                    "auto_validated": True
-                }
+            if not GITHUB_URL_PATTERN.match(url):
+                return self._invalid_github_url()
             
-            # Verificar que el repo existe (usando API de GitHub)
-            api_url = url.replace('github.com', 'api.github.com/repos')
-            response = requests.get(api_url, timeout=10)
-            
-            if response.status_code == 200:
-                repo_data = response.json()
-                
-                # Verificar que no esté vacío
-                if repo_data.get('size', 0) == 0:
-                    return {
-                        "status": "invalid",
-                        "message": "El repositorio está vacío",
-                        "auto_validated": True
-                    }
-                
-                return {
-                    "status": "approved",
-                    "message": "✅ Repositorio GitHub validado",
-                    "auto_validated": True
-                }
-            else:
-                return {
-                    "status": "invalid",
-                    "message": "Repositorio no encontrado o es privado",
-                    "auto_validated": True
-                }
-                
+            # Verificar que el repo existe (usando API de GitHub); con 304 no consume cuota
+            repo_path = github_repo_path(url)
+            return await self._fetch_cached(
+                ('github_repository', repo_path),
+                lambda headers: github_client.stream(f"/repos/{repo_path}", headers=headers),
+                self._evaluate_github_repo
+            )
+        
+        except GitHubRateLimitError:
+            # Cuota propia agotada: transitorio, la cola difiere el trabajo hasta el reinicio
+            raise
         except Exception as e:
+            return self._github_error(e)
+    
+    async def validate_github_repos(self, urls: list) -> list:
+        """Validar varios repositorios (mismo orden que `urls`); con token, los que no están
+        vigentes en caché se consultan juntos por GraphQL en vez de uno por uno"""
+        if not github_client.can_batch:
+            return list(await asyncio.gather(*(self.validate_github_repo(url) for url in urls)))
+        
+        results = {}
+        to_fetch = {}  # 'usuario/repo' -> URLs enviadas (puede haber variantes de la misma)
+        for url in urls:
+            if not GITHUB_URL_PATTERN.match(url):
+                results[url] = self._invalid_github_url()
+                continue
+            repo_path = github_repo_path(url)
+            entry = validation_cache.get(('github_repository', repo_path))
+            if entry is not None and entry.fresh_until > time.monotonic():
+                self.cache_counts['fresh'] += 1
+                results[url] = entry.result
+            else:
+                to_fetch.setdefault(repo_path, []).append(url)
+        
+        if to_fetch:
+            try:
+                repositories = await github_client.get_repositories(list(to_fetch))
+            except GitHubRateLimitError:
+                raise
+            except Exception as e:
+                repositories = None
+                for urls_for_repo in to_fetch.values():
+                    for url in urls_for_repo:
+                        results[url] = self._github_error(e)
+            
+            for repo_path, repo_data in (repositories or {}).items():
+                self.cache_counts['fetched'] += 1
+                result = self._github_verdict(repo_data)
+                self._remember(('github_repository', repo_path), result)
+                for url in to_fetch[repo_path]:
+                    results[url] = result
+        
+        return [results[url] for url in urls]
+    
+    async def _evaluate_github_repo(self, response: httpx.Response) -> dict:
+        """Veredicto sobre la respuesta REST de la API de GitHub"""
+        if response.status_code == 200:
+            await response.aread()
+            return self._github_verdict(response.json())
+        elif response.status_code == 404:
+            return self._github_verdict(None)
+        else:
+            # Error de GitHub (los rechazos por cuota ya llegan como GitHubRateLimitError)
+            raise httpx.HTTPStatusError(f"GitHub respondió {response.status_code}",
+                                        request=response.request, response=response)
+    
+    def _github_verdict(self, repo_data: Optional[dict]) -> dict:
+        """Veredicto sobre los datos del repositorio (None: no existe o es privado)"""
+        if repo_data is None:
             return {
-                "status": "pending_review",
-                "message": f"Error validando repo: {str(e)}. Requiere revisión manual.",
-                "auto_validated": False
+                "status": "invalid",
+                "message": "Repositorio no encontrado o es privado",
+                "auto_validated": True
             }
+        
+        # Verificar que no esté vacío
+        if repo_data.get('size', 0) == 0:
+            return {
+                "status": "invalid",
+                "message": "El repositorio está vacío",
+                "auto_validated": True
+            }
+        
+        return {
+            "status": "approved",
+            "message": "✅ Repositorio GitHub validado",
+            "auto_validated": True
+        }
+    
+    def _invalid_github_url(self) -> dict:
+        """Resultado para una URL que no es de un repositorio de GitHub"""
+        return {
+            "status": "invalid", 
+            "message": "Debe ser una URL válida de GitHub (https://github.com/usuario/repo)",
+            "auto_validated": True
+        }
+    
+    def _github_error(self, error: Exception) -> dict:
+        """Resultado cuando GitHub no pudo responder (red, error del servidor): queda para revisión manual"""
+        return {
+            "status": "pending_review",
+            "message": f"Error validando repo: {str(error)}. Requiere revisión manual.",
+            "auto_validated": False
+        }
     
     def validate_screenshot(self, file_info: str):
         """Validar captura de pantalla"""
@@ -210,47 +487,34 @@ class EvidenceValidator:
     
     def get_week_evidence_status(self, user_id: int, week: int):
         """Obtener estado de evidencias de una semana"""
-        conn = sqlite3.connect('study_mentor.db')
+        cache_key = (user_id, week, 'evidence')
+        cached = week_status_cache.get(cache_key, MISSING)
+        if cached is not MISSING:
+            return cached
+        version = week_status_cache.version()
+        
+        conn = get_connection()
         cursor = conn.cursor()
         
+        # Una fila por evidencia requerida; las no enviadas salen como 'missing'
         cursor.execute('''
-            SELECT evidence_type, status, score, feedback
-            FROM evidences 
-            WHERE user_id = ? AND week = ?
+            SELECT r.evidence_type, COALESCE(e.status, 'missing'), e.score, e.feedback
+            FROM week_requirements r
+            LEFT JOIN evidences e
+                ON e.user_id = ? AND e.week = r.week AND e.evidence_type = r.evidence_type
+            WHERE r.week = ?
         ''', (user_id, week))
         
-        evidences = cursor.fetchall()
-        conn.close()
-        
-        # Obtener evidencias requeridas para la semana
-        exam_config = WEEKLY_EXAMS.get(week, {})
-        required_evidences = []
-        
-        for question in exam_config.get('questions', []):
-            if question.get('type') == 'evidence':
-                required_evidences.extend(question.get('required_evidence', []))
-        
-        # Calcular estado
-        evidence_status = {}
-        for evidence_type in set(required_evidences):
-            found = False
-            for ev in evidences:
-                if ev[0] == evidence_type:
-                    evidence_status[evidence_type] = {
-                        'status': ev[1],
-                        'score': ev[2],
-                        'feedback': ev[3]
-                    }
-                    found = True
-                    break
-            
-            if not found:
-                evidence_status[evidence_type] = {
-                    'status': 'missing',
-                    'score': None,
-                    'feedback': None
-                }
+        evidence_status = {
+            evidence_type: {
+                'status': status,
+                'score': score,
+                'feedback': feedback
+            }
+            for evidence_type, status, score, feedback in cursor.fetchall()
+        }
         
+        week_status_cache.set(cache_key, evidence_status, version)
         return evidence_status
     
     def can_advance_to_week(self, user_id: int, target_week: int):
@@ -262,20 +526,13 @@ class EvidenceValidator:
         if previous_week < 1:
             return True, "Primera semana"
         
-        # Verificar evidencias de la semana anterior
-        evidence_status = self.get_week_evidence_status(user_id, previous_week)
+        # Evidencias y examen de la semana anterior en una sola consulta
+        status = get_week_status(user_id, previous_week)
         
-        missing_evidences = []
-        for evidence_type, status in evidence_status.items():
-            if status['status'] in ['missing', 'invalid']:
-                missing_evidences.append(evidence_type)
+        if status.rejected:
+            return False, f"Faltan evidencias de semana {previous_week}: {', '.join(status.rejected)}"
         
-        if missing_evidences:
-            return False, f"Faltan evidencias de semana {previous_week}: {', '.join(missing_evidences)}"
-        
-        # Verificar examen de la semana anterior
-        exam_result = self.get_latest_exam_result(user_id, previous_week)
-        if not exam_result or not exam_result['passed']:
+        if not status.exam_passed:
             return False, f"Debes aprobar el examen de la semana {previous_week}"
         
         return True, "Puede avanzar"
@@ -366,22 +623,23 @@ class ExamManager:
     
     def save_exam_result(self, user_id: int, week: int, score: float, passed: bool, answers: dict):
         """Guardar resultado del examen"""
-        conn = sqlite3.connect('study_mentor.db')
-        cursor = conn.cursor()
+        conn = get_connection()
         
-        attempt_number = self.get_attempt_number(user_id, week)
-        
-        cursor.execute('''
-            INSERT INTO exam_results (user_id, week, score, passed, attempt_number, answers)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, week, score, passed, attempt_number, json.dumps(answers)))
+        with conn:
+            cursor = conn.cursor()
+            
+            attempt_number = self.get_attempt_number(user_id, week)
+            
+            cursor.execute('''
+                INSERT INTO exam_results (user_id, week, score, passed, attempt_number, answers)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (user_id, week, score, passed, attempt_number, json.dumps(answers)))
         
-        conn.commit()
-        conn.close()
+        week_status_cache.invalidate_user(user_id)
     
     def get_attempt_number(self, user_id: int, week: int, exam_type: str = 'weekly'):
         """Obtener número de intento actual"""
-        conn = sqlite3.connect('study_mentor.db')
+        conn = get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -390,13 +648,18 @@ class ExamManager:
         ''', (user_id, week, exam_type))
         
         result = cursor.fetchone()
-        conn.close()
         
         return (result[0] or 0) + 1
     
     def get_latest_exam_result(self, user_id: int, week: int):
         """Obtener último resultado del examen"""
-        conn = sqlite3.connect('study_mentor.db')
+        cache_key = (user_id, week, 'exam')
+        cached = week_status_cache.get(cache_key, MISSING)
+        if cached is not MISSING:
+            return cached
+        version = week_status_cache.version()
+        
+        conn = get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -408,17 +671,19 @@ class ExamManager:
         ''', (user_id, week))
         
         result = cursor.fetchone()
-        conn.close()
         
+        exam_result = None
         if result:
-            return {
+            exam_result = {
                 'score': result[0],
                 'passed': result[1],
                 'attempt_number': result[2],
                 'exam_date': result[3],
                 'answers': json.loads(result[4]) if result[4] else {}
             }
-        return None
+        
+        week_status_cache.set(cache_key, exam_result, version)
+        return exam_result
 
 # Instancias globales
 evidence_validator = EvidenceValidator()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Cliente de la API de GitHub del Bot Mentor
+Token opcional, seguimiento de la cuota (X-RateLimit-*) para esperar antes de agotarla
+y consultas GraphQL por lote cuando hay muchos repositorios que revisar
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from config import (
+    GITHUB_TOKEN, GITHUB_API_URL, GITHUB_GRAPHQL_URL, GITHUB_RATE_LIMIT_RESERVE,
+    GITHUB_RATE_LIMIT_MAX_WAIT, GITHUB_GRAPHQL_BATCH
+)
+from http_client import http_pool
+
+logger = logging.getLogger(__name__)
+
+class GitHubRateLimitError(Exception):
+    """La cuota de la API no se recupera dentro de la espera máxima permitida"""
+    def __init__(self, message: str, retry_at: float):
+        super().__init__(message)
+        self.retry_at = retry_at  # Epoch desde el que tiene sentido reintentar
+
+class GitHubClient:
+    def __init__(self, token: str = GITHUB_TOKEN, api_url: str = GITHUB_API_URL,
+                 graphql_url: str = GITHUB_GRAPHQL_URL, reserve: int = GITHUB_RATE_LIMIT_RESERVE,
+                 max_wait: float = GITHUB_RATE_LIMIT_MAX_WAIT, batch_size: int = GITHUB_GRAPHQL_BATCH):
+        """Inicializar cliente; las peticiones van por el pool HTTP compartido"""
+        self.api_url = api_url.rstrip('/')
+        self.graphql_url = graphql_url
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.batch_size = batch_size
+        self.headers = {
+            'Accept': 'application/vnd.github+json',
+            'X-GitHub-Api-Version': '2022-11-28'
+        }
+        if token:
+            self.headers['Authorization'] = f'Bearer {token}'
+        # GraphQL exige autenticación: sin token, una petición REST por repositorio
+        self.can_batch = bool(token)
+        self._limits = {}  # recurso ('core', 'graphql') -> (restantes, epoch del reinicio)
+        self._paused_until = 0.0  # Retry-After del límite secundario
+
+    async def _wait_for_quota(self, resource: str):
+        """Esperar si la cuota del recurso está en la reserva; descontar la petición que va a salir"""
+        remaining, reset_at = self._limits.get(resource, (None, 0.0))
+        now = time.time()
+        wait = max(self._paused_until - now, 0.0)
+        if remaining is not None and remaining <= self.reserve and reset_at > now:
+            wait = max(wait, reset_at - now)
+
+        if wait > self.max_wait:
+            raise GitHubRateLimitError(f"Cuota de GitHub ({resource}) agotada por {wait:.0f}s", now + wait)
+        if wait > 0:
+            logger.warning(f"Cuota de GitHub ({resource}) en la reserva: esperando {wait:.0f}s")
+            await asyncio.sleep(wait)
+            # La cuota se reinició; el valor real llega con la próxima respuesta
+            self._limits.pop(resource, None)
+            return
+
+        # Descontar antes de enviar: las peticiones concurrentes no cuentan la misma cuota
+        if remaining is not None:
+            self._limits[resource] = (remaining - 1, reset_at)
+
+    def _track(self, response: httpx.Response, resource: str):
+        """Actualizar la cuota con las cabeceras X-RateLimit-* de la respuesta; si GitHub la
+        rechazó por cuota (403/429), GitHubRateLimitError con el instante en que se recupera"""
+        headers = response.headers
+        remaining = headers.get('X-RateLimit-Remaining')
+        if remaining is not None:
+            resource = headers.get('X-RateLimit-Resource', resource)
+            self._limits[resource] = (int(remaining), float(headers.get('X-RateLimit-Reset', 0)))
+
+        if response.status_code not in (403, 429):
+            return
+        # Límite secundario (ráfagas): GitHub indica cuánto esperar
+        if 'Retry-After' in headers:
+            self._paused_until = time.time() + float(headers['Retry-After'])
+            retry_at = self._paused_until
+        elif remaining == '0':
+            retry_at = self._limits[resource][1]
+        else:
+            # 403 sin señales de cuota (permisos): no es un límite, lo evalúa quien pidió
+            return
+        raise GitHubRateLimitError(f"GitHub rechazó la petición por cuota ({response.status_code})", retry_at)
+
+    def _reset_at(self, resource: str) -> float:
+        """Reinicio conocido de la cuota del recurso; sin dato, dentro de un minuto"""
+        reset_at = self._limits.get(resource, (None, 0.0))[1]
+        now = time.time()
+        return reset_at if reset_at > now else now + 60
+
+    @asynccontextmanager
+    async def stream(self, path: str, headers: dict = None):
+        """GET a la API REST (`path` tipo '/repos/usuario/repo') con el cuerpo sin leer"""
+        await self._wait_for_quota('core')
+        async with http_pool.stream('GET', f"{self.api_url}{path}",
+                                    headers={**self.headers, **(headers or {})}) as response:
+            self._track(response, 'core')
+            yield response
+
+    async def graphql(self, query: str, variables: dict) -> dict:
+        """Ejecutar una consulta GraphQL; devuelve el JSON completo (data y errors)"""
+        await self._wait_for_quota('graphql')
+        response = await http_pool.request('POST', self.graphql_url, headers=self.headers,
+                                           json={'query': query, 'variables': variables})
+        self._track(response, 'graphql')
+        response.raise_for_status()
+        return response.json()
+
+    async def get_repositories(self, paths: list) -> dict:
+        """Datos de varios repositorios ('usuario/repo') en consultas GraphQL de `batch_size`:
+        {path: {'size': KB}} o None si no existe o es privado"""
+        repositories = {}
+        for start in range(0, len(paths), self.batch_size):
+            chunk = paths[start:start + self.batch_size]
+            # Un alias por repositorio; owner/name como variables, nunca interpolados en la consulta
+            params = ", ".join(f"$o{i}: String!, $n{i}: String!" for i in range(len(chunk)))
+            fields = " ".join(f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ diskUsage }}"
+                              for i in range(len(chunk)))
+            variables = {}
+            for i, path in enumerate(chunk):
+                variables[f"o{i}"], variables[f"n{i}"] = path.split('/', 1)
+
+            payload = await self.graphql(f"query({params}) {{ {fields} }}", variables)
+
+            # NOT_FOUND solo significa "no existe o es privado"; cualquier otro error invalida el lote
+            errors = [e for e in payload.get('errors') or [] if e.get('type') != 'NOT_FOUND']
+            if any(e.get('type') == 'RATE_LIMITED' for e in errors):
+                raise GitHubRateLimitError("Cuota de GitHub (graphql) agotada", self._reset_at('graphql'))
+            if errors or payload.get('data') is None:
+                message = errors[0].get('message') if errors else 'respuesta sin datos'
+                raise httpx.HTTPError(f"GraphQL de GitHub: {message}")
+
+            data = payload['data']
+            for i, path in enumerate(chunk):
+                repository = data.get(f"r{i}")
+                repositories[path] = {'size': repository['diskUsage'] or 0} if repository else None
+        return repositories
+
+# Instancia global
+github_client = GitHubClient()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Cliente HTTP asíncrono del Bot Mentor
+Un solo httpx.AsyncClient por proceso: conexiones keep-alive reutilizadas, límite total y
+por host, y timeouts de conexión y lectura separados. Nunca bloquea el event loop
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+import httpx
+
+from config import (
+    EVIDENCE_HTTP_MAX_CONNECTIONS, EVIDENCE_HTTP_MAX_PER_HOST, EVIDENCE_HTTP_CONNECT_TIMEOUT,
+    EVIDENCE_HTTP_READ_TIMEOUT, EVIDENCE_HTTP_KEEPALIVE
+)
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'BotMentor/1.0 (evidence-validator)'
+
+class AsyncHttpPool:
+    def __init__(self, max_connections: int = EVIDENCE_HTTP_MAX_CONNECTIONS,
+                 max_per_host: int = EVIDENCE_HTTP_MAX_PER_HOST,
+                 connect_timeout: float = EVIDENCE_HTTP_CONNECT_TIMEOUT,
+                 read_timeout: float = EVIDENCE_HTTP_READ_TIMEOUT,
+                 keepalive: float = EVIDENCE_HTTP_KEEPALIVE):
+        """Inicializar pool; el cliente se crea en el primer uso (dentro del event loop)"""
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive
+        )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout, read=read_timeout, write=read_timeout, pool=connect_timeout + read_timeout
+        )
+        self.max_per_host = max_per_host
+        self._client = None
+        self._hosts = {}  # host -> Semaphore
+        self._active = {}  # host -> peticiones en curso o esperando turno
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Cliente compartido (lo mismo que requests: sigue redirecciones)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={'User-Agent': USER_AGENT}
+            )
+        return self._client
+
+    @asynccontextmanager
+    async def _host_slot(self, host: str):
+        """Limitar las peticiones simultáneas a un mismo host"""
+        semaphore = self._hosts.get(host)
+        if semaphore is None:
+            # Evitar que el diccionario crezca sin límite con hosts ya sin uso
+            # (solo los que no tienen peticiones: un semáforo nuevo para un host activo superaría el límite)
+            if len(self._hosts) > 1000:
+                self._hosts = {h: s for h, s in self._hosts.items() if h in self._active}
+            semaphore = self._hosts[host] = asyncio.Semaphore(self.max_per_host)
+        self._active[host] = self._active.get(host, 0) + 1
+        try:
+            async with semaphore:
+                yield
+        finally:
+            self._active[host] -= 1
+            if not self._active[host]:
+                del self._active[host]
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Hacer una petición completa (el cuerpo queda leído al volver)"""
+        async with self._host_slot(httpx.URL(url).host):
+            return await self._get_client().request(method, url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs):
+        """Petición sin leer el cuerpo: se consume por partes (aiter_bytes) dentro del bloque
+        y al salir se corta la descarga de lo que quede"""
+        async with self._host_slot(httpx.URL(url).host):
+            async with self._get_client().stream(method, url, **kwargs) as response:
+                yield response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """Petición GET"""
+        return await self.request('GET', url, **kwargs)
+
+    async def aclose(self):
+        """Cerrar las conexiones del pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Cliente HTTP cerrado")
+
+# Instancia global
+http_pool = AsyncHttpPool()
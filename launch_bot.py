@@ -167,6 +167,12 @@ def main():
     except Exception as e:
         print(f"❌ Error crítico: {e}")
         logger.error(f"Error crítico: {e}", exc_info=True)
+    
+    finally:
+        from database import close_connections
+        from repository import repo
+        repo.close()
+        close_connections()
 
 if __name__ == '__main__':
     main()
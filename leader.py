@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Elección de líder del Bot Mentor
+Con varias instancias sobre la misma base (deploy blue/green, reinicios solapados) solo la
+que tiene el lease en SQLite ejecuta tareas programadas; el resto sigue atendiendo mensajes
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from config import LEADER_LEASE_TTL, LEADER_HEARTBEAT_INTERVAL
+from repository import repo
+
+logger = logging.getLogger(__name__)
+
+class LeaderLease:
+    def __init__(self, name: str = 'scheduler', ttl: float = LEADER_LEASE_TTL,
+                 heartbeat: float = LEADER_HEARTBEAT_INTERVAL):
+        """Inicializar lease; el holder identifica a esta instancia (host, pid y sufijo aleatorio)"""
+        self.name = name
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._expires_at = 0.0
+        self._task = None
+        self._on_elected = None
+        self._on_demoted = None
+
+    async def start(self, on_elected: Callable[[], Awaitable[None]], on_demoted: Callable[[], Awaitable[None]]):
+        """Intentar tomar el lease ya mismo y mantener el heartbeat en segundo plano"""
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        await self._heartbeat()
+        if not self.is_leader:
+            logger.info(f"Lease '{self.name}' en manos de otra instancia: esta queda en espera")
+        self._task = asyncio.create_task(self._run(), name=f'lease-{self.name}')
+
+    async def stop(self):
+        """Detener el heartbeat, soltar el liderazgo y liberar el lease"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            await self._demote()
+            try:
+                await repo.release_lease(self.name, self.holder)
+            except Exception as e:
+                logger.error(f"Error liberando lease '{self.name}': {e}")
+
+    async def _run(self):
+        """Renovar (o intentar tomar) el lease cada `heartbeat` segundos"""
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            await self._heartbeat()
+
+    async def _heartbeat(self):
+        """Renovar el lease y aplicar la transición de líder/seguidor si cambió"""
+        try:
+            acquired = await repo.acquire_lease(self.name, self.holder, self.ttl)
+        except Exception as e:
+            # Sin poder renovar, se sigue siendo líder solo mientras el lease no haya vencido
+            logger.error(f"Error renovando lease '{self.name}': {e}")
+            acquired = self.is_leader and time.time() < self._expires_at - self.heartbeat
+
+        if acquired:
+            self._expires_at = time.time() + self.ttl
+            if not self.is_leader:
+                await self._elect()
+        elif self.is_leader:
+            logger.warning(f"Lease '{self.name}' perdido: otra instancia tomó el control")
+            await self._demote()
+
+    async def _elect(self):
+        """Pasar a líder y arrancar las tareas"""
+        self.is_leader = True
+        logger.info(f"Instancia {self.holder} elegida líder de '{self.name}'")
+        try:
+            await self._on_elected()
+        except Exception as e:
+            logger.error(f"Error iniciando tareas del líder: {e}")
+
+    async def _demote(self):
+        """Dejar de ser líder y detener las tareas"""
+        self.is_leader = False
+        try:
+            await self._on_demoted()
+        except Exception as e:
+            logger.error(f"Error deteniendo tareas del líder: {e}")
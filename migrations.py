@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Migraciones versionadas del esquema SQLite
+La versión aplicada se guarda en PRAGMA user_version; cada migración corre una sola vez
+"""
+
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+def _create_base_schema(cursor: sqlite3.Cursor):
+    """v1 - Tablas originales (usuarios, progreso, evaluaciones, evidencias y exámenes)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        start_date DATE,
+        current_week INTEGER DEFAULT 1,
+        total_points REAL DEFAULT 0,
+        projects_completed INTEGER DEFAULT 0,
+        concepts_mastered INTEGER DEFAULT 0,
+        total_hours REAL DEFAULT 0,
+        study_days INTEGER DEFAULT 0,
+        current_streak INTEGER DEFAULT 0,
+        last_study_date DATE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS daily_progress (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date DATE,
+        hours_studied REAL DEFAULT 0,
+        tasks_completed TEXT,
+        notes TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (user_id)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS weekly_evaluations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        week_number INTEGER,
+        project_completed BOOLEAN DEFAULT 0,
+        difficulty_level INTEGER,
+        concepts_learned TEXT,
+        next_week_focus TEXT,
+        evaluation_date DATE,
+        FOREIGN KEY (user_id) REFERENCES users (user_id)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS evidences (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        week INTEGER,
+        evidence_type TEXT,
+        content TEXT,
+        status TEXT DEFAULT 'pending',
+        submitted_date DATE DEFAULT CURRENT_DATE,
+        reviewed_date DATE,
+        score REAL,
+        feedback TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (user_id)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS exam_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        week INTEGER,
+        exam_type TEXT DEFAULT 'weekly',
+        score REAL,
+        passed BOOLEAN,
+        attempt_number INTEGER DEFAULT 1,
+        exam_date DATE DEFAULT CURRENT_DATE,
+        answers TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (user_id)
+    )
+    ''')
+
+def _add_indexes_and_unique_keys(cursor: sqlite3.Cursor):
+    """v2 - Eliminar duplicados y crear índices compuestos y claves únicas"""
+    # daily_progress: el antiguo INSERT OR REPLACE agregaba una fila por registro.
+    # Cada fila nueva valía (primera fila del día + horas registradas), así que el
+    # total real es SUM(filas) - (n - 1) * primera fila. Se conserva la primera.
+    cursor.execute('''
+    UPDATE daily_progress
+    SET hours_studied = (
+        SELECT SUM(d.hours_studied) - (COUNT(*) - 1) * daily_progress.hours_studied
+        FROM daily_progress d
+        WHERE d.user_id = daily_progress.user_id AND d.date = daily_progress.date
+    )
+    WHERE id IN (
+        SELECT MIN(id) FROM daily_progress
+        GROUP BY user_id, date HAVING COUNT(*) > 1
+    )
+    ''')
+    cursor.execute('''
+    DELETE FROM daily_progress
+    WHERE id NOT IN (SELECT MIN(id) FROM daily_progress GROUP BY user_id, date)
+    ''')
+    cursor.execute('''
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_daily_progress_user_date
+    ON daily_progress (user_id, date)
+    ''')
+
+    # weekly_evaluations y evidences: la fila más reciente es la vigente
+    cursor.execute('''
+    DELETE FROM weekly_evaluations
+    WHERE id NOT IN (SELECT MAX(id) FROM weekly_evaluations GROUP BY user_id, week_number)
+    ''')
+    cursor.execute('''
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_weekly_evaluations_user_week
+    ON weekly_evaluations (user_id, week_number)
+    ''')
+
+    cursor.execute('''
+    DELETE FROM evidences
+    WHERE id NOT IN (SELECT MAX(id) FROM evidences GROUP BY user_id, week, evidence_type)
+    ''')
+    cursor.execute('''
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_evidences_user_week_type
+    ON evidences (user_id, week, evidence_type)
+    ''')
+
+    # exam_results: último intento por usuario/semana sin recorrer la tabla
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS ix_exam_results_user_week_attempt
+    ON exam_results (user_id, week, attempt_number)
+    ''')
+
+    # users: orden de get_all_users()
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS ix_users_last_study_date
+    ON users (last_study_date)
+    ''')
+
+def _create_week_requirements(cursor: sqlite3.Cursor):
+    """v3 - Tabla de evidencias requeridas por semana (se sincroniza con WEEKLY_EXAMS)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS week_requirements (
+        week INTEGER NOT NULL,
+        evidence_type TEXT NOT NULL,
+        PRIMARY KEY (week, evidence_type)
+    ) WITHOUT ROWID
+    ''')
+
+def _add_next_deadline(cursor: sqlite3.Cursor):
+    """v4 - Columna next_deadline indexada para el chequeo semanal (se rellena al iniciar)"""
+    cursor.execute('ALTER TABLE users ADD COLUMN next_deadline DATE')
+    # NULL significa "programa terminado": los usuarios existentes se adelantan al primer plazo al iniciar
+    cursor.execute('UPDATE users SET next_deadline = start_date')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS ix_users_next_deadline
+    ON users (next_deadline)
+    ''')
+
+def _create_notification_outbox(cursor: sqlite3.Cursor):
+    """v5 - Outbox persistente de notificaciones (una fila por usuario, tipo y día)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS notification_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        day DATE NOT NULL,
+        payload TEXT NOT NULL,
+        state TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL,
+        last_error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        sent_at TIMESTAMP,
+        UNIQUE (user_id, kind, day)
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS ix_notification_outbox_state_due
+    ON notification_outbox (state, next_attempt_at)
+    ''')
+
+def _add_notification_preferences(cursor: sqlite3.Cursor):
+    """v6 - Zona horaria y horarios de notificación por usuario (NULL = valor por defecto)"""
+    cursor.execute('ALTER TABLE users ADD COLUMN timezone TEXT')
+    cursor.execute('ALTER TABLE users ADD COLUMN reminder_time TEXT')
+    cursor.execute('ALTER TABLE users ADD COLUMN motivational_time TEXT')
+    
+    # Un horario (zona, hora) se resuelve con una búsqueda por índice
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS ix_users_reminder_slot
+    ON users (timezone, reminder_time)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS ix_users_motivational_slot
+    ON users (timezone, motivational_time)
+    ''')
+
+def _add_delivery_status(cursor: sqlite3.Cursor):
+    """v7 - Estado de entrega por usuario: chats inaccesibles quedan fuera de los envíos"""
+    # active = 0 cuando Telegram responde Forbidden / chat not found; /start lo reactiva
+    cursor.execute('ALTER TABLE users ADD COLUMN active INTEGER NOT NULL DEFAULT 1')
+    cursor.execute('ALTER TABLE users ADD COLUMN blocked_at TIMESTAMP')
+
+def _add_digest_time(cursor: sqlite3.Cursor):
+    """v8 - Modo resumen: hora en que se agrupan las notificaciones del día (NULL = desactivado)"""
+    cursor.execute('ALTER TABLE users ADD COLUMN digest_time TEXT')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS ix_users_digest_slot
+    ON users (timezone, digest_time)
+    ''')
+
+def _create_scheduler_lease(cursor: sqlite3.Cursor):
+    """v9 - Lease de liderazgo: solo la instancia que lo tiene ejecuta tareas programadas"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS scheduler_lease (
+        name TEXT PRIMARY KEY,
+        holder TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        acquired_at REAL NOT NULL
+    )
+    ''')
+
+def _create_validation_jobs(cursor: sqlite3.Cursor):
+    """v10 - Cola persistente de validación de evidencias (procesada por workers en segundo plano)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS validation_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        week INTEGER NOT NULL,
+        evidence_type TEXT NOT NULL,
+        content TEXT NOT NULL,
+        state TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        enqueued_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL,
+        last_error TEXT
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS ix_validation_jobs_state
+    ON validation_jobs (state, id)
+    ''')
+
+def _partial_next_deadline_index(cursor: sqlite3.Cursor):
+    """v11 - Índice de next_deadline solo sobre los usuarios con chequeo pendiente (NULL = terminado)"""
+    cursor.execute('DROP INDEX IF EXISTS ix_users_next_deadline')
+    cursor.execute('''
+    CREATE INDEX ix_users_next_deadline
+    ON users (next_deadline) WHERE next_deadline IS NOT NULL
+    ''')
+
+def _add_outbox_claimed_at(cursor: sqlite3.Cursor):
+    """v12 - Momento en que se tomó cada mensaje del outbox (solo se reanudan los abandonados)"""
+    cursor.execute('ALTER TABLE notification_outbox ADD COLUMN claimed_at REAL')
+
+def _partial_slot_indexes(cursor: sqlite3.Cursor):
+    """v13 - Índices de horarios parciales con el mismo filtro que las consultas de notificación
+    (usuarios activos, alcanzables y con o sin resumen): solo contienen a quien recibe mensajes"""
+    # El WHERE debe coincidir término a término con ACTIVE_USERS_FILTER, REACHABLE_FILTER y el
+    # filtro de resumen de database.py para que SQLite pueda usar el índice. Sin columnas extra:
+    # dentro de un horario las filas siguen ordenadas por user_id y la paginación no ordena
+    eligible = '(total_hours > 0 OR projects_completed > 0) AND active = 1'
+    for name, column, digest_filter in (
+        ('ix_users_reminder_slot', 'reminder_time', 'digest_time IS NULL'),
+        ('ix_users_motivational_slot', 'motivational_time', 'digest_time IS NULL'),
+        ('ix_users_digest_slot', 'digest_time', 'digest_time IS NOT NULL'),
+    ):
+        cursor.execute(f'DROP INDEX IF EXISTS {name}')
+        cursor.execute(f'''
+        CREATE INDEX {name}
+        ON users (timezone, {column}) WHERE {eligible} AND {digest_filter}
+        ''')
+
+def _add_validation_not_before(cursor: sqlite3.Cursor):
+    """v14 - Trabajos de validación diferidos (cuota de GitHub agotada): no se toman antes de not_before"""
+    cursor.execute('ALTER TABLE validation_jobs ADD COLUMN not_before REAL')
+
+# (versión, migración) en orden estrictamente creciente
+MIGRATIONS = [
+    (1, _create_base_schema),
+    (2, _add_indexes_and_unique_keys),
+    (3, _create_week_requirements),
+    (4, _add_next_deadline),
+    (5, _create_notification_outbox),
+    (6, _add_notification_preferences),
+    (7, _add_delivery_status),
+    (8, _add_digest_time),
+    (9, _create_scheduler_lease),
+    (10, _create_validation_jobs),
+    (11, _partial_next_deadline_index),
+    (12, _add_outbox_claimed_at),
+    (13, _partial_slot_indexes),
+    (14, _add_validation_not_before),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """Aplicar las migraciones pendientes y devolver la versión final del esquema"""
+    current_version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if current_version >= SCHEMA_VERSION:
+        return current_version
+
+    for version, migration in MIGRATIONS:
+        if version <= current_version:
+            continue
+
+        # Cada migración y su número de versión se confirman en la misma transacción;
+        # BEGIN IMMEDIATE evita que otra instancia aplique la misma migración a la vez
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            if cursor.execute('PRAGMA user_version').fetchone()[0] >= version:
+                continue
+            migration(cursor)
+            cursor.execute(f'PRAGMA user_version = {version}')
+
+        logger.info(f"Migración de esquema v{version} aplicada: {migration.__doc__}")
+        current_version = version
+
+    return current_version
@@ -5,179 +5,301 @@ Maneja recordatorios, motivación y validación de progreso semanal
 """
 
 import asyncio
+import functools
+import json
 import logging
 import random
-from datetime import datetime, timedelta, time
-from typing import Dict, Any
-from telegram import Bot
-from telegram.error import TelegramError
-import schedule
-import threading
+from datetime import date, datetime, timedelta, time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from telegram.ext import Application
 import time as time_module
 
 from config import (
-    BOT_TOKEN, DAILY_STUDY_REMINDER, MOTIVATIONAL_REMINDER, 
-    AI_MOTIVATIONAL_PHRASES, DAILY_NOTIFICATIONS, WEEK_DEADLINE_DAYS,
-    WEEK_COMPLETION_REQUIRED, AUTO_RESET_INCOMPLETE_WEEKS
+    DAILY_STUDY_REMINDER, MOTIVATIONAL_REMINDER, STREAK_DECAY_TIME, DEFAULT_TIMEZONE,
+    AI_MOTIVATIONAL_PHRASES, DAILY_NOTIFICATIONS,
+    WEEK_COMPLETION_REQUIRED, AUTO_RESET_INCOMPLETE_WEEKS, STATS_PAGE_SIZE, SLOT_REFRESH_INTERVAL,
+    NOTIFY_DISPATCH_WINDOW, TOTAL_WEEKS
 )
-from database import get_all_users, get_user_stats, update_progress
-from evidence_manager import evidence_validator, exam_manager
+from cache import cache_report
+from database import (
+    UserStats, NOTIFICATION_TIME_COLUMNS, DIGEST_KIND, user_stats_cache, week_status_cache, next_week_deadline
+)
+from repository import repo
+from scheduler import AsyncDailyScheduler
+from broadcast import BroadcastEngine
+from outbox import OutboxDispatcher
+from leader import LeaderLease
+import templates
 
 logger = logging.getLogger(__name__)
 
+# Tramos en que se planifica cada horario dentro de la ventana de despacho (user_id % tramos)
+DISPATCH_CHUNKS = 10
+
 class NotificationManager:
-    def __init__(self, bot_token: str):
+    def __init__(self):
         """Inicializar el sistema de notificaciones"""
-        self.bot = Bot(token=bot_token)
-        self.running = False
-        self.scheduler_thread = None
+        self.bot = None  # Se toma de la aplicación al iniciar
+        self.scheduler = AsyncDailyScheduler()
+        self.broadcaster = BroadcastEngine()
+        self.outbox = OutboxDispatcher(self.broadcaster)
+        self.leader = LeaderLease('scheduler')
+        # Ventana (s) en que se reparten los envíos de cada tarea programada
+        self.dispatch_window = NOTIFY_DISPATCH_WINDOW * 60
+        self._refresh_task = None
         
-    def start_scheduler(self):
-        """Iniciar el scheduler de notificaciones"""
+    async def start(self, application: Application):
+        """Participar en la elección de líder; solo el líder ejecuta scheduler y outbox (hook post_init)"""
         if not DAILY_NOTIFICATIONS:
             logger.info("Notificaciones diarias deshabilitadas")
             return
             
-        self.running = True
+        # Mismo cliente HTTP que usan los handlers
+        self.bot = application.bot
+        await self.leader.start(self._start_jobs, self._stop_jobs)
         
-        # Programar notificaciones diarias
-        schedule.every().day.at(DAILY_STUDY_REMINDER).do(self._send_daily_study_reminder)
-        schedule.every().day.at(MOTIVATIONAL_REMINDER).do(self._send_motivational_message)
-        schedule.every().day.at("23:59").do(self._check_weekly_progress)
+    async def _start_jobs(self):
+        """Arrancar outbox y tareas programadas (al ser elegido líder)"""
+        # Retomar los envíos que quedaron pendientes antes de un reinicio
+        await self.outbox.start(self.bot)
         
-        # Ejecutar scheduler en thread separado
-        self.scheduler_thread = threading.Thread(target=self._run_scheduler, daemon=True)
-        self.scheduler_thread.start()
+        await self._schedule_all_slots()
+                
+        # Tareas de mantenimiento: una vez al día, hora del servidor
+        self.scheduler.every_day("23:59", self._async_check_weekly_progress)
+        self.scheduler.every_day(STREAK_DECAY_TIME, self._async_decay_streaks)
+        self.scheduler.start()
+        
+        # Los horarios nuevos pueden venir de comandos atendidos por otras instancias
+        self._refresh_task = asyncio.create_task(self._refresh_slots(), name='slot-refresh')
         
         logger.info("Sistema de notificaciones iniciado")
-        logger.info(f"Recordatorio diario: {DAILY_STUDY_REMINDER}")
-        logger.info(f"Motivación diaria: {MOTIVATIONAL_REMINDER}")
+        await self._log_delivery_counts()
+        logger.info(f"Recordatorio diario: {DAILY_STUDY_REMINDER} ({DEFAULT_TIMEZONE} por defecto)")
+        logger.info(f"Motivación diaria: {MOTIVATIONAL_REMINDER} ({DEFAULT_TIMEZONE} por defecto)")
         
-    def stop_scheduler(self):
-        """Detener el scheduler"""
-        self.running = False
-        schedule.clear()
+    async def _stop_jobs(self):
+        """Detener tareas programadas y outbox (al perder el liderazgo o al apagar)"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+        await self.scheduler.stop()
+        await self.outbox.stop()
         logger.info("Sistema de notificaciones detenido")
         
-    def _run_scheduler(self):
-        """Ejecutar scheduler en loop"""
-        while self.running:
-            schedule.run_pending()
-            time_module.sleep(60)  # Verificar cada minuto
-            
-    def _send_daily_study_reminder(self):
-        """Enviar recordatorio diario de estudio"""
-        asyncio.run(self._async_send_daily_reminder())
+    async def _schedule_all_slots(self):
+        """Un job por horario (zona, hora) en uso; el de valores por defecto siempre existe
+        (salvo el del resumen, que solo corre a la hora que eligió cada usuario)"""
+        for kind in NOTIFICATION_TIME_COLUMNS:
+            if kind != DIGEST_KIND:
+                self._schedule_slot(kind, None, None)
+            for timezone_name, at in await repo.get_notification_slots(kind):
+                self._schedule_slot(kind, timezone_name, at)
+                
+    async def _refresh_slots(self):
+        """Registrar de vez en cuando los horarios que aún no tienen job. Los cambios recibidos por
+        el líder ya se programan en preferences_changed; esto cubre los de otras instancias"""
+        while True:
+            await asyncio.sleep(SLOT_REFRESH_INTERVAL)
+            try:
+                await self._schedule_all_slots()
+            except Exception as e:
+                logger.error(f"Error recargando horarios: {e}")
         
-    def _send_motivational_message(self):
-        """Enviar mensaje motivacional diario"""
-        asyncio.run(self._async_send_motivational_message())
+    async def preferences_changed(self, user_id: int):
+        """Programar los horarios nuevos de un usuario (los ya existentes se ignoran)"""
+        # En un seguidor no hay scheduler: el líder lo toma en su próxima recarga
+        if not self.leader.is_leader:
+            return
+        preferences = await repo.get_notification_preferences(user_id)
+        if not preferences:
+            return
+        timezone_name, reminder_time, motivational_time, digest_time = preferences
+        self._schedule_slot('daily_reminder', timezone_name, reminder_time)
+        self._schedule_slot('motivational', timezone_name, motivational_time)
+        if digest_time:
+            self._schedule_slot(DIGEST_KIND, timezone_name, digest_time)
         
-    def _check_weekly_progress(self):
-        """Verificar progreso semanal y resetear si es necesario"""
-        asyncio.run(self._async_check_weekly_progress())
+    def _schedule_slot(self, kind: str, timezone_name: str, at: str):
+        """Registrar el job diario de un horario; NULL en BD = valor por defecto (el resumen siempre tiene hora)"""
+        default_time = DAILY_STUDY_REMINDER if kind == 'daily_reminder' else MOTIVATIONAL_REMINDER
+        self.scheduler.every_day(
+            at or default_time,
+            functools.partial(self._run_slot, kind, timezone_name, at),
+            name=f"{kind}@{timezone_name or '*'}/{at or '*'}",
+            tz=self._zone(timezone_name)
+        )
         
-    async def _async_send_daily_reminder(self):
-        """Enviar recordatorio diario a todos los usuarios"""
+    def _zone(self, timezone_name: str) -> ZoneInfo:
+        """Zona del usuario; la por defecto si no tiene o no es válida"""
         try:
-            users = get_all_users()
-            
-            for user_id, username in users:
-                try:
-                    stats = get_user_stats(user_id)
-                    if not stats:
-                        continue
-                        
-                    # Calcular semana actual
-                    current_week = self._calculate_current_week(stats)
-                    
-                    # Generar mensaje personalizado
-                    message = self._generate_daily_reminder_message(stats, current_week)
-                    
-                    await self.bot.send_message(
-                        chat_id=user_id,
-                        text=message,
-                        parse_mode='Markdown'
-                    )
-                    
-                    logger.info(f"Recordatorio diario enviado a {username} (ID: {user_id})")
-                    
-                except TelegramError as e:
-                    logger.error(f"Error enviando recordatorio a {user_id}: {e}")
-                    
+            return ZoneInfo(timezone_name or DEFAULT_TIMEZONE)
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning(f"Zona horaria inválida '{timezone_name}', se usa {DEFAULT_TIMEZONE}")
+            return ZoneInfo(DEFAULT_TIMEZONE)
+        
+    async def stop(self, application: Application = None):
+        """Soltar el liderazgo y detener lo que estuviera corriendo (hook post_shutdown)"""
+        await self.leader.stop()
+        
+    async def _async_decay_streaks(self):
+        """Reiniciar streaks vencidos en una sola sentencia SQL"""
+        try:
+            reset_count = await repo.decay_streaks()
+            logger.info(f"Streaks vencidos reiniciados: {reset_count}")
         except Exception as e:
-            logger.error(f"Error en recordatorio diario: {e}")
+            logger.error(f"Error reiniciando streaks: {e}")
             
-    async def _async_send_motivational_message(self):
-        """Enviar mensaje motivacional diario"""
+    async def _run_slot(self, kind: str, timezone_name: str, at: str):
+        """Planificar en el outbox la notificación de los usuarios de un horario, un tramo de
+        usuarios al inicio de cada parte de la ventana: lectura y render también se reparten"""
         try:
-            users = get_all_users()
+            # El día del mensaje es el del usuario (clave de idempotencia del outbox)
+            local_day = datetime.now(self._zone(timezone_name)).date()
             
-            for user_id, username in users:
-                try:
-                    stats = get_user_stats(user_id)
-                    if not stats:
-                        continue
-                        
-                    # Seleccionar frase motivacional única del día
-                    daily_phrase = self._get_daily_motivational_phrase()
-                    
-                    # Generar mensaje motivacional personalizado
-                    message = self._generate_motivational_message(stats, daily_phrase)
-                    
-                    await self.bot.send_message(
-                        chat_id=user_id,
-                        text=message,
-                        parse_mode='Markdown'
-                    )
-                    
-                    logger.info(f"Motivación diaria enviada a {username} (ID: {user_id})")
-                    
-                except TelegramError as e:
-                    logger.error(f"Error enviando motivación a {user_id}: {e}")
-                    
+            # Frase motivacional única del día
+            daily_phrase = self._get_daily_motivational_phrase(local_day)
+            
+            if kind == 'daily_reminder':
+                build_message = self._build_daily_reminder
+            elif kind == DIGEST_KIND:
+                # Recordatorio y motivación del día como secciones de un solo mensaje
+                build_message = lambda stats: [
+                    self._build_daily_reminder(stats),
+                    self._generate_motivational_message(stats, daily_phrase)
+                ]
+            else:
+                build_message = lambda stats: self._generate_motivational_message(stats, daily_phrase)
+                
+            chunks = DISPATCH_CHUNKS if self.dispatch_window > 0 else 1
+            chunk_window = self.dispatch_window / chunks
+            started = time_module.monotonic()
+            for chunk in range(chunks):
+                delay = started + chunk * chunk_window - time_module.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self._plan_for_users(kind, (kind, timezone_name, at), build_message, local_day,
+                                           shard=(chunks, chunk), window=chunk_window)
         except Exception as e:
-            logger.error(f"Error en motivación diaria: {e}")
+            logger.error(f"Error planificando '{kind}' ({timezone_name or '*'} {at or '*'}): {e}")
+            
+    def _build_daily_reminder(self, stats: UserStats) -> str:
+        """Recordatorio diario de un usuario"""
+        # Calcular semana actual
+        current_week = self._calculate_current_week(stats)
+        
+        # Generar mensaje personalizado
+        return self._generate_daily_reminder_message(stats, current_week)
+            
+    async def _plan_for_users(self, kind: str, slot: tuple, build_message, day: date,
+                              shard: tuple = None, window: float = None) -> int:
+        """Generar el mensaje de cada usuario del horario (o de un tramo) y dejarlo en el outbox,
+        página a página; cada mensaje vence dentro de `window` segundos desde ahora"""
+        window = self.dispatch_window if window is None else window
+        planned = 0
+        messages = []
+        async for stats in repo.iter_user_stats(STATS_PAGE_SIZE, slot, shard):
+            messages.append((stats.user_id, build_message(stats)))
+            if len(messages) >= STATS_PAGE_SIZE:
+                planned += await self._plan_page(kind, messages, day, window)
+                messages = []
+                
+        if messages:
+            planned += await self._plan_page(kind, messages, day, window)
+        return planned
+        
+    async def _plan_page(self, kind: str, messages: list, day: date, window: float) -> int:
+        """Dejar en el outbox una página de mensajes; los resúmenes suman lo retenido de cada usuario"""
+        if kind != DIGEST_KIND:
+            return await self.outbox.plan(kind, messages, day=day, window=window)
+            
+        held = await repo.get_held_notifications([user_id for user_id, _ in messages])
+        digests = []
+        for user_id, sections in messages:
+            pending = held.get(user_id, [])
+            sections = sections + [json.loads(payload)['text'] for _, payload in pending]
+            digests.append((user_id, templates.digest_message(sections), [notification_id for notification_id, _ in pending]))
+        return await self.outbox.plan_digests(digests, day=day, window=window)
             
     async def _async_check_weekly_progress(self):
         """Verificar progreso semanal y resetear si es necesario"""
         try:
-            users = get_all_users()
-            
-            for user_id, username in users:
-                try:
-                    stats = get_user_stats(user_id)
-                    if not stats:
-                        continue
-                        
-                    current_week = self._calculate_current_week(stats)
-                    
-                    # Verificar si debe resetear la semana
-                    if await self._should_reset_week(user_id, current_week):
-                        await self._reset_user_to_previous_week(user_id, current_week)
-                        logger.info(f"Usuario {username} reseteado a semana anterior")
-                        
-                except Exception as e:
-                    logger.error(f"Error verificando progreso de {user_id}: {e}")
-                    
+            if WEEK_COMPLETION_REQUIRED and AUTO_RESET_INCOMPLETE_WEEKS:
+                started = time_module.monotonic()
+                
+                # Pipeline por conjuntos: vencidos (SQL) → estado en lote → resets en
+                # una transacción → notificaciones concurrentes
+                resets, deadlines = await self._find_incomplete_weeks()
+                await repo.reset_weeks([(user_id, max(1, week - 1)) for user_id, week in resets], deadlines)
+                await self._notify_week_resets(resets)
+                
+                logger.info(f"Verificación semanal: {len(resets)} usuarios reseteados "
+                            f"en {time_module.monotonic() - started:.2f}s")
+                
         except Exception as e:
             logger.error(f"Error en verificación semanal: {e}")
             
-    def _calculate_current_week(self, stats: Dict[str, Any]) -> int:
+        # Métricas diarias de la caché para dimensionarla
+        logger.info(f"Caché: {cache_report(user_stats_cache, week_status_cache)}")
+        await self._log_delivery_counts()
+        
+    async def _log_delivery_counts(self):
+        """Métricas de entrega: cada chat inaccesible es un envío menos por notificación"""
+        try:
+            counts = await repo.get_delivery_counts()
+            logger.info(f"Entrega: {counts['reachable']} usuarios alcanzables, {counts['blocked']} inaccesibles "
+                        f"({counts['blocked_last_day']} nuevos en 24h); se evitan {counts['blocked']} envíos "
+                        f"por notificación")
+        except Exception as e:
+            logger.error(f"Error obteniendo métricas de entrega: {e}")
+        
+    async def _find_incomplete_weeks(self) -> tuple:
+        """Usuarios fuera de plazo que no completaron su semana [(user_id, semana)] y el próximo
+        plazo de cada usuario revisado [(user_id, next_deadline)]: nadie se revisa dos noches seguidas"""
+        today = date.today()
+        candidates = await repo.get_overdue_week_users()
+        overdue = [(user_id, week, days) for user_id, _, week, days, is_overdue in candidates if is_overdue]
+        statuses = await repo.get_week_statuses([(user_id, week) for user_id, week, _ in overdue])
+        
+        # Sin plazo vencido según la regla exacta: solo se reprograma
+        deadlines = [
+            (user_id, next_week_deadline(today, days))
+            for user_id, _, _, days, is_overdue in candidates if not is_overdue
+        ]
+        resets = []
+        for user_id, week, days in overdue:
+            if not statuses[(user_id, week)].complete:
+                resets.append((user_id, week))
+                deadlines.append((user_id, next_week_deadline(today, days, reset=True)))
+            elif week < TOTAL_WEEKS:
+                deadlines.append((user_id, next_week_deadline(today, days)))
+            else:
+                # Programa terminado: sale del índice de plazos
+                deadlines.append((user_id, None))
+        return resets, deadlines
+        
+    async def _notify_week_resets(self, resets: list):
+        """Dejar en el outbox el aviso de cada reset"""
+        await self.outbox.plan('week_reset', [
+            (user_id, self._generate_week_reset_message(week)) for user_id, week in resets
+        ], window=self.dispatch_window)
+            
+    def _calculate_current_week(self, stats: UserStats) -> int:
         """Calcular semana actual basada en fecha de inicio"""
-        if not stats.get('start_date'):
+        if not stats.start_date:
             return 1
             
-        start_date = datetime.strptime(str(stats['start_date']), "%Y-%m-%d").date()
+        start_date = stats.start_date
         days_passed = (datetime.now().date() - start_date).days
         current_week = min((days_passed // 7) + 1, 12)
         
         return current_week
         
-    def _get_daily_motivational_phrase(self) -> str:
+    def _get_daily_motivational_phrase(self, today: date = None) -> str:
         """Obtener frase motivacional única del día"""
         # Usar fecha como seed para consistencia diaria
-        today = datetime.now().date()
+        today = today or datetime.now().date()
         random.seed(today.toordinal())
         
         phrase = random.choice(AI_MOTIVATIONAL_PHRASES)
@@ -187,140 +309,17 @@ class NotificationManager:
         
         return phrase
         
-    def _generate_daily_reminder_message(self, stats: Dict[str, Any], current_week: int) -> str:
-        """Generar mensaje de recordatorio personalizado"""
-        username = stats.get('username', 'Developer')
-        streak = stats.get('current_streak', 0)
-        total_hours = stats.get('total_hours', 0)
-        
-        # Mensaje base
-        message = f"☀️ **¡Buenos días, {username}!**\n\n"
+    def _generate_daily_reminder_message(self, stats: UserStats, current_week: int) -> str:
+        """Generar mensaje de recordatorio personalizado (plantilla por tier de streak y semana)"""
+        return templates.render_daily_reminder(stats, current_week)
         
-        # Estadísticas motivacionales
-        if streak >= 5:
-            message += f"🔥 **¡Increíble streak de {streak} días!** Eres imparable\n\n"
-        elif streak > 0:
-            message += f"⭐ **Streak de {streak} días** - ¡Mantén el impulso!\n\n"
-        else:
-            message += f"🌟 **¡Nuevo día, nueva oportunidad!** Empieza tu streak hoy\n\n"
-            
-        # Información de la semana
-        message += f"📅 **Semana {current_week}/12** - ¡Sigues avanzando!\n"
-        message += f"⏰ **Horas acumuladas:** {total_hours:.1f}h\n\n"
-        
-        # Recordatorio de estudio
-        message += f"📚 **Recordatorio de hoy:**\n"
-        message += f"• Dedica al menos 1 hora a programar\n"
-        message += f"• Regla 70/30: más código, menos videos\n"
-        message += f"• Registra tu progreso con /estudie\n\n"
-        
-        # Call to action
-        message += f"🎯 **¡Empieza ahora!** Envía /semana para ver qué trabajar hoy\n\n"
-        message += f"💪 **¡Tu futuro developer te está esperando!**"
-        
-        return message
-        
-    def _generate_motivational_message(self, stats: Dict[str, Any], daily_phrase: str) -> str:
-        """Generar mensaje motivacional personalizado"""
-        username = stats.get('username', 'Developer')
-        current_week = self._calculate_current_week(stats)
-        
-        message = f"🌙 **¡Buenas noches, {username}!**\n\n"
-        message += f"💭 **Inspiración del día:**\n{daily_phrase}\n\n"
-        
-        # Reflexión del día
-        message += f"🤔 **Reflexión:**\n"
-        message += f"• ¿Qué aprendiste hoy?\n"
-        message += f"• ¿Qué reto superaste?\n"
-        message += f"• ¿Cómo te acercaste a tu objetivo?\n\n"
-        
-        # Motivación para mañana
-        message += f"🌅 **Mañana será un gran día para:**\n"
-        message += f"• Escribir código que funcione\n"
-        message += f"• Resolver un problema complejo\n"
-        message += f"• Aprender algo nuevo\n\n"
-        
-        message += f"✨ **¡Descansa bien, mañana seguimos construyendo tu futuro!**"
-        
-        return message
-        
-    async def _should_reset_week(self, user_id: int, current_week: int) -> bool:
-        """Verificar si debe resetear la semana por falta de progreso"""
-        if not WEEK_COMPLETION_REQUIRED or not AUTO_RESET_INCOMPLETE_WEEKS:
-            return False
-            
-        # Verificar si ha pasado el deadline
-        stats = get_user_stats(user_id)
-        if not stats:
-            return False
-            
-        start_date = datetime.strptime(str(stats['start_date']), "%Y-%m-%d").date()
-        days_passed = (datetime.now().date() - start_date).days
-        
-        # Si han pasado más de 7 días desde el inicio de la semana
-        week_start_day = (current_week - 1) * 7
-        if days_passed <= week_start_day + WEEK_DEADLINE_DAYS:
-            return False
-            
-        # Verificar si completó los requisitos de la semana
-        return not await self._week_completed(user_id, current_week)
+    def _generate_motivational_message(self, stats: UserStats, daily_phrase: str) -> str:
+        """Generar mensaje motivacional personalizado (plantilla por frase del día)"""
+        return templates.render_motivational(stats, daily_phrase)
         
-    async def _week_completed(self, user_id: int, week: int) -> bool:
-        """Verificar si completó todos los requisitos de la semana"""
-        # Verificar evidencias
-        evidence_status = evidence_validator.get_week_evidence_status(user_id, week)
-        for evidence_type, status in evidence_status.items():
-            if status['status'] != 'approved':
-                return False
-                
-        # Verificar examen
-        exam_result = exam_manager.get_latest_exam_result(user_id, week)
-        if not exam_result or not exam_result['passed']:
-            return False
-            
-        return True
-        
-    async def _reset_user_to_previous_week(self, user_id: int, current_week: int):
-        """Resetear usuario a la semana anterior"""
-        try:
-            previous_week = max(1, current_week - 1)
-            
-            # Actualizar semana en base de datos
-            update_progress(user_id, 'reset_week', previous_week)
-            
-            # Enviar notificación de reset
-            message = f"""
-⚠️ **SEMANA RESTABLECIDA**
-
-📅 **De semana {current_week} → semana {previous_week}**
-
-🎯 **Motivo:** No completaste todos los requisitos de la semana {current_week}
-
-📋 **Para avanzar necesitas:**
-• ✅ Completar proyecto semanal
-• ✅ Aprobar examen (70% mínimo)
-• ✅ Enviar todas las evidencias
-
-💪 **¡No te desanimes!** Cada reset es una oportunidad para:
-• Reforzar conceptos
-• Mejorar tu proyecto
-• Dominar completamente la semana
-
-🚀 **Usa /semana para ver qué completar**
-
-¡Tú puedes hacerlo! 💪
-"""
-            
-            await self.bot.send_message(
-                chat_id=user_id,
-                text=message,
-                parse_mode='Markdown'
-            )
-            
-            logger.info(f"Usuario {user_id} reseteado de semana {current_week} a {previous_week}")
-            
-        except Exception as e:
-            logger.error(f"Error reseteando usuario {user_id}: {e}")
+    def _generate_week_reset_message(self, current_week: int) -> str:
+        """Generar aviso de semana restablecida"""
+        return templates.week_reset_message(current_week)
 
 # Instancia global
-notification_manager = NotificationManager(BOT_TOKEN)
+notification_manager = NotificationManager()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Outbox persistente de notificaciones del Bot Mentor
+Los envíos masivos se planifican en SQLite y un despachador los entrega con reintentos,
+así un reinicio a mitad de broadcast retoma donde quedó sin duplicar mensajes del día
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import date, timedelta
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+
+from config import (
+    OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS, OUTBOX_BACKOFF_BASE, OUTBOX_BACKOFF_MAX,
+    OUTBOX_RETENTION_DAYS, LEADER_LEASE_TTL
+)
+from broadcast import BroadcastEngine, BroadcastReport
+from repository import repo
+
+logger = logging.getLogger(__name__)
+
+def backoff_delay(attempts: int) -> float:
+    """Espera exponencial con jitter tras `attempts` intentos fallidos"""
+    delay = min(OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+def is_transient(error: TelegramError) -> bool:
+    """Errores que vale la pena reintentar (red, timeouts, flood wait)"""
+    return isinstance(error, RetryAfter) or (
+        isinstance(error, NetworkError) and not isinstance(error, BadRequest)
+    )
+
+def is_unreachable(error: TelegramError) -> bool:
+    """El usuario bloqueó el bot, borró su cuenta o el chat ya no existe: no tiene sentido reintentar"""
+    return isinstance(error, Forbidden) or (
+        isinstance(error, BadRequest) and 'chat not found' in error.message.lower()
+    )
+
+def dispatch_offset(user_id: int, window: float) -> float:
+    """Desfase estable (s) del usuario dentro de una ventana de `window` segundos
+
+    Hash multiplicativo (Fibonacci) determinista, igual en cada reinicio e instancia: cada
+    usuario recibe todos los días a la misma hora y los envíos quedan repartidos de forma
+    uniforme en la ventana
+    """
+    if window <= 0:
+        return 0.0
+    return (user_id * 0x9E3779B97F4A7C15 % 2 ** 64) / 2 ** 64 * window
+
+class OutboxDispatcher:
+    def __init__(self, broadcaster: BroadcastEngine):
+        """Inicializar despachador sobre el motor de envíos masivos"""
+        self.broadcaster = broadcaster
+        self.bot = None
+        self._task = None
+        self._wakeup = asyncio.Event()
+
+    async def plan(self, kind: str, messages: list, parse_mode: str = 'Markdown', day: date = None,
+                   window: float = 0) -> int:
+        """Guardar en el outbox los mensajes [(user_id, texto)] del día y despertar al despachador
+
+        Con `window` (s) cada mensaje vence en el desfase propio de su usuario dentro de la ventana
+        """
+        day = day or date.today()
+        now = time.time()
+        payloads = [
+            (user_id, json.dumps({'text': text, 'parse_mode': parse_mode}), now + dispatch_offset(user_id, window))
+            for user_id, text in messages
+        ]
+        added = await repo.enqueue_notifications(kind, day, payloads)
+        logger.info(f"Outbox '{kind}': {added} mensajes planificados "
+                    f"({len(payloads) - added} omitidos: ya existían o chat inaccesible)")
+        self._wakeup.set()
+        return added
+
+    async def plan_digests(self, digests: list, parse_mode: str = 'Markdown', day: date = None,
+                           window: float = 0) -> int:
+        """Guardar los resúmenes [(user_id, texto, ids_retenidos)] del día y despertar al despachador"""
+        day = day or date.today()
+        now = time.time()
+        payloads = [
+            (user_id, json.dumps({'text': text, 'parse_mode': parse_mode}),
+             now + dispatch_offset(user_id, window), merged_ids)
+            for user_id, text, merged_ids in digests
+        ]
+        added = await repo.enqueue_digests(day, payloads)
+        merged = sum(len(merged_ids) for *_, merged_ids in payloads)
+        logger.info(f"Outbox 'digest': {added} resúmenes planificados con {merged} mensajes retenidos")
+        self._wakeup.set()
+        return added
+
+    async def start(self, bot):
+        """Reanudar lo pendiente e iniciar el loop de despacho"""
+        self.bot = bot
+        await self._resume_abandoned()
+        purged = await repo.purge_notifications(date.today() - timedelta(days=OUTBOX_RETENTION_DAYS))
+        if purged:
+            logger.info(f"Outbox: {purged} mensajes antiguos eliminados")
+        self._task = asyncio.create_task(self._run(), name='outbox-dispatcher')
+
+    async def stop(self):
+        """Detener el despachador; lo no enviado queda pendiente en la BD"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        """Despachar lotes mientras haya mensajes vencidos; si no, dormir hasta el próximo"""
+        # Totales desde que el outbox dejó de estar vacío hasta que se vacía de nuevo
+        drain = None
+        while True:
+            self._wakeup.clear()
+            try:
+                report = await self.dispatch_batch()
+                if report:
+                    drain = self._accumulate(drain, report)
+                    continue
+                if drain:
+                    logger.info(drain.summary())
+                    drain = None
+                if await self._resume_abandoned():
+                    continue
+                next_due = await repo.next_notification_due(LEADER_LEASE_TTL)
+            except Exception as e:
+                logger.error(f"Error en despachador del outbox: {e}")
+                next_due = time.time() + OUTBOX_BACKOFF_BASE
+
+            timeout = None if next_due is None else max(0.0, next_due - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _resume_abandoned(self) -> int:
+        """Reanudar lo que quedó en envío hace más de un TTL del lease: el líder anterior ya no
+        puede estar enviándolo (lo más reciente podría seguir en curso durante un relevo)"""
+        resumed = await repo.requeue_inflight_notifications(time.time() - LEADER_LEASE_TTL)
+        if resumed:
+            logger.warning(f"Outbox: {resumed} mensajes interrumpidos se reintentarán")
+        return resumed
+
+    @staticmethod
+    def _accumulate(total: BroadcastReport, report: BroadcastReport) -> BroadcastReport:
+        """Sumar el reporte de un lote al del vaciado en curso"""
+        if total is None:
+            total = BroadcastReport('outbox')
+        total.sent += report.sent
+        total.skipped += report.skipped
+        total.failed += report.failed
+        total.retries += report.retries
+        total.duration += report.duration
+        return total
+
+    async def dispatch_batch(self) -> BroadcastReport:
+        """Enviar un lote de mensajes vencidos y registrar su resultado en una transacción"""
+        rows = await repo.claim_notifications(OUTBOX_BATCH_SIZE)
+        if not rows:
+            return None
+
+        sent_ids, retries, failures = [], [], []
+        unreachable = {}  # user_id -> error
+
+        def on_result(chat_id: int, row: tuple, error: TelegramError):
+            notification_id, user_id, kind, _, attempts = row
+            if error is None:
+                sent_ids.append(notification_id)
+            elif is_unreachable(error):
+                failures.append((notification_id, str(error)))
+                unreachable[user_id] = str(error)
+            elif is_transient(error) and attempts + 1 < OUTBOX_MAX_ATTEMPTS:
+                retries.append((notification_id, time.time() + backoff_delay(attempts + 1), str(error)))
+            else:
+                failures.append((notification_id, str(error)))
+                logger.error(f"Outbox: '{kind}' para {chat_id} descartado tras {attempts + 1} intentos: {error}")
+
+        async def build_message(chat_id: int, row: tuple):
+            return json.loads(row[3])
+
+        try:
+            return await self.broadcaster.broadcast(
+                self.bot, f'outbox lote de {len(rows)}', ((row[1], row) for row in rows),
+                build_message, on_result
+            )
+        except Exception as e:
+            # Error inesperado: lo que quedó sin resultado se reintenta con backoff
+            done = set(sent_ids) | {r[0] for r in retries} | {f[0] for f in failures}
+            retries.extend(
+                (row[0], time.time() + backoff_delay(row[4] + 1), str(e))
+                for row in rows if row[0] not in done
+            )
+            raise
+        finally:
+            # Lo interrumpido sigue en 'sending' y se reanuda pasado un TTL del lease
+            await asyncio.shield(repo.complete_notifications(sent_ids, retries, failures))
+            if unreachable:
+                await asyncio.shield(self._deactivate(unreachable))
+
+    async def _deactivate(self, unreachable: dict):
+        """Sacar de los próximos envíos a los chats que Telegram rechazó definitivamente"""
+        reasons = {}
+        for user_id, error in unreachable.items():
+            reasons.setdefault(error, []).append(user_id)
+        deactivated = 0
+        for error, user_ids in reasons.items():
+            deactivated += await repo.deactivate_users(user_ids, error)
+        logger.info(f"Outbox: {deactivated} chats inaccesibles excluidos de los envíos")
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Repositorio asíncrono del Bot Mentor
+Ejecuta todo el acceso a SQLite fuera del event loop para que ningún handler se bloquee
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Optional
+
+from config import DB_READ_THREADS, STATS_PAGE_SIZE
+import database
+import week_status
+from evidence_manager import evidence_validator, exam_manager
+
+logger = logging.getLogger(__name__)
+
+class AsyncRepository:
+    def __init__(self, read_threads: int = DB_READ_THREADS):
+        """Inicializar ejecutores: un único hilo escritor y un pool de lectores"""
+        # SQLite solo admite un escritor a la vez; con WAL los lectores no lo esperan
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self._readers = ThreadPoolExecutor(max_workers=read_threads, thread_name_prefix='db-reader')
+
+    async def _read(self, func, *args):
+        """Ejecutar una consulta en el pool de lectura"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, functools.partial(func, *args))
+
+    async def _write(self, func, *args):
+        """Ejecutar una escritura en el hilo escritor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, functools.partial(func, *args))
+
+    # Usuarios y progreso
+
+    async def init_user(self, user_id: int, username: str):
+        """Crear usuario si no existe"""
+        await self._write(database.init_db, user_id, username)
+
+    async def update_progress(self, user_id: int, progress_type: str, value):
+        """Actualizar progreso del usuario"""
+        await self._write(database.update_progress, user_id, progress_type, value)
+
+    async def get_user_stats(self, user_id: int) -> Optional[database.UserStats]:
+        """Obtener estadísticas del usuario"""
+        return await self._read(database.get_user_stats, user_id)
+
+    async def iter_user_stats(self, batch_size: int = STATS_PAGE_SIZE, slot: tuple = None,
+                              shard: tuple = None) -> AsyncIterator[database.UserStats]:
+        """Recorrer las estadísticas de los usuarios activos en páginas de `batch_size` (memoria acotada)"""
+        after_user_id = 0
+        while True:
+            # Cada página es una consulta corta: no se retiene la conexión entre páginas
+            page = await self._read(database.get_user_stats_page, after_user_id, batch_size, slot, shard)
+            for stats in page:
+                yield stats
+            if len(page) < batch_size:
+                return
+            after_user_id = page[-1].user_id
+
+    async def get_all_users(self) -> list:
+        """Obtener usuarios activos"""
+        return await self._read(database.get_all_users)
+
+    async def decay_streaks(self) -> int:
+        """Reiniciar streaks vencidos (tarea diaria)"""
+        return await self._write(database.decay_streaks)
+
+    async def get_overdue_week_users(self) -> list:
+        """Usuarios con el plazo de su semana vencido (y si la regla exacta lo confirma)"""
+        return await self._read(database.get_overdue_week_users)
+
+    async def reset_weeks(self, resets: list, deadlines: list = ()) -> int:
+        """Aplicar resets de semana y próximos plazos en lote"""
+        return await self._write(database.reset_weeks, resets, deadlines)
+
+    async def reset_user(self, user_id: int, username: str):
+        """Reiniciar completamente el progreso de un usuario"""
+        await self._write(database.reset_user, user_id, username)
+
+    # Preferencias de notificación
+
+    async def set_notification_preferences(self, user_id: int, **preferences) -> bool:
+        """Guardar zona horaria y/o horarios de notificación"""
+        return await self._write(functools.partial(database.set_notification_preferences, user_id, **preferences))
+
+    async def get_notification_preferences(self, user_id: int):
+        """Obtener zona horaria y horarios del usuario"""
+        return await self._read(database.get_notification_preferences, user_id)
+
+    async def get_notification_slots(self, kind: str) -> list:
+        """Horarios (timezone, hora) en uso para un tipo de notificación"""
+        return await self._read(database.get_notification_slots, kind)
+
+    # Outbox de notificaciones
+
+    async def enqueue_notifications(self, kind: str, day, messages: list) -> int:
+        """Agregar mensajes al outbox (idempotente por usuario, tipo y día)"""
+        return await self._write(database.enqueue_notifications, kind, day, messages)
+
+    async def get_held_notifications(self, user_ids: list) -> dict:
+        """Mensajes retenidos para el resumen de cada usuario"""
+        return await self._read(database.get_held_notifications, user_ids)
+
+    async def enqueue_digests(self, day, digests: list) -> int:
+        """Agregar resúmenes y marcar lo retenido como agrupado"""
+        return await self._write(database.enqueue_digests, day, digests)
+
+    async def claim_notifications(self, limit: int) -> list:
+        """Tomar un lote de mensajes vencidos"""
+        return await self._write(database.claim_notifications, limit)
+
+    async def complete_notifications(self, sent_ids: list, retries: list, failures: list):
+        """Registrar el resultado de un lote"""
+        await self._write(database.complete_notifications, sent_ids, retries, failures)
+
+    async def requeue_inflight_notifications(self, claimed_before: float) -> int:
+        """Reanudar mensajes abandonados a mitad de envío"""
+        return await self._write(database.requeue_inflight_notifications, claimed_before)
+
+    async def next_notification_due(self, inflight_timeout: float):
+        """Instante del próximo mensaje pendiente (o en envío por vencer)"""
+        return await self._read(database.next_notification_due, inflight_timeout)
+
+    async def purge_notifications(self, before) -> int:
+        """Eliminar mensajes ya resueltos"""
+        return await self._write(database.purge_notifications, before)
+
+    # Estado de entrega
+
+    async def deactivate_users(self, user_ids: list, reason: str) -> int:
+        """Excluir de los envíos a chats inaccesibles"""
+        return await self._write(database.deactivate_users, user_ids, reason)
+
+    async def reactivate_user(self, user_id: int) -> bool:
+        """Volver a incluir a un usuario en los envíos"""
+        return await self._write(database.reactivate_user, user_id)
+
+    async def get_delivery_counts(self) -> dict:
+        """Usuarios alcanzables e inaccesibles"""
+        return await self._read(database.get_delivery_counts)
+
+    # Elección de líder
+
+    async def acquire_lease(self, name: str, holder: str, ttl: float) -> bool:
+        """Tomar o renovar un lease de liderazgo"""
+        return await self._write(database.acquire_lease, name, holder, ttl)
+
+    async def release_lease(self, name: str, holder: str) -> bool:
+        """Liberar un lease propio"""
+        return await self._write(database.release_lease, name, holder)
+
+    # Evidencias y exámenes
+
+    async def submit_evidence(self, user_id: int, week: int, evidence_type: str, content: str) -> dict:
+        """Guardar evidencia y validarla sin bloquear el event loop"""
+        await self._write(evidence_validator.record_evidence, user_id, week, evidence_type, content)
+
+        # La validación HTTP es asíncrona (pool compartido): no ocupa hilos ni bloquea el loop
+        return await evidence_validator.validate_evidence(user_id, week, evidence_type, content)
+
+    async def enqueue_evidence(self, user_id: int, week: int, evidence_type: str, content: str) -> int:
+        """Guardar evidencia pendiente y su trabajo de validación"""
+        return await self._write(evidence_validator.record_evidence, user_id, week, evidence_type, content, True)
+
+    async def claim_validation_job(self):
+        """Tomar el siguiente trabajo de validación"""
+        return await self._write(evidence_validator.claim_validation_job)
+
+    async def claim_validation_jobs(self, evidence_type: str, limit: int) -> list:
+        """Tomar varios trabajos de un tipo para validarlos en lote"""
+        return await self._write(evidence_validator.claim_validation_jobs, evidence_type, limit)
+
+    async def complete_validation_job(self, job_id: int, user_id: int, week: int, evidence_type: str,
+                                      content: str, result: dict) -> bool:
+        """Guardar el veredicto de un trabajo"""
+        return await self._write(evidence_validator.complete_validation_job,
+                                 job_id, user_id, week, evidence_type, content, result)
+
+    async def fail_validation_job(self, job_id: int, error: str, retry: bool) -> bool:
+        """Reintentar o descartar un trabajo fallido"""
+        return await self._write(evidence_validator.fail_validation_job, job_id, error, retry)
+
+    async def defer_validation_jobs(self, job_ids: list, not_before: float, error: str) -> int:
+        """Devolver trabajos a la cola hasta `not_before` (cuota agotada)"""
+        return await self._write(evidence_validator.defer_validation_jobs, job_ids, not_before, error)
+    
+    async def requeue_running_validation_jobs(self, older_than: float) -> int:
+        """Reanudar trabajos abandonados a mitad"""
+        return await self._write(evidence_validator.requeue_running_validation_jobs, older_than)
+
+    async def purge_validation_jobs(self, before: float) -> int:
+        """Eliminar trabajos ya resueltos"""
+        return await self._write(evidence_validator.purge_validation_jobs, before)
+
+    async def get_validation_queue_stats(self) -> dict:
+        """Profundidad y espera de la cola de validación"""
+        return await self._read(evidence_validator.get_validation_queue_stats)
+
+    async def get_week_evidence_status(self, user_id: int, week: int) -> dict:
+        """Obtener estado de evidencias de una semana"""
+        return await self._read(evidence_validator.get_week_evidence_status, user_id, week)
+
+    async def get_week_status(self, user_id: int, week: int) -> week_status.WeekStatus:
+        """Obtener estado completo (evidencias + examen) de una semana"""
+        return await self._read(week_status.get_week_status, user_id, week)
+
+    async def get_week_statuses(self, pairs: list) -> dict:
+        """Obtener estado de muchos (usuario, semana) en una sola consulta"""
+        return await self._read(week_status.get_week_statuses, pairs)
+
+    async def can_advance_to_week(self, user_id: int, target_week: int) -> tuple:
+        """Verificar si puede avanzar a la semana objetivo"""
+        return await self._read(evidence_validator.can_advance_to_week, user_id, target_week)
+
+    async def start_exam(self, user_id: int, week: int, exam_type: str = 'weekly') -> tuple:
+        """Iniciar examen para una semana"""
+        return await self._read(exam_manager.start_exam, user_id, week, exam_type)
+
+    async def get_latest_exam_result(self, user_id: int, week: int):
+        """Obtener último resultado del examen"""
+        return await self._read(exam_manager.get_latest_exam_result, user_id, week)
+
+    def close(self):
+        """Esperar las operaciones pendientes y liberar los hilos"""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        logger.info("Repositorio de datos cerrado")
+
+# Instancia global
+repo = AsyncRepository()
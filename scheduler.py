@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Scheduler asíncrono del Bot Mentor
+Ejecuta tareas diarias dentro del event loop de la aplicación, despertando a la hora exacta
+Cada tarea tiene su zona horaria; el heap ordena por instante UTC (O(log n) por evento)
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta, time, timezone, tzinfo
+from typing import Awaitable, Callable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+class ScheduledJob(NamedTuple):
+    """Entrada del heap: la próxima ejecución más cercana queda arriba"""
+    run_at: datetime  # Instante UTC
+    seq: int  # Desempate estable entre tareas a la misma hora
+    name: str
+    at: time
+    tz: Optional[tzinfo]  # None = hora local del servidor
+    callback: Callable[[], Awaitable[None]]
+
+def _utcnow() -> datetime:
+    """Instante actual con zona UTC"""
+    return datetime.now(timezone.utc)
+
+def _next_run(at: time, tz: Optional[tzinfo], now: datetime) -> datetime:
+    """Próxima ocurrencia (en UTC) de la hora local `at` estrictamente posterior a `now`"""
+    local_now = now.astimezone(tz)
+    for days in (0, 1, 2):
+        # combine() por fecha (no sumar 24 h) para que los cambios de horario no corran la hora
+        day = local_now.date() + timedelta(days=days)
+        run_at = datetime.combine(day, at, tzinfo=local_now.tzinfo if tz is None else tz)
+        if run_at > now:
+            return run_at.astimezone(timezone.utc)
+
+class AsyncDailyScheduler:
+    def __init__(self):
+        """Inicializar heap de tareas diarias (cada una en su zona horaria)"""
+        self._heap: List[ScheduledJob] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._loop_task = None
+        self._running_jobs = set()
+        self._names = set()
+
+    def every_day(self, at: str, callback: Callable[[], Awaitable[None]], name: str = None,
+                  tz: tzinfo = None) -> bool:
+        """Programar `callback` todos los días a la hora "HH:MM" de `tz`; False si `name` ya existe"""
+        name = name or callback.__name__
+        if name in self._names:
+            return False
+        job_time = time.fromisoformat(at)
+        job = ScheduledJob(_next_run(job_time, tz, _utcnow()), next(self._seq), name, job_time, tz, callback)
+        heapq.heappush(self._heap, job)
+        self._names.add(name)
+        self._wakeup.set()
+        logger.info(f"Tarea '{job.name}' programada a las {at} (próxima: {job.run_at.astimezone(tz):%Y-%m-%d %H:%M %Z})")
+        return True
+
+    def start(self):
+        """Iniciar el loop del scheduler en el event loop actual"""
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run(), name='daily-scheduler')
+
+    async def stop(self):
+        """Detener el scheduler y cancelar las tareas en curso"""
+        tasks = list(self._running_jobs)
+        if self._loop_task is not None:
+            tasks.append(self._loop_task)
+            self._loop_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._heap.clear()
+        self._names.clear()
+
+    def jobs(self) -> List[ScheduledJob]:
+        """Tareas programadas ordenadas por próxima ejecución"""
+        return sorted(self._heap)
+
+    async def _run(self):
+        """Dormir hasta la próxima tarea, lanzarla y reprogramarla para el día siguiente"""
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            # Se recalcula con el reloj de pared al despertar: sin deriva acumulada
+            delay = (self._heap[0].run_at - _utcnow()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job = heapq.heappop(self._heap)
+            heapq.heappush(self._heap, job._replace(run_at=_next_run(job.at, job.tz, _utcnow()),
+                                                    seq=next(self._seq)))
+            self._launch(job)
+
+    def _launch(self, job: ScheduledJob):
+        """Ejecutar la tarea sin bloquear el loop del scheduler"""
+        async def run_job():
+            try:
+                await job.callback()
+            except Exception as e:
+                logger.error(f"Error en tarea programada '{job.name}': {e}", exc_info=True)
+
+        task = asyncio.create_task(run_job(), name=f'job-{job.name}')
+        self._running_jobs.add(task)
+        task.add_done_callback(self._running_jobs.discard)
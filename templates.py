@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Plantillas de mensajes del Bot Mentor
+Cada texto se compila una vez por bucket (tier de streak, semana, frase del día) y
+por usuario solo se rellenan los campos propios (nombre, streak, horas)
+"""
+
+from functools import lru_cache
+
+from config import STUDY_GUIDE
+from database import UserStats
+
+# Contenido mostrado después de la última semana del programa
+PROGRAM_COMPLETED_CONTENT = {
+    "title": "Programa Completado",
+    "phase": "Job Search",
+    "goal": "¡Felicidades! Has terminado el programa",
+    "videos": "Repaso y mejoras de portfolio",
+    "tools": "LinkedIn, AngelList, Indeed",
+    "project": {
+        "name": "Búsqueda activa de empleo",
+        "requirements": "• Aplicar a 5 posiciones diarias\n• Networking en LinkedIn\n• Mejorar portfolio"
+    },
+    "estimated_time": "Full time job hunting",
+    "tip": "¡Es hora de conseguir ese trabajo!",
+    "daily_goal": "Aplica a 5 posiciones por día"
+}
+
+# Tips adicionales específicos por semana
+EXTRA_WEEK_TIPS = {
+    1: "• Flexbox = 1 dimensión (fila O columna)\n• Grid = 2 dimensiones (filas Y columnas)\n• Practica 30 min diarios mínimo",
+    2: "• Mobile-first = diseña para 320px primero\n• Después agrega breakpoints\n• Usa rem/em en lugar de px",
+    3: "• Variables CSS van en :root\n• Úsalas para colores y espaciado\n• Mantiene consistencia",
+    4: "• Grid para layout principal\n• Flexbox para alineación interna\n• Combina ambas técnicas",
+    5: "• const para valores fijos\n• let para variables\n• Evita var por completo",
+    6: "• querySelector > getElementById\n• addEventListener > onclick\n• Valida que elementos existan",
+    7: "• fetch() devuelve promesas\n• Siempre maneja errores\n• async/await > .then()",
+    8: "• Planifica antes de codear\n• Divide en tareas pequeñas\n• Un feature a la vez"
+}
+
+def week_content(week: int) -> dict:
+    """Obtener contenido de la semana específica"""
+    return STUDY_GUIDE.get(week, PROGRAM_COMPLETED_CONTENT)
+
+# Marca de los campos por usuario; la plantilla se guarda partida en sus tramos fijos
+# y se rellena con una f-string (más rápido que str.format o concatenar con +=)
+_FIELD = '\x00'
+
+# Notificaciones diarias
+
+def streak_tier(streak: int) -> str:
+    """Bucket del streak: define qué frase lleva el recordatorio"""
+    if streak >= 5:
+        return 'fire'
+    return 'active' if streak > 0 else 'new'
+
+_STREAK_LINES = {
+    'fire': f"🔥 **¡Increíble streak de {_FIELD} días!** Eres imparable\n\n",
+    'active': f"⭐ **Streak de {_FIELD} días** - ¡Mantén el impulso!\n\n",
+    # Sin número de días: el campo del streak queda vacío al final de la línea
+    'new': f"🌟 **¡Nuevo día, nueva oportunidad!** Empieza tu streak hoy\n\n{_FIELD}"
+}
+
+@lru_cache(maxsize=256)
+def daily_reminder_template(tier: str, week: int) -> tuple:
+    """Tramos fijos del recordatorio diario para un tier de streak y una semana
+
+    Campos entre tramos: nombre, streak, horas
+    """
+    return tuple((
+        f"☀️ **¡Buenos días, {_FIELD}!**\n\n"
+        + _STREAK_LINES[tier]
+        + f"📅 **Semana {week}/12** - ¡Sigues avanzando!\n"
+        f"⏰ **Horas acumuladas:** {_FIELD}h\n\n"
+        "📚 **Recordatorio de hoy:**\n"
+        "• Dedica al menos 1 hora a programar\n"
+        "• Regla 70/30: más código, menos videos\n"
+        "• Registra tu progreso con /estudie\n\n"
+        "🎯 **¡Empieza ahora!** Envía /semana para ver qué trabajar hoy\n\n"
+        "💪 **¡Tu futuro developer te está esperando!**"
+    ).split(_FIELD))
+
+def render_daily_reminder(stats: UserStats, current_week: int) -> str:
+    """Recordatorio diario personalizado"""
+    tier = streak_tier(stats.current_streak)
+    head, after_name, after_streak, tail = daily_reminder_template(tier, current_week)
+    streak = '' if tier == 'new' else stats.current_streak
+    return f"{head}{stats.username or 'Developer'}{after_name}{streak}{after_streak}{stats.total_hours:.1f}{tail}"
+
+@lru_cache(maxsize=32)
+def motivational_template(daily_phrase: str) -> tuple:
+    """Tramos fijos del mensaje motivacional para la frase del día (campo: nombre)"""
+    return tuple((
+        f"🌙 **¡Buenas noches, {_FIELD}!**\n\n"
+        f"💭 **Inspiración del día:**\n{daily_phrase}\n\n"
+        "🤔 **Reflexión:**\n"
+        "• ¿Qué aprendiste hoy?\n"
+        "• ¿Qué reto superaste?\n"
+        "• ¿Cómo te acercaste a tu objetivo?\n\n"
+        "🌅 **Mañana será un gran día para:**\n"
+        "• Escribir código que funcione\n"
+        "• Resolver un problema complejo\n"
+        "• Aprender algo nuevo\n\n"
+        "✨ **¡Descansa bien, mañana seguimos construyendo tu futuro!**"
+    ).split(_FIELD, 1))
+
+def render_motivational(stats: UserStats, daily_phrase: str) -> str:
+    """Mensaje motivacional personalizado"""
+    head, tail = motivational_template(daily_phrase)
+    return f"{head}{stats.username or 'Developer'}{tail}"
+
+_DIGEST_HEADER = "📬 **Tu resumen del día**\n\n"
+_DIGEST_SEPARATOR = "\n\n━━━━━━━━━━━━\n\n"
+
+def digest_message(sections: list) -> str:
+    """Un solo mensaje con todas las notificaciones del día del usuario"""
+    return _DIGEST_HEADER + _DIGEST_SEPARATOR.join(section.strip() for section in sections)
+
+@lru_cache(maxsize=None)
+def week_reset_message(current_week: int) -> str:
+    """Aviso de semana restablecida (no tiene campos por usuario)"""
+    previous_week = max(1, current_week - 1)
+
+    return f"""
+⚠️ **SEMANA RESTABLECIDA**
+
+📅 **De semana {current_week} → semana {previous_week}**
+
+🎯 **Motivo:** No completaste todos los requisitos de la semana {current_week}
+
+📋 **Para avanzar necesitas:**
+• ✅ Completar proyecto semanal
+• ✅ Aprobar examen (70% mínimo)
+• ✅ Enviar todas las evidencias
+
+💪 **¡No te desanimes!** Cada reset es una oportunidad para:
+• Reforzar conceptos
+• Mejorar tu proyecto
+• Dominar completamente la semana
+
+🚀 **Usa /semana para ver qué completar**
+
+¡Tú puedes hacerlo! 💪
+"""
+
+# Contenido estático por semana (solo depende de STUDY_GUIDE)
+
+@lru_cache(maxsize=None)
+def week_videos_message(week: int) -> str:
+    """Videos de la semana"""
+    content = week_content(week)
+
+    return f"""
+📺 **VIDEOS RECOMENDADOS - SEMANA {week}**
+
+**{content['title']}**
+
+{content['videos']}
+
+💡 **Regla de oro:**
+Pausa cada 5 minutos e intenta replicar el código sin mirar!
+
+🎯 **Regla 70/30:**
+• 70% programando proyectos
+• 30% viendo tutoriales
+
+⚡ **No copies código directamente. Entiende primero.**
+"""
+
+@lru_cache(maxsize=None)
+def week_tools_message(week: int) -> str:
+    """Herramientas de la semana"""
+    content = week_content(week)
+
+    return f"""
+🛠️ **HERRAMIENTAS PARA PRACTICAR - SEMANA {week}**
+
+**{content['title']}**
+
+{content['tools']}
+
+🎮 **¡Importante!**
+Estas herramientas son para PRACTICAR, no solo leer.
+
+🎯 **Sugerencia:**
+Dedica mínimo 1 hora diaria a estas plataformas.
+
+💪 **¡La programación se aprende programando!**
+"""
+
+@lru_cache(maxsize=None)
+def week_project_message(week: int) -> str:
+    """Detalles del proyecto semanal"""
+    content = week_content(week)
+
+    return f"""
+📝 **PROYECTO SEMANA {week} - DETALLES**
+
+**"{content['project']['name']}"**
+
+📋 **Requisitos específicos:**
+{content['project']['requirements']}
+
+⏰ **Tiempo estimado:** {content['estimated_time']}
+
+🎯 **Objetivo principal:**
+{content['goal']}
+
+💡 **Tip clave:**
+{content['tip']}
+
+🚀 **Recordatorio importante:**
+¡Haz deploy cuando termines! (Netlify, Vercel, GitHub Pages)
+
+📸 **No olvides tomar screenshots para tu portfolio**
+"""
+
+@lru_cache(maxsize=None)
+def week_tip_message(week: int) -> str:
+    """Tip de la semana"""
+    content = week_content(week)
+    extra_tip = EXTRA_WEEK_TIPS.get(week, "• Constancia diaria\n• Más código, menos videos\n• Cada línea cuenta")
+
+    return f"""
+💡 **TIP DE LA SEMANA {week}**
+
+**{content['title']}**
+
+🎯 **Tip principal:**
+{content['tip']}
+
+🔥 **Tips adicionales:**
+{extra_tip}
+
+⭐ **Recuerda siempre:**
+La programación se aprende PROGRAMANDO, no viendo videos!
+
+💪 **¡Pon en práctica cada concepto inmediatamente!**
+"""
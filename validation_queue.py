@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Cola de validación de evidencias del Bot Mentor
+La evidencia se confirma al instante como pendiente; un pool de workers asíncronos la valida
+desde la cola persistente (validation_jobs), guarda el veredicto y se lo envía al usuario
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from telegram.error import TelegramError
+
+from config import EVIDENCE_WORKERS, EVIDENCE_JOB_MAX_ATTEMPTS, EVIDENCE_JOB_RETENTION_DAYS
+from evidence_manager import evidence_validator, QUEUED_EVIDENCE_TYPES, MANUAL_REVIEW_MESSAGE
+from github_client import github_client, GitHubRateLimitError
+from repository import repo
+
+logger = logging.getLogger(__name__)
+
+# Sin aviso local, los workers revisan la cola cada tanto (trabajos de otras instancias)
+IDLE_POLL_SECONDS = 30
+# Un trabajo 'running' más viejo que esto quedó huérfano (proceso muerto a mitad)
+STALE_JOB_SECONDS = 600
+# Tope de la espera de cuota dentro de un worker: muy por debajo de STALE_JOB_SECONDS, para que
+# nadie reanude un trabajo que sigue en curso; esperas más largas difieren el trabajo en la cola
+MAX_QUOTA_WAIT = STALE_JOB_SECONDS / 10
+
+EVIDENCE_NAMES = {
+    "deployed_url": "URL del proyecto",
+    "github_repository": "Repositorio GitHub"
+}
+
+@dataclass(slots=True)
+class ValidationMetrics:
+    """Métricas de la cola desde que dejó de estar vacía hasta que se vacía de nuevo"""
+    processed: int = 0
+    failed: int = 0
+    retried: int = 0
+    deferred: int = 0  # Devueltos a la cola por cuota de GitHub agotada
+    wait_total: float = 0.0  # En cola: enviado → inicio de validación
+    wait_max: float = 0.0
+    run_total: float = 0.0  # Validación (HTTP) + guardado
+    run_max: float = 0.0
+
+    def record(self, wait: float, run: float):
+        """Sumar un trabajo terminado"""
+        self.processed += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.run_total += run
+        self.run_max = max(self.run_max, run)
+
+    def summary(self) -> str:
+        """Resumen de una línea para el log"""
+        processed = self.processed or 1
+        return (f"Cola de validación: {self.processed} validadas, {self.failed} fallidas, "
+                f"{self.retried} reintentos, {self.deferred} diferidos; "
+                f"espera media {self.wait_total / processed:.2f}s "
+                f"(máx {self.wait_max:.2f}s), validación media {self.run_total / processed:.2f}s "
+                f"(máx {self.run_max:.2f}s)")
+
+class ValidationQueue:
+    def __init__(self, workers: int = EVIDENCE_WORKERS):
+        """Inicializar cola; los workers arrancan con la aplicación"""
+        self.workers = workers
+        self.bot = None
+        self.metrics = ValidationMetrics()
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+        self._in_flight = 0
+
+    async def submit(self, user_id: int, week: int, evidence_type: str, content: str) -> dict:
+        """Registrar evidencia; las que requieren HTTP quedan en cola y se confirman como pendientes"""
+        if evidence_type not in QUEUED_EVIDENCE_TYPES or not self._tasks:
+            try:
+                return await repo.submit_evidence(user_id, week, evidence_type, content)
+            except GitHubRateLimitError as e:
+                # Sin workers no hay cola que la difiera: queda pendiente para revisión manual
+                logger.warning(f"Validación directa sin cuota de GitHub ({user_id}): {e}")
+                return {"status": "pending_review", "message": MANUAL_REVIEW_MESSAGE, "auto_validated": False}
+
+        await repo.enqueue_evidence(user_id, week, evidence_type, content)
+        self._wakeup.set()
+        return {
+            "status": "pending",
+            "message": "⏳ Evidencia recibida. La estoy validando y te aviso el resultado en unos segundos.",
+            "auto_validated": False
+        }
+
+    async def start(self, bot):
+        """Reanudar trabajos huérfanos, limpiar los antiguos e iniciar los workers"""
+        self.bot = bot
+        if github_client.max_wait > MAX_QUOTA_WAIT:
+            logger.warning(f"GITHUB_RATE_LIMIT_MAX_WAIT={github_client.max_wait:.0f}s supera el tope de "
+                           f"{MAX_QUOTA_WAIT:.0f}s de los workers; se usa el tope")
+            github_client.max_wait = MAX_QUOTA_WAIT
+        now = time.time()
+        resumed = await repo.requeue_running_validation_jobs(now - STALE_JOB_SECONDS)
+        if resumed:
+            logger.warning(f"Cola de validación: {resumed} trabajos interrumpidos se reintentarán")
+        await repo.purge_validation_jobs(now - EVIDENCE_JOB_RETENTION_DAYS * 86400)
+
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f'validation-worker-{n}') for n in range(self.workers)
+        ]
+        logger.info(f"Cola de validación iniciada con {self.workers} workers")
+
+    async def stop(self):
+        """Detener los workers; lo no terminado se retoma al reiniciar"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        """Procesar trabajos mientras haya; si no, esperar aviso o el siguiente sondeo"""
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await repo.claim_validation_job()
+            except Exception as e:
+                logger.error(f"Error tomando trabajo de validación: {e}")
+                job = None
+
+            if job is not None:
+                jobs = [job] + await self._claim_batch(job)
+                self._in_flight += 1
+                try:
+                    if len(jobs) > 1:
+                        await self._process_batch(jobs)
+                    else:
+                        await self._process(job)
+                finally:
+                    self._in_flight -= 1
+                continue
+
+            # El último worker en quedar libre reporta el vaciado
+            if not self._in_flight and (self.metrics.processed or self.metrics.failed or self.metrics.deferred):
+                await self._log_drain()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=IDLE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                await repo.requeue_running_validation_jobs(time.time() - STALE_JOB_SECONDS)
+
+    async def _claim_batch(self, job: tuple) -> list:
+        """Con token de GitHub, tomar también los demás repositorios en cola para una sola consulta GraphQL"""
+        if job[3] != 'github_repository' or not github_client.can_batch:
+            return []
+        try:
+            return await repo.claim_validation_jobs('github_repository', github_client.batch_size - 1)
+        except Exception as e:
+            logger.error(f"Error tomando lote de validación: {e}")
+            return []
+
+    async def _process(self, job: tuple):
+        """Validar un trabajo, guardar el veredicto y avisar al usuario"""
+        job_id, user_id, week, evidence_type, content, attempts, enqueued_at = job
+        started = time.time()
+        try:
+            result = await evidence_validator.validate_evidence(user_id, week, evidence_type, content)
+        except asyncio.CancelledError:
+            raise
+        except GitHubRateLimitError as e:
+            await self._defer([job], e)
+            return
+        except Exception as e:
+            await self._fail(job, e)
+            return
+
+        await self._finish(job, result, started)
+
+    async def _process_batch(self, jobs: list):
+        """Validar varios repositorios de GitHub juntos y cerrar cada trabajo"""
+        started = time.time()
+        try:
+            results = await evidence_validator.validate_github_repos([job[4] for job in jobs])
+        except asyncio.CancelledError:
+            raise
+        except GitHubRateLimitError as e:
+            await self._defer(jobs, e)
+            return
+        except Exception as e:
+            for job in jobs:
+                await self._fail(job, e)
+            return
+
+        for job, result in zip(jobs, results):
+            await self._finish(job, result, started)
+
+    async def _finish(self, job: tuple, result: dict, started: float):
+        """Guardar el veredicto y avisar al usuario"""
+        job_id, user_id, week, evidence_type, content, attempts, enqueued_at = job
+        try:
+            current = await repo.complete_validation_job(job_id, user_id, week, evidence_type, content, result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._fail(job, e)
+            return
+
+        self.metrics.record(started - enqueued_at, time.time() - started)
+        # Si el usuario ya envió otra evidencia del mismo tipo, el veredicto viejo no se notifica
+        if current:
+            await self._notify(user_id, week, evidence_type, result)
+
+    async def _defer(self, jobs: list, error: GitHubRateLimitError):
+        """Cuota de GitHub agotada: devolver los trabajos a la cola hasta el reinicio sin ocupar un worker"""
+        delay = max(error.retry_at - time.time(), 0.0)
+        logger.warning(f"{error}: {len(jobs)} trabajos vuelven a la cola por {delay:.0f}s")
+        try:
+            await repo.defer_validation_jobs([job[0] for job in jobs], error.retry_at, str(error))
+        except Exception as e:
+            # Quedan 'running': se reanudan como huérfanos pasado STALE_JOB_SECONDS
+            logger.error(f"Error difiriendo trabajos de validación: {e}")
+            return
+        self.metrics.deferred += len(jobs)
+        
+    async def _fail(self, job: tuple, error: Exception):
+        """Devolver el trabajo a la cola o descartarlo si agotó los intentos"""
+        job_id, user_id, week, evidence_type, content, attempts, enqueued_at = job
+        retry = attempts < EVIDENCE_JOB_MAX_ATTEMPTS
+        logger.error(f"Error validando trabajo {job_id} ({evidence_type} de {user_id}, intento {attempts}): {error}")
+        current = await repo.fail_validation_job(job_id, str(error), retry)
+        if retry:
+            self.metrics.retried += 1
+            return
+
+        self.metrics.failed += 1
+        # Agotados los intentos la evidencia queda para revisión manual: el usuario también lo sabe
+        if current:
+            await self._notify(user_id, week, evidence_type, {
+                "status": "pending_review",
+                "message": MANUAL_REVIEW_MESSAGE,
+                "auto_validated": False
+            })
+
+    async def _notify(self, user_id: int, week: int, evidence_type: str, result: dict):
+        """Enviar el veredicto al chat del usuario"""
+        name = EVIDENCE_NAMES.get(evidence_type, evidence_type)
+        if result['status'] == 'approved':
+            text = f"✅ **{name} - Semana {week}**\n\n{result['message']}"
+        elif result['status'] == 'pending_review':
+            text = f"🕵️ **{name} - Semana {week}**\n\n{result['message']}"
+        else:
+            text = f"⚠️ **{name} - Semana {week}**\n\n{result['message']}\n\nCorrige y envíala de nuevo con /evidencia"
+        try:
+            await self.bot.send_message(chat_id=user_id, text=text, parse_mode='Markdown')
+        except TelegramError as e:
+            logger.error(f"Error enviando resultado de validación a {user_id}: {e}")
+
+    async def _log_drain(self):
+        """Registrar métricas al vaciarse la cola y reiniciarlas"""
+        metrics, self.metrics = self.metrics, ValidationMetrics()
+        try:
+            stats = await repo.get_validation_queue_stats()
+            depth = f"; en cola {stats['pending']}, en curso {stats['running']}"
+        except Exception:
+            depth = ""
+        counts = evidence_validator.cache_counts
+        cached = (f"; caché: {counts['fresh']} vigentes, {counts['revalidated']} revalidadas (304), "
+                  f"{counts['fetched']} descargas")
+        logger.info(metrics.summary() + depth + cached)
+
+# Instancia global
+validation_queue = ValidationQueue()
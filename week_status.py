@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Motor de estado semanal del Bot Mentor
+Responde "¿completó el usuario U la semana N?" con una sola consulta SQL, para uno o muchos usuarios
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, Tuple
+
+from config import WEEKLY_EXAMS
+from database import get_connection, week_status_cache
+from cache import MISSING
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class WeekStatus:
+    """Estado de evidencias y examen de un usuario en una semana"""
+    user_id: int
+    week: int
+    unapproved: Tuple[str, ...]  # Evidencias requeridas que no están aprobadas
+    rejected: Tuple[str, ...]  # Evidencias requeridas faltantes o inválidas
+    exam_passed: bool
+
+    @property
+    def complete(self) -> bool:
+        """Todas las evidencias aprobadas y el último examen aprobado"""
+        return not self.unapproved and self.exam_passed
+
+# Una fila por (usuario, semana) pedida; los pares llegan como JSON en un solo parámetro
+_WEEK_STATUS_SQL = '''
+WITH targets (user_id, week) AS (
+    SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?)
+)
+SELECT
+    t.user_id,
+    t.week,
+    group_concat(CASE WHEN r.evidence_type IS NOT NULL AND e.status IS NOT 'approved'
+                      THEN r.evidence_type END) AS unapproved,
+    group_concat(CASE WHEN r.evidence_type IS NOT NULL AND (e.status IS NULL OR e.status = 'invalid')
+                      THEN r.evidence_type END) AS rejected,
+    (SELECT x.passed FROM exam_results x
+     WHERE x.user_id = t.user_id AND x.week = t.week
+     ORDER BY x.attempt_number DESC LIMIT 1) AS exam_passed
+FROM targets t
+LEFT JOIN week_requirements r ON r.week = t.week
+LEFT JOIN evidences e
+    ON e.user_id = t.user_id AND e.week = r.week AND e.evidence_type = r.evidence_type
+GROUP BY t.user_id, t.week
+'''
+
+def _split(types) -> Tuple[str, ...]:
+    """Convertir el resultado de group_concat en tupla"""
+    return tuple(types.split(',')) if types else ()
+
+def sync_week_requirements():
+    """Reescribir week_requirements a partir de WEEKLY_EXAMS (al iniciar)"""
+    requirements = {
+        (week, evidence_type)
+        for week, exam_config in WEEKLY_EXAMS.items()
+        for question in exam_config.get('questions', [])
+        if question.get('type') == 'evidence'
+        for evidence_type in question.get('required_evidence', [])
+    }
+
+    conn = get_connection()
+    with conn:
+        conn.execute('DELETE FROM week_requirements')
+        conn.executemany(
+            'INSERT INTO week_requirements (week, evidence_type) VALUES (?, ?)',
+            sorted(requirements)
+        )
+    week_status_cache.clear()
+    logger.info(f"Requisitos semanales sincronizados: {len(requirements)} evidencias")
+
+def get_week_statuses(pairs: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], WeekStatus]:
+    """Estado de muchos (usuario, semana) en una sola consulta"""
+    pairs = list(pairs)
+    if not pairs:
+        return {}
+
+    cursor = get_connection().execute(_WEEK_STATUS_SQL, (json.dumps(pairs),))
+    return {
+        (user_id, week): WeekStatus(user_id, week, _split(unapproved), _split(rejected), bool(exam_passed))
+        for user_id, week, unapproved, rejected, exam_passed in cursor
+    }
+
+def get_week_status(user_id: int, week: int) -> WeekStatus:
+    """Estado de un usuario en una semana (con caché)"""
+    cache_key = (user_id, week, 'status')
+    cached = week_status_cache.get(cache_key, MISSING)
+    if cached is not MISSING:
+        return cached
+    version = week_status_cache.version()
+
+    status = get_week_statuses([(user_id, week)])[(user_id, week)]
+    week_status_cache.set(cache_key, status, version)
+    return status
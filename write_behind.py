@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Cola write-behind para actualizaciones de progreso
+Agrupa muchas escrituras pequeñas en una sola transacción (group commit)
+"""
+
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Callable, List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+class PendingProgress(NamedTuple):
+    """Mutación de progreso aún no confirmada en la base de datos"""
+    user_id: int
+    progress_type: str
+    value: object
+    day: date  # Fecha del registro (no la del flush)
+
+class ProgressWriteQueue:
+    def __init__(self, apply_batch: Callable[[List[PendingProgress]], None],
+                 enabled: bool, flush_interval_ms: int, max_batch: int):
+        """Inicializar la cola; apply_batch escribe un lote en una transacción"""
+        self.enabled = enabled
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self._apply_batch = apply_batch
+        self._pending: List[PendingProgress] = []
+        self._queue_lock = threading.Lock()
+        # Hace atómico "confirmar lote + sacarlo de la cola" frente a las lecturas
+        # que combinan BD + pendientes; encolar nunca espera a un flush
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Iniciar el hilo escritor"""
+        if not self.enabled or self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run_writer, name='progress-writer', daemon=True)
+        self._thread.start()
+        # Garantía de flush al apagar aunque no se llame a stop()
+        atexit.register(self.stop)
+        logger.info(f"Write-behind activo: flush cada {self.flush_interval * 1000:.0f} ms "
+                    f"o {self.max_batch} operaciones")
+
+    def stop(self):
+        """Detener el escritor y confirmar todo lo pendiente"""
+        if self._running:
+            self._running = False
+            self._wakeup.set()
+            self._thread.join()
+        self.flush()
+
+    def enqueue(self, user_id: int, progress_type: str, value):
+        """Encolar una mutación de progreso"""
+        with self._queue_lock:
+            self._pending.append(PendingProgress(user_id, progress_type, value, date.today()))
+            if len(self._pending) >= self.max_batch:
+                self._wakeup.set()
+
+    @contextmanager
+    def read_view(self, user_id: int):
+        """Bloquear flushes mientras se lee la BD y devolver las mutaciones pendientes del usuario"""
+        if not self.enabled:
+            yield []
+            return
+        with self._flush_lock:
+            with self._queue_lock:
+                pending = [op for op in self._pending if op.user_id == user_id]
+            yield pending
+
+    def flush(self) -> int:
+        """Escribir todas las mutaciones pendientes en una transacción"""
+        with self._flush_lock:
+            with self._queue_lock:
+                batch = list(self._pending)
+            if not batch:
+                return 0
+            self._apply_batch(batch)
+            # Solo se sacan de la cola después del commit
+            with self._queue_lock:
+                del self._pending[:len(batch)]
+        return len(batch)
+
+    def depth(self) -> int:
+        """Número de mutaciones pendientes"""
+        return len(self._pending)
+
+    def _run_writer(self):
+        """Loop del hilo escritor: flush por tiempo o por tamaño de lote"""
+        while self._running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # Los pendientes se conservan y se reintentan en el siguiente ciclo
+                logger.error(f"Error en flush write-behind ({self.depth()} pendientes): {e}")